@@ -11,6 +11,7 @@ from flask_admin import Admin
 from flasgger import Swagger
 from config import config_by_name
 from werkzeug.exceptions import HTTPException
+from sqlalchemy import event
 
 # Inicializar extensiones
 db = SQLAlchemy()
@@ -22,6 +23,13 @@ mail = Mail()
 admin_instance = None
 
 
+def _activar_claves_foraneas_sqlite(conexion, registro):
+    """Activar PRAGMA foreign_keys en cada conexión SQLite nueva."""
+    cursor = conexion.cursor()
+    cursor.execute('PRAGMA foreign_keys=ON')
+    cursor.close()
+
+
 def create_app(config_name=None):
     """
     Factory pattern para crear la aplicación Flask.
@@ -43,6 +51,10 @@ def create_app(config_name=None):
 
     # Inicializar extensiones con la app
     db.init_app(app)
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            # SQLite solo aplica las claves foráneas (y ON DELETE) si se activa por conexión
+            event.listen(db.engine, 'connect', _activar_claves_foraneas_sqlite)
     migrate.init_app(app, db)
     jwt.init_app(app)
     bcrypt.init_app(app)
@@ -115,11 +127,13 @@ def create_app(config_name=None):
     from app.routes.solicitudes import solicitudes_bp
     from app.routes.notificaciones import notificaciones_bp
     from app.routes.frontend import frontend_bp
+    from app.routes.sistema import sistema_bp
 
     app.register_blueprint(auth_bp, url_prefix='/api/usuarios')
     app.register_blueprint(solicitudes_bp, url_prefix='/api/solicitudes')
     app.register_blueprint(notificaciones_bp, url_prefix='/api/notificaciones')
     app.register_blueprint(frontend_bp, url_prefix='/app')
+    app.register_blueprint(sistema_bp, url_prefix='/api/sistema')
 
     # Configurar Flask-Admin
     from app.admin.views import configure_admin
@@ -132,6 +146,22 @@ def create_app(config_name=None):
     # Registrar error handlers
     register_error_handlers(app)
 
+    # Perfilado SQL por request (antes de las métricas, que lo reutilizan)
+    from app.utils.perfil_sql import registrar_perfil_sql
+    registrar_perfil_sql(app)
+
+    # Perfilador por muestreo bajo demanda
+    from app.utils.perfilador import registrar_perfilador
+    registrar_perfilador(app)
+
+    # Métricas (Prometheus)
+    from app.utils.metricas import registrar_metricas
+    registrar_metricas(app)
+
+    # Límite de frecuencia de la API (después de las métricas para contar los 429)
+    from app.utils.limite_frecuencia import registrar_limite_frecuencia
+    registrar_limite_frecuencia(app)
+
     # Ruta de health check
     @app.route('/health')
     def health():
@@ -165,18 +195,25 @@ def register_error_handlers(app):
         log_error(
             f"APIException: {error.error_code}",
             error_code=error.error_code,
-            message=error.message,
+            error_message=error.message,
             details=error.details,
             status_code=error.status_code
         )
 
-        return error_response(
+        response = error_response(
             error_code=error.error_code,
             message=error.message,
             status_code=error.status_code,
             details=error.details if error.details else None
         )
 
+        # Indicar al cliente cuándo reintentar (429/503)
+        retry_after = getattr(error, 'retry_after', None)
+        if retry_after:
+            response[0].headers['Retry-After'] = str(int(retry_after))
+
+        return response
+
     @app.errorhandler(JWTExtendedException)
     def handle_jwt_exception(error):
         """Maneja errores de JWT."""
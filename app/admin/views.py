@@ -6,6 +6,15 @@ from werkzeug.security import check_password_hash
 from app.models.usuario import Usuario
 from app.models.solicitud import Solicitud
 from app.models.notificacion import Notificacion
+from app.models.regla_aprobacion import ReglaAprobacion
+from app.services.enrutamiento_service import ROLES_APROBADORES, invalidar_enrutamiento
+from app.services.password_service import verificar_login
+from app.services.limite_login_service import comprobar_intento_login, registrar_login_exitoso
+from app.services.busqueda_service import (
+    condicion_busqueda_usuarios,
+    condicion_busqueda_solicitudes,
+    condicion_busqueda_notificaciones
+)
 from app import bcrypt
 
 
@@ -34,6 +43,37 @@ class SecureModelView(ModelView):
         flash('Debes iniciar sesión como jefe o administrador para acceder.', 'error')
         return redirect(url_for('admin.login_view'))
 
+    def condicion_busqueda(self, texto):
+        """
+        Condición de búsqueda respaldada por índices.
+
+        Las vistas que la sobrescriben reemplazan el ILIKE sobre CAST de
+        Flask-Admin, que no puede usar índices.
+
+        Args:
+            texto: Texto de búsqueda
+
+        Returns:
+            Expresión SQLAlchemy o None para usar la búsqueda por defecto
+        """
+        return None
+
+    def _apply_search(self, query, count_query, joins, count_joins, search):
+        """Aplicar la búsqueda usando condicion_busqueda si la vista la define."""
+        texto = search.strip()
+        if not texto:
+            return query, count_query, joins, count_joins
+
+        condicion = self.condicion_busqueda(texto)
+        if condicion is None:
+            return super()._apply_search(query, count_query, joins, count_joins, search)
+
+        query = query.filter(condicion)
+        if count_query is not None:
+            count_query = count_query.filter(condicion)
+
+        return query, count_query, joins, count_joins
+
 
 class UsuarioModelView(SecureModelView):
     """Vista de administración para Usuarios."""
@@ -76,6 +116,10 @@ class UsuarioModelView(SecureModelView):
     # Paginación
     page_size = 20
 
+    def condicion_busqueda(self, texto):
+        """Búsqueda con índices trigram y prefijo de email."""
+        return condicion_busqueda_usuarios(texto)
+
 
 class SolicitudModelView(SecureModelView):
     """Vista de administración para Solicitudes."""
@@ -139,14 +183,18 @@ class SolicitudModelView(SecureModelView):
     # Paginación
     page_size = 20
 
+    def condicion_busqueda(self, texto):
+        """Búsqueda con el índice de texto completo."""
+        return condicion_busqueda_solicitudes(texto)
+
 
 class NotificacionModelView(SecureModelView):
     """Vista de administración para Notificaciones."""
 
     column_list = ['id', 'tipo', 'destinatario_email', 'asunto', 'enviado',
-                   'intentos', 'created_at']
+                   'intentos', 'descartada', 'created_at']
     column_searchable_list = ['destinatario_email', 'asunto', 'mensaje']
-    column_filters = ['tipo', 'enviado', 'created_at']
+    column_filters = ['tipo', 'enviado', 'descartada', 'created_at']
     column_editable_list = ['enviado']
     column_sortable_list = ['id', 'tipo', 'enviado', 'intentos', 'created_at']
 
@@ -166,6 +214,7 @@ class NotificacionModelView(SecureModelView):
         'enviado': 'Enviado',
         'fecha_envio': 'Fecha de Envío',
         'intentos': 'Intentos',
+        'descartada': 'Descartada',
         'error_mensaje': 'Mensaje de Error',
         'solicitud_id': 'ID Solicitud',
         'created_at': 'Fecha de Creación'
@@ -191,6 +240,68 @@ class NotificacionModelView(SecureModelView):
     can_create = False
     can_delete = False
 
+    def condicion_busqueda(self, texto):
+        """Búsqueda con índices trigram y prefijo de email."""
+        return condicion_busqueda_notificaciones(texto)
+
+
+class ReglaAprobacionModelView(SecureModelView):
+    """Vista de administración para las reglas de enrutamiento de aprobadores."""
+
+    column_list = ['id', 'aprobador', 'tipo', 'solicitante', 'activa', 'created_at']
+    column_filters = ['tipo', 'activa', 'aprobador_id', 'solicitante_id']
+    column_editable_list = ['activa']
+    column_sortable_list = ['id', 'tipo', 'activa', 'created_at']
+
+    # Campos a mostrar en el formulario
+    form_columns = ['aprobador', 'tipo', 'solicitante', 'activa']
+
+    # Nombres de columnas más amigables
+    column_labels = {
+        'id': 'ID',
+        'aprobador': 'Aprobador',
+        'aprobador_id': 'ID Aprobador',
+        'tipo': 'Tipo (vacío = todos)',
+        'solicitante': 'Solicitante (vacío = todos)',
+        'solicitante_id': 'ID Solicitante',
+        'activa': 'Activa',
+        'created_at': 'Fecha de Creación'
+    }
+
+    column_formatters = {
+        'aprobador': lambda v, c, m, p: m.aprobador.email if m.aprobador else '',
+        'solicitante': lambda v, c, m, p: m.solicitante.email if m.solicitante else 'Todos',
+        'tipo': lambda v, c, m, p: m.tipo or 'Todos'
+    }
+
+    # Valores por defecto
+    form_args = {
+        'tipo': {
+            'choices': [
+                ('compra', 'Compra'),
+                ('mantenimiento', 'Mantenimiento'),
+                ('soporte_tecnico', 'Soporte Técnico'),
+                ('otro', 'Otro')
+            ]
+        },
+        'aprobador': {
+            'query_factory': lambda: Usuario.query.filter(
+                Usuario.rol.in_(ROLES_APROBADORES), Usuario.activo == True
+            ).order_by(Usuario.email)
+        }
+    }
+
+    # Paginación
+    page_size = 20
+
+    def after_model_change(self, form, model, is_created):
+        """Aplicar la regla sin esperar a que caduque la caché."""
+        invalidar_enrutamiento()
+
+    def after_model_delete(self, model):
+        """Aplicar la baja sin esperar a que caduque la caché."""
+        invalidar_enrutamiento()
+
 
 class CustomAdminIndexView(AdminIndexView):
     """Vista personalizada para el índice del panel de administración."""
@@ -252,6 +363,12 @@ class CustomAdminIndexView(AdminIndexView):
                 flash('Por favor ingresa email y contraseña.', 'error')
                 return self.render('admin/login.html')
 
+            # Limitar intentos antes de pagar la verificación bcrypt
+            espera = comprobar_intento_login(email, request.remote_addr, origen='admin')
+            if espera:
+                flash('Demasiados intentos de inicio de sesión. Inténtalo de nuevo en unos minutos.', 'error')
+                return self.render('admin/login.html'), 429, {'Retry-After': str(espera)}
+
             user = Usuario.query.filter_by(email=email).first()
 
             if not user:
@@ -262,7 +379,7 @@ class CustomAdminIndexView(AdminIndexView):
                 flash('Tu cuenta está desactivada. Contacta al administrador.', 'error')
                 return self.render('admin/login.html')
 
-            if not user.check_password(password):
+            if not verificar_login(user, password):
                 flash('Email o contraseña incorrectos.', 'error')
                 return self.render('admin/login.html')
 
@@ -271,6 +388,7 @@ class CustomAdminIndexView(AdminIndexView):
                 return self.render('admin/login.html')
 
             # Login exitoso
+            registrar_login_exitoso(email)
             session['user_id'] = user.id
             session['user_email'] = user.email
             session['user_rol'] = user.rol
@@ -300,4 +418,5 @@ def configure_admin(admin, db):
     # Agregar vistas de modelos con endpoints únicos
     admin.add_view(UsuarioModelView(Usuario, db.session, name='Usuarios', category='Gestión', endpoint='usuarios_admin'))
     admin.add_view(SolicitudModelView(Solicitud, db.session, name='Solicitudes', category='Gestión', endpoint='solicitudes_admin'))
+    admin.add_view(ReglaAprobacionModelView(ReglaAprobacion, db.session, name='Reglas de Aprobación', category='Gestión', endpoint='reglas_aprobacion_admin'))
     admin.add_view(NotificacionModelView(Notificacion, db.session, name='Notificaciones', category='Sistema', endpoint='notificaciones_admin'))
@@ -2,5 +2,12 @@
 from app.models.usuario import Usuario
 from app.models.solicitud import Solicitud
 from app.models.notificacion import Notificacion
+from app.models.archivo import NotificacionArchivada, SolicitudArchivada
+from app.models.refresh_token import RefreshToken
+from app.models.marca_agua import MarcaAgua
+from app.models.regla_aprobacion import ReglaAprobacion
+from app.models.preferencia_notificacion import PreferenciaNotificacion
+from app.models.cambio import SecuenciaCambios, SolicitudEliminada
 
-__all__ = ['Usuario', 'Solicitud', 'Notificacion']
+__all__ = ['Usuario', 'Solicitud', 'Notificacion', 'NotificacionArchivada', 'SolicitudArchivada', 'RefreshToken', 'MarcaAgua',
+           'ReglaAprobacion', 'PreferenciaNotificacion', 'SecuenciaCambios', 'SolicitudEliminada']
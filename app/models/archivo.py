@@ -0,0 +1,128 @@
+"""Modelos del archivo histórico."""
+from datetime import datetime
+from app import db
+from sqlalchemy import Index
+
+
+class NotificacionArchivada(db.Model):
+    """Copia histórica de notificaciones enviadas o leídas retiradas de la tabla principal."""
+
+    __tablename__ = 'notificaciones_archivo'
+
+    # Mismas columnas que notificaciones, sin claves foráneas para que el
+    # archivo sobreviva a la eliminación de usuarios o solicitudes
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    tipo = db.Column(db.String(50), nullable=False)
+    usuario_id = db.Column(db.Integer, nullable=True)
+    titulo = db.Column(db.String(200), nullable=True)
+    mensaje = db.Column(db.Text, nullable=True)
+    leida = db.Column(db.Boolean, default=False, nullable=False)
+    fecha_lectura = db.Column(db.DateTime, nullable=True)
+    destinatario_email = db.Column(db.String(120), nullable=True)
+    destinatario_nombre = db.Column(db.String(100), nullable=True)
+    asunto = db.Column(db.String(200), nullable=True)
+    enviado = db.Column(db.Boolean, default=False, nullable=False)
+    fecha_envio = db.Column(db.DateTime, nullable=True)
+    intentos = db.Column(db.Integer, default=0, nullable=False)
+    error_mensaje = db.Column(db.Text, nullable=True)
+    descartada = db.Column(db.Boolean, default=False, server_default=db.false(), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=True)
+    solicitud_id = db.Column(db.Integer, nullable=True)
+
+    # Fecha en la que se movió al archivo
+    archivado_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    # Índices compuestos
+    __table_args__ = (
+        Index('idx_notif_archivo_usuario_created', 'usuario_id', 'created_at'),
+        Index('idx_notif_archivo_solicitud', 'solicitud_id'),
+    )
+
+    def __repr__(self):
+        """Representación de la notificación archivada."""
+        return f'<NotificacionArchivada {self.id} - {self.tipo}>'
+
+
+class SolicitudArchivada(db.Model):
+    """Copia histórica de solicitudes completadas o rechazadas retiradas de la tabla principal."""
+
+    __tablename__ = 'solicitudes_archivo'
+
+    # Mismas columnas que solicitudes; usuario_id y aprobador_id sin claves
+    # foráneas para no bloquear la eliminación de usuarios
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    tipo = db.Column(db.String(50), nullable=False)
+    titulo = db.Column(db.String(200), nullable=False)
+    descripcion = db.Column(db.Text, nullable=False)
+    estado = db.Column(db.String(20), nullable=False)
+    prioridad = db.Column(db.String(20), nullable=False)
+    comentarios = db.Column(db.Text, nullable=True)
+    fecha_requerida = db.Column(db.Date, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=True)
+    fecha_aprobacion = db.Column(db.DateTime, nullable=True)
+    usuario_id = db.Column(db.Integer, nullable=False)
+    aprobador_id = db.Column(db.Integer, nullable=True)
+    version = db.Column(db.BigInteger, nullable=True)
+
+    # Fecha en la que se movió al archivo
+    archivado_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    # Relaciones de solo lectura (sin claves foráneas en la base de datos)
+    usuario = db.relationship(
+        'Usuario',
+        primaryjoin='foreign(SolicitudArchivada.usuario_id) == Usuario.id',
+        viewonly=True
+    )
+    aprobador = db.relationship(
+        'Usuario',
+        primaryjoin='foreign(SolicitudArchivada.aprobador_id) == Usuario.id',
+        viewonly=True
+    )
+
+    # Índices compuestos
+    __table_args__ = (
+        Index('idx_solicitud_archivo_usuario_created', 'usuario_id', 'created_at'),
+        Index('idx_solicitud_archivo_created', 'created_at'),
+    )
+
+    def __repr__(self):
+        """Representación de la solicitud archivada."""
+        return f'<SolicitudArchivada {self.id} - {self.tipo} ({self.estado})>'
+
+    def to_dict(self, include_relations=False):
+        """
+        Convertir solicitud archivada a diccionario.
+
+        Usa el mismo formato que Solicitud.to_dict y añade la marca de archivo.
+
+        Args:
+            include_relations: Si se deben incluir las relaciones
+
+        Returns:
+            dict: Diccionario con los datos de la solicitud
+        """
+        from app.models.solicitud import Solicitud
+
+        data = Solicitud.to_dict(self, include_relations=include_relations)
+        data['archivada'] = True
+        data['archivado_at'] = self.archivado_at.isoformat() if self.archivado_at else None
+        return data
+
+    def serializar(self, proyeccion):
+        """
+        Convertir solicitud archivada a diccionario con los campos de una proyección.
+
+        Args:
+            proyeccion: Proyeccion de app.utils.campos
+
+        Returns:
+            dict: Campos pedidos, relaciones expandidas y la marca de archivo
+        """
+        from app.models.solicitud import Solicitud
+
+        data = Solicitud.serializar(self, proyeccion)
+        data['archivada'] = True
+        data['archivado_at'] = self.archivado_at.isoformat() if self.archivado_at else None
+        return data
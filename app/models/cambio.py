@@ -0,0 +1,147 @@
+"""Modelos del registro de cambios de solicitudes (sincronización incremental)."""
+from datetime import datetime
+from app import db
+from sqlalchemy import DDL, Index, event, insert, update
+
+
+SECUENCIA_SOLICITUDES = 'solicitudes'
+
+
+class SecuenciaCambios(db.Model):
+    """
+    Contador monotónico de cambios.
+
+    Cada alta, modificación o baja de una solicitud toma el siguiente valor
+    con UPDATE ... RETURNING. El bloqueo de la fila se mantiene hasta el
+    commit, de modo que las versiones se confirman en orden y un cliente que
+    sincroniza desde una versión nunca se salta un cambio confirmado después.
+    """
+
+    __tablename__ = 'secuencias_cambios'
+
+    nombre = db.Column(db.String(50), primary_key=True)
+    valor = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        """Representación de la secuencia."""
+        return f'<SecuenciaCambios {self.nombre}={self.valor}>'
+
+
+class SolicitudEliminada(db.Model):
+    """Lápida de una solicitud eliminada para el feed de cambios."""
+
+    __tablename__ = 'solicitudes_eliminadas'
+
+    version = db.Column(db.BigInteger, primary_key=True, autoincrement=False)
+    solicitud_id = db.Column(db.Integer, nullable=False)
+    # Sin FK: la lápida sobrevive a la eliminación del usuario
+    usuario_id = db.Column(db.Integer, nullable=False)
+    eliminada_en = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    # Índices
+    __table_args__ = (
+        Index('idx_solicitud_eliminada_fecha', 'eliminada_en'),
+        # Feed de cambios de un empleado (solo sus solicitudes)
+        Index('idx_solicitud_eliminada_usuario', 'usuario_id', 'version'),
+    )
+
+    def __repr__(self):
+        """Representación de la lápida."""
+        return f'<SolicitudEliminada {self.solicitud_id} v{self.version}>'
+
+    def to_dict(self):
+        """
+        Convertir lápida a diccionario.
+
+        Returns:
+            dict: Versión, ID de la solicitud y fecha de eliminación
+        """
+        return {
+            'version': self.version,
+            'id': self.solicitud_id,
+            'eliminada_en': self.eliminada_en.isoformat() if self.eliminada_en else None,
+        }
+
+
+def reservar_versiones(conexion, cantidad, nombre=SECUENCIA_SOLICITUDES):
+    """
+    Reservar un bloque de versiones consecutivas de una secuencia.
+
+    Args:
+        conexion: Conexión de la transacción en curso
+        cantidad: Número de versiones
+        nombre: Nombre de la secuencia
+
+    Returns:
+        int: Última versión reservada (el bloque es ultima-cantidad+1..ultima)
+    """
+    tabla = SecuenciaCambios.__table__
+    ultima = conexion.execute(
+        update(tabla)
+        .where(tabla.c.nombre == nombre)
+        .values(valor=tabla.c.valor + cantidad)
+        .returning(tabla.c.valor)
+    ).scalar()
+
+    if ultima is None:
+        conexion.execute(insert(tabla).values(nombre=nombre, valor=cantidad))
+        ultima = cantidad
+
+    return ultima
+
+
+def registrar_eliminaciones(conexion, filas):
+    """
+    Registrar lápidas para solicitudes eliminadas con sentencias Core.
+
+    Args:
+        conexion: Conexión de la transacción en curso
+        filas: Pares (solicitud_id, usuario_id)
+    """
+    if not filas:
+        return
+
+    ultima = reservar_versiones(conexion, len(filas))
+    primera = ultima - len(filas) + 1
+    conexion.execute(insert(SolicitudEliminada.__table__), [
+        {'version': primera + i, 'solicitud_id': solicitud_id, 'usuario_id': usuario_id,
+         'eliminada_en': datetime.utcnow()}
+        for i, (solicitud_id, usuario_id) in enumerate(filas)
+    ])
+
+
+def registrar_cambios_sesion(session):
+    """
+    Versionar las solicitudes creadas, modificadas o eliminadas en un flush.
+
+    Args:
+        session: Sesión de SQLAlchemy (evento before_flush)
+    """
+    from app.models.solicitud import Solicitud
+
+    modificadas = [obj for obj in session.new if isinstance(obj, Solicitud)]
+    modificadas += [
+        obj for obj in session.dirty
+        if isinstance(obj, Solicitud) and session.is_modified(obj, include_collections=False)
+    ]
+    eliminadas = [obj for obj in session.deleted if isinstance(obj, Solicitud)]
+
+    if not modificadas and not eliminadas:
+        return
+
+    conexion = session.connection()
+    if modificadas:
+        version = reservar_versiones(conexion, len(modificadas)) - len(modificadas)
+        for solicitud in modificadas:
+            version += 1
+            solicitud.version = version
+
+    registrar_eliminaciones(conexion, [(obj.id, obj.usuario_id) for obj in eliminadas])
+
+
+# Las bases nuevas empiezan la secuencia en 0
+event.listen(
+    SecuenciaCambios.__table__,
+    'after_create',
+    DDL(f"INSERT INTO secuencias_cambios (nombre, valor) VALUES ('{SECUENCIA_SOLICITUDES}', 0)")
+)
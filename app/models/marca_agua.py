@@ -0,0 +1,78 @@
+"""Modelo de marcas de agua de procesos incrementales."""
+from datetime import datetime
+from app import db
+
+
+class MarcaAgua(db.Model):
+    """
+    Última posición procesada por un proceso periódico.
+
+    Cada proceso (p. ej. un criterio de recordatorios) guarda aquí el cursor
+    de la última fila tratada para que la siguiente ejecución continúe desde
+    ese punto en lugar de recorrer toda la tabla.
+    """
+
+    __tablename__ = 'marcas_agua'
+
+    nombre = db.Column(db.String(100), primary_key=True)
+    valor = db.Column(db.String(255), nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        """Representación de la marca de agua."""
+        return f'<MarcaAgua {self.nombre}={self.valor}>'
+
+    @staticmethod
+    def obtener(nombre):
+        """
+        Leer el valor de una marca de agua.
+
+        Args:
+            nombre: Nombre del proceso
+
+        Returns:
+            str: Valor guardado o None si el proceso nunca se ejecutó
+        """
+        marca = db.session.get(MarcaAgua, nombre)
+        return marca.valor if marca else None
+
+    @staticmethod
+    def guardar(nombre, valor):
+        """
+        Guardar el valor de una marca de agua (sin commit).
+
+        Args:
+            nombre: Nombre del proceso
+            valor: Nuevo valor
+        """
+        marca = db.session.get(MarcaAgua, nombre)
+        if marca is None:
+            db.session.add(MarcaAgua(nombre=nombre, valor=valor))
+        else:
+            marca.valor = valor
+
+    @staticmethod
+    def listar(prefijo):
+        """
+        Leer las marcas de agua cuyo nombre empieza por un prefijo.
+
+        Args:
+            prefijo: Prefijo del nombre (p. ej. 'resumen:pendiente:')
+
+        Returns:
+            dict: nombre -> valor
+        """
+        marcas = MarcaAgua.query.filter(MarcaAgua.nombre.startswith(prefijo, autoescape=True))
+        return {marca.nombre: marca.valor for marca in marcas}
+
+    @staticmethod
+    def borrar(nombre):
+        """
+        Eliminar una marca de agua (sin commit).
+
+        Args:
+            nombre: Nombre del proceso
+        """
+        marca = db.session.get(MarcaAgua, nombre)
+        if marca is not None:
+            db.session.delete(marca)
@@ -1,7 +1,18 @@
 """Modelo de Notificación."""
 from datetime import datetime
 from app import db
-from sqlalchemy import Index
+from sqlalchemy import DDL, Index, event, text
+from app.utils.campos import serializar_campos
+
+
+# Campos que la API puede devolver (?fields=) y relaciones expandibles
+# (?expand=), en el orden de to_dict
+CAMPOS_NOTIFICACION = (
+    'id', 'tipo', 'usuario_id', 'titulo', 'mensaje', 'leida', 'fecha_lectura',
+    'solicitud_id', 'created_at', 'destinatario_email', 'asunto', 'enviado',
+    'intentos', 'descartada', 'fecha_envio'
+)
+RELACIONES_NOTIFICACION = ('solicitud',)
 
 
 class Notificacion(db.Model):
@@ -18,7 +29,7 @@ class Notificacion(db.Model):
     )
 
     # Campos para notificaciones in-app (opcionales para backwards compatibility)
-    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=True, index=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id', ondelete='CASCADE'), nullable=True, index=True)
     titulo = db.Column(db.String(200), nullable=True)
     mensaje = db.Column(db.Text, nullable=True)
     leida = db.Column(db.Boolean, default=False, nullable=False, index=True)
@@ -32,18 +43,29 @@ class Notificacion(db.Model):
     fecha_envio = db.Column(db.DateTime, nullable=True)
     intentos = db.Column(db.Integer, default=0, nullable=False)
     error_mensaje = db.Column(db.Text, nullable=True)
+    # Agotó NOTIFICACIONES_MAX_INTENTOS: el barrido de reintentos ya no la envía
+    descartada = db.Column(db.Boolean, default=False, server_default=db.false(), nullable=False)
 
     # Campos de auditoría
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relaciones - Foreign Keys
-    solicitud_id = db.Column(db.Integer, db.ForeignKey('solicitudes.id'), nullable=True, index=True)
+    solicitud_id = db.Column(db.Integer, db.ForeignKey('solicitudes.id', ondelete='CASCADE'), nullable=True, index=True)
 
     # Índices compuestos
     __table_args__ = (
         Index('idx_notificacion_enviado_created', 'enviado', 'created_at'),
         Index('idx_notificacion_solicitud_tipo', 'solicitud_id', 'tipo'),
+        # Búsqueda en el panel de administración (pg_trgm)
+        Index('idx_notificacion_email_prefijo',
+              text('lower(destinatario_email) text_pattern_ops')).ddl_if(dialect='postgresql'),
+        Index('idx_notificacion_email_trgm', 'destinatario_email', postgresql_using='gin',
+              postgresql_ops={'destinatario_email': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+        Index('idx_notificacion_asunto_trgm', 'asunto', postgresql_using='gin',
+              postgresql_ops={'asunto': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+        Index('idx_notificacion_mensaje_trgm', 'mensaje', postgresql_using='gin',
+              postgresql_ops={'mensaje': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
     )
 
     def __repr__(self):
@@ -74,6 +96,8 @@ class Notificacion(db.Model):
             'destinatario_email': self.destinatario_email,
             'asunto': self.asunto,
             'enviado': self.enviado,
+            'intentos': self.intentos,
+            'descartada': self.descartada,
             'fecha_envio': self.fecha_envio.isoformat() if self.fecha_envio else None,
         }
 
@@ -82,6 +106,23 @@ class Notificacion(db.Model):
 
         return data
 
+    def serializar(self, proyeccion):
+        """
+        Convertir notificación a diccionario con los campos de una proyección.
+
+        Sin fields ni expand equivale a to_dict(include_relations=True).
+
+        Args:
+            proyeccion: Proyeccion de app.utils.campos
+
+        Returns:
+            dict: Campos pedidos y relaciones expandidas
+        """
+        data = serializar_campos(self, proyeccion.campos)
+        if 'solicitud' in proyeccion.expand:
+            data['solicitud'] = self.solicitud.to_dict() if self.solicitud else None
+        return data
+
     def marcar_como_enviado(self):
         """Marcar la notificación como enviada."""
         self.enviado = True
@@ -105,6 +146,11 @@ class Notificacion(db.Model):
         self.error_mensaje = error_mensaje
         self.updated_at = datetime.utcnow()
 
+    def descartar(self):
+        """Mover la notificación a la cola de descartadas (sin más reintentos)."""
+        self.descartada = True
+        self.updated_at = datetime.utcnow()
+
     @staticmethod
     def crear_notificacion_solicitud(solicitud, tipo, destinatario_email, destinatario_nombre=None):
         """
@@ -146,3 +192,11 @@ class Notificacion(db.Model):
         )
 
         return notificacion
+
+
+# Los índices trigram requieren la extensión pg_trgm
+event.listen(
+    Notificacion.__table__,
+    'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql')
+)
@@ -0,0 +1,61 @@
+"""Modelo de preferencias de notificación por usuario."""
+from datetime import datetime
+from app import db
+from sqlalchemy import UniqueConstraint
+
+
+CANALES_NOTIFICACION = ('ambos', 'email', 'app', 'ninguno')
+
+
+class PreferenciaNotificacion(db.Model):
+    """
+    Canal de entrega elegido por un usuario para un tipo de notificación.
+
+    Sin fila para un tipo se entrega por todos los canales (canal 'ambos').
+    Con resumen activo los emails del tipo no se envían al momento: la
+    notificación queda in-app y se incluye en el resumen diario por email.
+    """
+
+    __tablename__ = 'preferencias_notificacion'
+
+    id = db.Column(db.Integer, primary_key=True)
+    usuario_id = db.Column(
+        db.Integer,
+        db.ForeignKey('usuarios.id', ondelete='CASCADE'),
+        nullable=False
+    )
+    tipo = db.Column(
+        db.Enum('solicitud_creada', 'solicitud_aprobada', 'solicitud_rechazada',
+                'solicitud_actualizada', 'recordatorio', name='tipo_notificacion_enum'),
+        nullable=False
+    )
+    canal = db.Column(
+        db.Enum(*CANALES_NOTIFICACION, name='canal_notificacion_enum'),
+        nullable=False,
+        default='ambos'
+    )
+    resumen = db.Column(db.Boolean, default=False, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # La restricción única sirve también de índice por usuario
+    __table_args__ = (
+        UniqueConstraint('usuario_id', 'tipo', name='uq_preferencia_usuario_tipo'),
+    )
+
+    def __repr__(self):
+        """Representación de la preferencia."""
+        return f'<PreferenciaNotificacion usuario={self.usuario_id} {self.tipo}={self.canal}>'
+
+    def to_dict(self):
+        """
+        Convertir preferencia a diccionario.
+
+        Returns:
+            dict: Tipo, canal y resumen
+        """
+        return {
+            'tipo': self.tipo,
+            'canal': self.canal,
+            'resumen': self.resumen,
+        }
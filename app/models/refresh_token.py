@@ -0,0 +1,39 @@
+"""Modelo del almacén de refresh tokens."""
+from app import db
+from sqlalchemy import Index
+
+
+class RefreshToken(db.Model):
+    """
+    Refresh token emitido y aún no caducado.
+
+    No se guarda el token ni el jti en claro: la clave primaria es el SHA-256
+    del jti (32 bytes), de modo que la búsqueda al refrescar es por clave
+    primaria y una filtración de la tabla no permite reutilizar tokens.
+    Cada login abre una familia; las rotaciones heredan la familia y revocar
+    una sesión equivale a borrar su familia.
+    """
+
+    __tablename__ = 'refresh_tokens'
+
+    jti_hash = db.Column(db.LargeBinary(32), primary_key=True)
+    familia = db.Column(db.String(32), nullable=False)
+    usuario_id = db.Column(
+        db.Integer,
+        db.ForeignKey('usuarios.id', ondelete='CASCADE'),
+        nullable=False
+    )
+    expira_en = db.Column(db.DateTime, nullable=False)
+    # True cuando ya se rotó; presentarlo de nuevo indica robo del token
+    usado = db.Column(db.Boolean, default=False, nullable=False)
+
+    # Índices
+    __table_args__ = (
+        Index('idx_refresh_token_familia', 'familia'),
+        Index('idx_refresh_token_usuario', 'usuario_id'),
+        Index('idx_refresh_token_expira', 'expira_en'),
+    )
+
+    def __repr__(self):
+        """Representación del refresh token."""
+        return f'<RefreshToken familia={self.familia} usuario={self.usuario_id}>'
@@ -0,0 +1,48 @@
+"""Modelo de reglas de enrutamiento de aprobadores."""
+from datetime import datetime
+from app import db
+from sqlalchemy import Index, UniqueConstraint
+
+
+class ReglaAprobacion(db.Model):
+    """
+    Asignación de un aprobador a las solicitudes que cubre.
+
+    Una regla sin tipo cubre todos los tipos y una sin solicitante cubre a
+    todos los usuarios. Los emails de nueva solicitud y los recordatorios se
+    envían a los aprobadores de las reglas que coinciden con la solicitud.
+    """
+
+    __tablename__ = 'reglas_aprobacion'
+
+    id = db.Column(db.Integer, primary_key=True)
+    aprobador_id = db.Column(
+        db.Integer,
+        db.ForeignKey('usuarios.id', ondelete='CASCADE'),
+        nullable=False
+    )
+    tipo = db.Column(
+        db.Enum('compra', 'mantenimiento', 'soporte_tecnico', 'otro', name='tipo_solicitud_enum'),
+        nullable=True
+    )
+    solicitante_id = db.Column(
+        db.Integer,
+        db.ForeignKey('usuarios.id', ondelete='CASCADE'),
+        nullable=True
+    )
+    activa = db.Column(db.Boolean, default=True, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    aprobador = db.relationship('Usuario', foreign_keys=[aprobador_id], passive_deletes=True)
+    solicitante = db.relationship('Usuario', foreign_keys=[solicitante_id], passive_deletes=True)
+
+    # Índices
+    __table_args__ = (
+        UniqueConstraint('aprobador_id', 'tipo', 'solicitante_id', name='uq_regla_aprobacion'),
+        Index('idx_regla_aprobacion_tipo', 'tipo'),
+        Index('idx_regla_aprobacion_solicitante', 'solicitante_id'),
+    )
+
+    def __repr__(self):
+        """Representación de la regla."""
+        return f'<ReglaAprobacion aprobador={self.aprobador_id} tipo={self.tipo} solicitante={self.solicitante_id}>'
@@ -1,7 +1,35 @@
 """Modelo de Solicitud."""
 from datetime import datetime
 from app import db
-from sqlalchemy import Index
+from sqlalchemy import DDL, Index, event, text
+from sqlalchemy.orm import Session
+from app.utils.campos import serializar_campos
+
+
+# Expresión tsvector para búsqueda de texto completo (PostgreSQL).
+# Se usa tanto en el índice GIN como en las consultas para que el planner
+# pueda resolver la búsqueda con el índice.
+VECTOR_BUSQUEDA_SQL = (
+    "to_tsvector('spanish'::regconfig, "
+    "coalesce(titulo, '') || ' ' || coalesce(descripcion, ''))"
+)
+
+# Rango de prioridad (0 = más urgente) para la bandeja de aprobación. La misma
+# expresión se usa en el índice parcial y en las consultas.
+RANGO_PRIORIDAD_SQL = (
+    "CASE prioridad WHEN 'urgente' THEN 0 WHEN 'alta' THEN 1 "
+    "WHEN 'media' THEN 2 ELSE 3 END"
+)
+PENDIENTE_SQL = "estado = 'pendiente'"
+
+# Campos que la API puede devolver (?fields=) y relaciones expandibles
+# (?expand=), en el orden de to_dict
+CAMPOS_SOLICITUD = (
+    'id', 'tipo', 'titulo', 'descripcion', 'estado', 'prioridad', 'comentarios',
+    'fecha_requerida', 'usuario_id', 'aprobador_id', 'created_at', 'updated_at',
+    'fecha_aprobacion', 'version'
+)
+RELACIONES_SOLICITUD = ('usuario', 'aprobador')
 
 
 class Solicitud(db.Model):
@@ -35,17 +63,21 @@ class Solicitud(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     fecha_aprobacion = db.Column(db.DateTime, nullable=True)
+    # Secuencia de cambios (ver app.models.cambio): crece con cada alta o
+    # modificación y ordena el feed GET /api/solicitudes/cambios
+    version = db.Column(db.BigInteger, nullable=True)
 
     # Relaciones - Foreign Keys
-    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False, index=True)
-    aprobador_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id', ondelete='CASCADE'), nullable=False, index=True)
+    aprobador_id = db.Column(db.Integer, db.ForeignKey('usuarios.id', ondelete='SET NULL'), nullable=True)
 
     # Relaciones inversas
     notificaciones = db.relationship(
         'Notificacion',
         backref='solicitud',
         lazy='dynamic',
-        cascade='all, delete-orphan'
+        cascade='all, delete-orphan',
+        passive_deletes=True
     )
 
     # Índices compuestos
@@ -53,6 +85,25 @@ class Solicitud(db.Model):
         Index('idx_solicitud_usuario_estado', 'usuario_id', 'estado'),
         Index('idx_solicitud_tipo_estado', 'tipo', 'estado'),
         Index('idx_solicitud_created', 'created_at'),
+        # Recordatorios de vencimiento: pendientes por fecha requerida
+        Index('idx_solicitud_estado_fecha_requerida', 'estado', 'fecha_requerida'),
+        # ON DELETE SET NULL al eliminar un aprobador
+        Index('idx_solicitud_aprobador', 'aprobador_id'),
+        # Feed de cambios: recorrido por versión desde el cursor del cliente
+        Index('idx_solicitud_version', 'version', unique=True),
+        # Bandeja de aprobación: pendientes por prioridad y antigüedad
+        Index(
+            'idx_solicitud_bandeja',
+            # Entre paréntesis: PostgreSQL exige paréntesis en expresiones que no son funciones
+            text(f'({RANGO_PRIORIDAD_SQL})'), 'created_at', 'id',
+            postgresql_where=text(PENDIENTE_SQL),
+            sqlite_where=text(PENDIENTE_SQL)
+        ),
+        Index(
+            'idx_solicitud_busqueda',
+            text(VECTOR_BUSQUEDA_SQL),
+            postgresql_using='gin'
+        ).ddl_if(dialect='postgresql'),
     )
 
     def __repr__(self):
@@ -82,7 +133,8 @@ class Solicitud(db.Model):
             'aprobador_id': self.aprobador_id,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'fecha_aprobacion': self.fecha_aprobacion.isoformat() if self.fecha_aprobacion else None
+            'fecha_aprobacion': self.fecha_aprobacion.isoformat() if self.fecha_aprobacion else None,
+            'version': self.version
         }
 
         if include_relations:
@@ -91,6 +143,24 @@ class Solicitud(db.Model):
 
         return data
 
+    def serializar(self, proyeccion):
+        """
+        Convertir solicitud a diccionario con los campos de una proyección.
+
+        Sin fields ni expand equivale a to_dict(include_relations=True).
+
+        Args:
+            proyeccion: Proyeccion de app.utils.campos
+
+        Returns:
+            dict: Campos pedidos y relaciones expandidas
+        """
+        data = serializar_campos(self, proyeccion.campos)
+        for relacion in proyeccion.expand:
+            usuario = getattr(self, relacion)
+            data[relacion] = usuario.to_dict(include_email=False) if usuario else None
+        return data
+
     def cambiar_estado(self, nuevo_estado, aprobador_id=None, comentarios=None):
         """
         Cambiar el estado de la solicitud.
@@ -132,3 +202,52 @@ class Solicitud(db.Model):
     def requiere_atencion(self):
         """Verificar si la solicitud requiere atención urgente."""
         return self.prioridad in ['alta', 'urgente'] and self.estado == 'pendiente'
+
+# Índice FTS5 para SQLite (usado en tests y desarrollo local).
+# Tabla de contenido externo sincronizada mediante triggers.
+SQLITE_FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS solicitudes_fts
+    USING fts5(titulo, descripcion, content='solicitudes', content_rowid='id')
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS solicitudes_fts_ai AFTER INSERT ON solicitudes BEGIN
+        INSERT INTO solicitudes_fts(rowid, titulo, descripcion)
+        VALUES (new.id, new.titulo, new.descripcion);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS solicitudes_fts_ad AFTER DELETE ON solicitudes BEGIN
+        INSERT INTO solicitudes_fts(solicitudes_fts, rowid, titulo, descripcion)
+        VALUES ('delete', old.id, old.titulo, old.descripcion);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS solicitudes_fts_au AFTER UPDATE OF titulo, descripcion ON solicitudes BEGIN
+        INSERT INTO solicitudes_fts(solicitudes_fts, rowid, titulo, descripcion)
+        VALUES ('delete', old.id, old.titulo, old.descripcion);
+        INSERT INTO solicitudes_fts(rowid, titulo, descripcion)
+        VALUES (new.id, new.titulo, new.descripcion);
+    END
+    """,
+]
+
+for _sentencia in SQLITE_FTS_DDL:
+    event.listen(
+        Solicitud.__table__,
+        'after_create',
+        DDL(_sentencia).execute_if(dialect='sqlite')
+    )
+
+event.listen(
+    Solicitud.__table__,
+    'before_drop',
+    DDL('DROP TABLE IF EXISTS solicitudes_fts').execute_if(dialect='sqlite')
+)
+
+
+@event.listens_for(Session, 'before_flush')
+def versionar_solicitudes(session, flush_context, instances):
+    """Asignar versión a las solicitudes modificadas y registrar lápidas de las eliminadas."""
+    from app.models.cambio import registrar_cambios_sesion
+    registrar_cambios_sesion(session)
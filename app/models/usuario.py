@@ -1,7 +1,14 @@
 """Modelo de Usuario."""
 from datetime import datetime
-from app import db, bcrypt
-from sqlalchemy import Index
+from app import db
+from sqlalchemy import DDL, Index, event, text
+from app.utils.campos import serializar_campos
+
+
+# Campos que la API puede devolver (?fields=), en el orden de to_dict. Los
+# públicos son los que se incluyen al expandir el usuario de otro recurso.
+CAMPOS_USUARIO_PUBLICOS = ('id', 'nombre', 'apellido', 'rol', 'activo', 'created_at')
+CAMPOS_USUARIO = CAMPOS_USUARIO_PUBLICOS + ('email',)
 
 
 class Usuario(db.Model):
@@ -24,25 +31,36 @@ class Usuario(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    # Relaciones
+    # Relaciones (passive_deletes: el borrado en cascada lo hace la base de
+    # datos con ON DELETE, sin cargar las filas hijas en memoria)
     solicitudes = db.relationship(
         'Solicitud',
         foreign_keys='Solicitud.usuario_id',
         backref='usuario',
         lazy='dynamic',
-        cascade='all, delete-orphan'
+        cascade='all, delete-orphan',
+        passive_deletes=True
     )
 
     solicitudes_aprobadas = db.relationship(
         'Solicitud',
         foreign_keys='Solicitud.aprobador_id',
         backref='aprobador',
-        lazy='dynamic'
+        lazy='dynamic',
+        passive_deletes=True
     )
 
     # Índices compuestos
     __table_args__ = (
         Index('idx_usuario_rol_activo', 'rol', 'activo'),
+        # Búsqueda en el panel de administración (pg_trgm)
+        Index('idx_usuario_email_prefijo', text('lower(email) text_pattern_ops')).ddl_if(dialect='postgresql'),
+        Index('idx_usuario_email_trgm', 'email', postgresql_using='gin',
+              postgresql_ops={'email': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+        Index('idx_usuario_nombre_trgm', 'nombre', postgresql_using='gin',
+              postgresql_ops={'nombre': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+        Index('idx_usuario_apellido_trgm', 'apellido', postgresql_using='gin',
+              postgresql_ops={'apellido': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
     )
 
     def __repr__(self):
@@ -51,12 +69,13 @@ class Usuario(db.Model):
 
     def set_password(self, password):
         """
-        Hash de la contraseña usando bcrypt.
+        Hash de la contraseña usando bcrypt (coste PASSWORD_BCRYPT_ROUNDS).
 
         Args:
             password: Contraseña en texto plano
         """
-        self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        from app.services.password_service import generar_hash
+        self.password_hash = generar_hash(password)
 
     def check_password(self, password):
         """
@@ -68,7 +87,8 @@ class Usuario(db.Model):
         Returns:
             bool: True si la contraseña es correcta
         """
-        return bcrypt.check_password_hash(self.password_hash, password)
+        from app.services.password_service import verificar_password
+        return verificar_password(self.password_hash, password)
 
     def to_dict(self, include_email=True):
         """
@@ -94,6 +114,18 @@ class Usuario(db.Model):
 
         return data
 
+    def serializar(self, proyeccion):
+        """
+        Convertir usuario a diccionario con los campos de una proyección.
+
+        Args:
+            proyeccion: Proyeccion de app.utils.campos
+
+        Returns:
+            dict: Campos pedidos
+        """
+        return serializar_campos(self, proyeccion.campos)
+
     @property
     def nombre_completo(self):
         """Obtener nombre completo."""
@@ -115,3 +147,11 @@ class Usuario(db.Model):
     def puede_aprobar(self):
         """Verificar si el usuario puede aprobar solicitudes."""
         return self.rol in ['jefe', 'administrador']
+
+
+# Los índices trigram requieren la extensión pg_trgm
+event.listen(
+    Usuario.__table__,
+    'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql')
+)
@@ -1,22 +1,29 @@
 """Blueprint de autenticación y gestión de usuarios."""
 from flask import Blueprint, request
-from flask_jwt_extended import jwt_required
+from flask_jwt_extended import get_jwt, jwt_required
 from app import db
-from app.models.usuario import Usuario
+from app.models.usuario import Usuario, CAMPOS_USUARIO
 from app.services.auth_service import (
     crear_tokens,
     registrar_usuario,
     autenticar_usuario,
+    refrescar_tokens,
     cambiar_password,
     obtener_usuario_actual,
     rol_requerido
 )
+from app.services.limite_login_service import comprobar_intento_login, registrar_login_exitoso
+from app.services.refresh_token_service import revocar_familia, revocar_sesiones_usuario
+from app.services.eliminacion_service import eliminacion_en_segundo_plano, registrar_cambios_eliminacion
+from app.services.preferencias_service import guardar_preferencias, invalidar_preferencias, obtener_preferencias
 from app.schemas import (
     UsuarioRegistroSchema,
     UsuarioLoginSchema,
     UsuarioUpdateSchema,
+    PerfilUpdateSchema,
     CambiarPasswordSchema
 )
+from app.utils.campos import leer_proyeccion, opciones_carga
 from app.utils.validators import validate_request
 from app.utils.responses import success_response, created_response, paginated_response, no_content_response
 from app.exceptions import (
@@ -25,7 +32,8 @@ from app.exceptions import (
     InvalidCredentialsError,
     InsufficientPermissionsError,
     ValidationError,
-    DatabaseError
+    DatabaseError,
+    TooManyRequestsError
 )
 
 auth_bp = Blueprint('auth', __name__)
@@ -141,15 +149,29 @@ def login():
         description: Credenciales incorrectas o usuario inactivo
       422:
         description: Errores de validación en los datos
+      429:
+        description: Demasiados intentos; reintentar tras Retry-After segundos
     """
     data = request.validated_data
 
+    # Limitar intentos antes de pagar la verificación bcrypt
+    espera = comprobar_intento_login(data['email'], request.remote_addr, origen='api')
+    if espera:
+        error = TooManyRequestsError(
+            message='Demasiados intentos de inicio de sesión, inténtalo más tarde',
+            error_code='LOGIN_LIMITADO'
+        )
+        error.retry_after = espera
+        raise error
+
     # Autenticar usuario
     usuario, error = autenticar_usuario(data['email'], data['password'])
 
     if error:
         raise InvalidCredentialsError(message=error)
 
+    registrar_login_exitoso(data['email'])
+
     # Crear tokens
     tokens = crear_tokens(usuario)
 
@@ -163,6 +185,60 @@ def login():
     )
 
 
+@auth_bp.route('/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refrescar():
+    """
+    Obtener un nuevo par de tokens a partir del refresh token
+    ---
+    tags:
+      - Autenticación
+    security:
+      - Bearer: []
+    description: |
+      Enviar el refresh token en la cabecera Authorization. Cada refresh
+      token solo puede usarse una vez; reutilizar uno ya rotado revoca la
+      sesión completa.
+    responses:
+      200:
+        description: Nuevos access y refresh token
+      401:
+        description: Refresh token inválido, expirado o revocado
+    """
+    tokens, error = refrescar_tokens(get_jwt())
+
+    if error:
+        raise InvalidCredentialsError(message=error, error_code='REFRESH_TOKEN_REVOCADO')
+
+    return success_response(data=tokens, message='Tokens renovados')
+
+
+@auth_bp.route('/logout', methods=['POST'])
+@jwt_required(refresh=True)
+def logout():
+    """
+    Cerrar la sesión actual revocando su refresh token
+    ---
+    tags:
+      - Autenticación
+    security:
+      - Bearer: []
+    description: Enviar el refresh token en la cabecera Authorization.
+    responses:
+      204:
+        description: Sesión cerrada
+      401:
+        description: Refresh token inválido o expirado
+    """
+    familia = get_jwt().get('fam')
+
+    if familia:
+        revocar_familia(familia)
+        db.session.commit()
+
+    return no_content_response()
+
+
 @auth_bp.route('/perfil', methods=['GET'])
 @jwt_required()
 def obtener_perfil():
@@ -175,7 +251,7 @@ def obtener_perfil():
       - Bearer: []
     responses:
       200:
-        description: Datos del usuario
+        description: Datos del usuario y sus preferencias de notificación
       401:
         description: Token JWT inválido o expirado
       404:
@@ -187,13 +263,16 @@ def obtener_perfil():
         raise UserNotFoundError()
 
     return success_response(
-        data={'usuario': usuario.to_dict()}
+        data={
+            'usuario': usuario.to_dict(),
+            'preferencias_notificacion': obtener_preferencias(usuario.id)
+        }
     )
 
 
 @auth_bp.route('/perfil', methods=['PUT'])
 @jwt_required()
-@validate_request(UsuarioUpdateSchema)
+@validate_request(PerfilUpdateSchema)
 def actualizar_perfil():
     """
     Actualizar perfil del usuario autenticado
@@ -214,6 +293,21 @@ def actualizar_perfil():
             apellido:
               type: string
               example: Pérez
+            preferencias_notificacion:
+              type: array
+              description: Canal (ambos, email, app, ninguno) y resumen diario por tipo
+              items:
+                type: object
+                properties:
+                  tipo:
+                    type: string
+                    example: solicitud_creada
+                  canal:
+                    type: string
+                    example: app
+                  resumen:
+                    type: boolean
+                    example: false
     responses:
       200:
         description: Perfil actualizado exitosamente
@@ -240,11 +334,17 @@ def actualizar_perfil():
         usuario.nombre = data['nombre']
     if 'apellido' in data:
         usuario.apellido = data['apellido']
+    if 'preferencias_notificacion' in data:
+        guardar_preferencias(usuario.id, data['preferencias_notificacion'])
 
     try:
         db.session.commit()
+        invalidar_preferencias(usuario.id)
         return success_response(
-            data={'usuario': usuario.to_dict()},
+            data={
+                'usuario': usuario.to_dict(),
+                'preferencias_notificacion': obtener_preferencias(usuario.id)
+            },
             message='Perfil actualizado exitosamente'
         )
     except Exception as e:
@@ -343,9 +443,15 @@ def listar_usuarios():
         type: integer
         default: 10
         description: Items por página (máximo 100)
+      - in: query
+        name: fields
+        type: string
+        description: Campos a devolver separados por comas (por defecto todos)
     responses:
       200:
         description: Lista de usuarios con metadata de paginación
+      400:
+        description: Campo no válido
       401:
         description: Token JWT inválido o expirado
       403:
@@ -356,9 +462,10 @@ def listar_usuarios():
     activo = request.args.get('activo')
     page = request.args.get('page', 1, type=int)
     per_page = min(request.args.get('per_page', 10, type=int), 100)
+    proyeccion = leer_proyeccion(CAMPOS_USUARIO)
 
-    # Construir query
-    query = Usuario.query
+    # Construir query (solo las columnas pedidas)
+    query = Usuario.query.options(*opciones_carga(Usuario, proyeccion))
 
     if rol:
         query = query.filter_by(rol=rol)
@@ -371,7 +478,7 @@ def listar_usuarios():
     paginacion = query.paginate(page=page, per_page=per_page, error_out=False)
 
     return paginated_response(
-        items=[usuario.to_dict() for usuario in paginacion.items],
+        items=[usuario.serializar(proyeccion) for usuario in paginacion.items],
         total=paginacion.total,
         page=page,
         per_page=per_page
@@ -395,9 +502,15 @@ def obtener_usuario(usuario_id):
         type: integer
         required: true
         description: ID del usuario
+      - in: query
+        name: fields
+        type: string
+        description: Campos a devolver separados por comas (por defecto todos)
     responses:
       200:
         description: Datos del usuario
+      400:
+        description: Campo no válido
       401:
         description: Token JWT inválido o expirado
       403:
@@ -405,12 +518,13 @@ def obtener_usuario(usuario_id):
       404:
         description: Usuario no encontrado
     """
-    usuario = Usuario.query.get(usuario_id)
+    proyeccion = leer_proyeccion(CAMPOS_USUARIO)
+    usuario = Usuario.query.options(*opciones_carga(Usuario, proyeccion)).get(usuario_id)
 
     if not usuario:
         raise UserNotFoundError()
 
-    return success_response(data={'usuario': usuario.to_dict()})
+    return success_response(data={'usuario': usuario.serializar(proyeccion)})
 
 
 @auth_bp.route('/usuarios/<int:usuario_id>', methods=['PUT'])
@@ -481,6 +595,8 @@ def actualizar_usuario(usuario_id):
         usuario.rol = data['rol']
     if 'activo' in data:
         usuario.activo = data['activo']
+        if not usuario.activo:
+            revocar_sesiones_usuario(usuario.id)
 
     try:
         db.session.commit()
@@ -504,6 +620,11 @@ def eliminar_usuario(usuario_id):
       - Usuarios
     security:
       - Bearer: []
+    description: |
+      Las solicitudes y notificaciones del usuario se eliminan en cascada en
+      la base de datos. Si arrastra más de USUARIOS_ELIMINACION_SINCRONA_MAX
+      filas, el usuario se desactiva y la eliminación se hace en segundo plano
+      por lotes; el progreso se consulta en /usuarios/eliminaciones/{tarea_id}.
     parameters:
       - in: path
         name: usuario_id
@@ -511,6 +632,8 @@ def eliminar_usuario(usuario_id):
         required: true
         description: ID del usuario a eliminar
     responses:
+      202:
+        description: Usuario desactivado y eliminación en curso en segundo plano
       204:
         description: Usuario eliminado exitosamente (sin contenido)
       401:
@@ -528,9 +651,112 @@ def eliminar_usuario(usuario_id):
         raise UserNotFoundError()
 
     try:
+        if eliminacion_en_segundo_plano(usuario.id):
+            # Sin acceso desde ya; el borrado de los datos va por lotes
+            usuario.activo = False
+            revocar_sesiones_usuario(usuario.id)
+            db.session.commit()
+
+            from app.tasks.mantenimiento_tasks import eliminar_usuario as eliminar_usuario_task
+            tarea = eliminar_usuario_task.delay(usuario.id)
+
+            return success_response(
+                data={'tarea_id': tarea.id, 'usuario_id': usuario.id},
+                message='Usuario desactivado; la eliminación continúa en segundo plano',
+                status_code=202
+            )
+
+        # passive_deletes: ON DELETE CASCADE borra solicitudes y notificaciones
+        registrar_cambios_eliminacion(usuario.id)
         db.session.delete(usuario)
         db.session.commit()
         return no_content_response()
     except Exception as e:
         db.session.rollback()
         raise DatabaseError(message='Error al eliminar usuario', details={'error': str(e)})
+
+
+@auth_bp.route('/usuarios/eliminaciones/<tarea_id>', methods=['GET'])
+@jwt_required()
+@rol_requerido('administrador')
+def progreso_eliminacion_usuario(tarea_id):
+    """
+    Consultar el progreso de una eliminación de usuario en segundo plano
+    ---
+    tags:
+      - Usuarios
+    security:
+      - Bearer: []
+    parameters:
+      - in: path
+        name: tarea_id
+        type: string
+        required: true
+        description: ID de la tarea devuelto al eliminar el usuario
+    responses:
+      200:
+        description: Estado de la tarea (PENDING, PROGRESS, RETRY, SUCCESS, FAILURE) y filas eliminadas
+      401:
+        description: Token JWT inválido o expirado
+      403:
+        description: Sin permisos
+    """
+    from app.tasks.mantenimiento_tasks import eliminar_usuario as eliminar_usuario_task
+
+    resultado = eliminar_usuario_task.AsyncResult(tarea_id)
+    progreso = resultado.info if isinstance(resultado.info, dict) else None
+
+    return success_response(data={
+        'tarea_id': tarea_id,
+        'estado': resultado.state,
+        'progreso': progreso,
+        'error': str(resultado.info) if resultado.failed() else None
+    })
+
+
+@auth_bp.route('/usuarios/<int:usuario_id>/sesiones', methods=['DELETE'])
+@jwt_required()
+@rol_requerido('administrador')
+def revocar_sesiones(usuario_id):
+    """
+    Cerrar todas las sesiones de un usuario (solo para administradores)
+    ---
+    tags:
+      - Usuarios
+    security:
+      - Bearer: []
+    description: |
+      Revoca todos los refresh tokens del usuario. Los access tokens ya
+      emitidos siguen siendo válidos hasta su expiración.
+    parameters:
+      - in: path
+        name: usuario_id
+        type: integer
+        required: true
+        description: ID del usuario
+    responses:
+      200:
+        description: Sesiones revocadas
+      401:
+        description: Token JWT inválido o expirado
+      403:
+        description: Sin permisos para revocar sesiones
+      404:
+        description: Usuario no encontrado
+    """
+    usuario = Usuario.query.get(usuario_id)
+
+    if not usuario:
+        raise UserNotFoundError()
+
+    try:
+        revocados = revocar_sesiones_usuario(usuario.id)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        raise DatabaseError(message='Error al revocar sesiones', details={'error': str(e)})
+
+    return success_response(
+        data={'tokens_revocados': revocados},
+        message='Sesiones revocadas exitosamente'
+    )
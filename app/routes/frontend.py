@@ -3,6 +3,8 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash,
 from functools import wraps
 from app.models.usuario import Usuario
 from app.models.solicitud import Solicitud
+from app.services.password_service import verificar_login
+from app.services.limite_login_service import comprobar_intento_login, registrar_login_exitoso
 from app import db, bcrypt
 from datetime import datetime
 
@@ -43,6 +45,12 @@ def login():
             flash('Por favor ingresa email y contraseña.', 'error')
             return render_template('frontend/login.html')
 
+        # Limitar intentos antes de pagar la verificación bcrypt
+        espera = comprobar_intento_login(email, request.remote_addr, origen='frontend')
+        if espera:
+            flash('Demasiados intentos de inicio de sesión. Inténtalo de nuevo en unos minutos.', 'error')
+            return render_template('frontend/login.html'), 429, {'Retry-After': str(espera)}
+
         user = Usuario.query.filter_by(email=email).first()
 
         if not user:
@@ -53,11 +61,12 @@ def login():
             flash('Tu cuenta está desactivada. Contacta al administrador.', 'error')
             return render_template('frontend/login.html')
 
-        if not user.check_password(password):
+        if not verificar_login(user, password):
             flash('Email o contraseña incorrectos.', 'error')
             return render_template('frontend/login.html')
 
         # Login exitoso
+        registrar_login_exitoso(email)
         session['frontend_user_id'] = user.id
         session['frontend_user_email'] = user.email
         session['frontend_user_rol'] = user.rol
@@ -177,8 +186,8 @@ def nueva_solicitud():
 
         # Enviar notificación asíncrona
         try:
-            from app.tasks.email_tasks import enviar_email_solicitud
-            enviar_email_solicitud.delay(nueva.id, 'solicitud_creada')
+            from app.tasks.email_tasks import encolar_email_solicitud
+            encolar_email_solicitud(nueva, 'solicitud_creada')
         except Exception as e:
             print(f"Error enviando notificación: {e}")
 
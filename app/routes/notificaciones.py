@@ -1,14 +1,51 @@
 """Blueprint de gestión de notificaciones."""
+from datetime import datetime
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
+from sqlalchemy import tuple_
 from app import db
-from app.models.notificacion import Notificacion
-from app.models.solicitud import Solicitud
+from app.models.notificacion import Notificacion, CAMPOS_NOTIFICACION, RELACIONES_NOTIFICACION
+from app.models.solicitud import Solicitud, CAMPOS_SOLICITUD
+from app.exceptions import BadRequestError
 from app.services.auth_service import obtener_usuario_actual, rol_requerido
 from app.tasks.email_tasks import reenviar_notificacion
+from app.utils.campos import leer_proyeccion, opciones_carga
+from app.utils.cursores import codificar_cursor, decodificar_cursor
 
 notificaciones_bp = Blueprint('notificaciones', __name__)
 
+# Al expandir la solicitud se devuelve con Solicitud.to_dict()
+RELACIONES_CARGA = {'solicitud': CAMPOS_SOLICITUD}
+
+
+def leer_proyeccion_notificaciones():
+    """
+    Leer ?fields= y ?expand= de un endpoint de notificaciones.
+
+    Sin expand se incluye la solicitud, como hasta ahora.
+
+    Returns:
+        Proyeccion: Campos y relaciones a devolver
+
+    Raises:
+        BadRequestError: Campo o relación no válidos (el endpoint responde 400)
+    """
+    return leer_proyeccion(CAMPOS_NOTIFICACION, RELACIONES_NOTIFICACION, expand_defecto=RELACIONES_NOTIFICACION)
+
+
+def opciones_notificaciones(proyeccion, necesarias=()):
+    """
+    Opciones de carga de Notificacion para una proyección.
+
+    Args:
+        proyeccion: Proyeccion de leer_proyeccion_notificaciones
+        necesarias: Columnas que usa el endpoint aunque no se devuelvan
+
+    Returns:
+        list: Opciones para query.options()
+    """
+    return opciones_carga(Notificacion, proyeccion, RELACIONES_CARGA, necesarias)
+
 
 @notificaciones_bp.route('', methods=['GET'])
 @jwt_required()
@@ -25,11 +62,18 @@ def listar_notificaciones():
         - solicitud_id (int, opcional): Filtrar por solicitud
         - page (int, opcional): Número de página (por defecto 1)
         - per_page (int, opcional): Items por página (por defecto 10, máximo 100)
+        - fields (str, opcional): Campos a devolver separados por comas (por defecto todos)
+        - expand (str, opcional): Relaciones a incluir: solicitud (por defecto incluida)
 
     Returns:
         200: Lista de notificaciones
+        400: Campo o relación no válidos
     """
     usuario = obtener_usuario_actual()
+    try:
+        proyeccion = leer_proyeccion_notificaciones()
+    except BadRequestError as e:
+        return jsonify({'error': e.message}), 400
 
     # Obtener parámetros de query
     tipo = request.args.get('tipo')
@@ -39,7 +83,7 @@ def listar_notificaciones():
     per_page = min(request.args.get('per_page', 10, type=int), 100)
 
     # Construir query base - filtrar por usuario_id
-    query = Notificacion.query.filter_by(usuario_id=usuario.id)
+    query = Notificacion.query.options(*opciones_notificaciones(proyeccion)).filter_by(usuario_id=usuario.id)
 
     # Filtros adicionales
     if tipo:
@@ -57,7 +101,7 @@ def listar_notificaciones():
     paginacion = query.paginate(page=page, per_page=per_page, error_out=False)
 
     return jsonify({
-        'notificaciones': [notif.to_dict(include_relations=True) for notif in paginacion.items],
+        'notificaciones': [notif.serializar(proyeccion) for notif in paginacion.items],
         'total': paginacion.total,
         'pages': paginacion.pages,
         'current_page': page,
@@ -74,13 +118,28 @@ def obtener_notificacion(notificacion_id):
     Headers:
         - Authorization: Bearer <access_token>
 
+    Query params:
+        - fields (str, opcional): Campos a devolver separados por comas (por defecto todos)
+        - expand (str, opcional): Relaciones a incluir: solicitud (por defecto incluida)
+
     Returns:
         200: Datos de la notificación
+        400: Campo o relación no válidos
         403: Sin permisos
         404: Notificación no encontrada
     """
     usuario = obtener_usuario_actual()
-    notificacion = Notificacion.query.get(notificacion_id)
+    try:
+        proyeccion = leer_proyeccion_notificaciones()
+    except BadRequestError as e:
+        return jsonify({'error': e.message}), 400
+
+    # usuario_id se necesita para comprobar los permisos
+    notificacion = (
+        Notificacion.query
+        .options(*opciones_notificaciones(proyeccion, ('usuario_id',)))
+        .get(notificacion_id)
+    )
 
     if not notificacion:
         return jsonify({'error': 'Notificación no encontrada'}), 404
@@ -89,7 +148,7 @@ def obtener_notificacion(notificacion_id):
     if notificacion.usuario_id != usuario.id:
         return jsonify({'error': 'No tienes permisos para ver esta notificación'}), 403
 
-    return jsonify({'notificacion': notificacion.to_dict(include_relations=True)}), 200
+    return jsonify({'notificacion': notificacion.serializar(proyeccion)}), 200
 
 
 @notificaciones_bp.route('/<int:notificacion_id>/marcar-leida', methods=['PATCH'])
@@ -167,21 +226,56 @@ def listar_notificaciones_pendientes():
 
     Query params:
         - max_intentos (int, opcional): Filtrar por máximo de intentos (por defecto 3)
+        - descartadas (bool, opcional): Listar las descartadas en lugar de las pendientes
+        - cursor (str, opcional): Cursor devuelto en siguiente_cursor
+        - per_page (int, opcional): Items por página (por defecto 20, máximo 100)
+        - fields (str, opcional): Campos a devolver separados por comas (por defecto todos)
+        - expand (str, opcional): Relaciones a incluir: solicitud (por defecto incluida)
 
     Returns:
-        200: Lista de notificaciones pendientes
+        200: Página de notificaciones pendientes y cursor de la siguiente
+        400: Cursor inválido, campo o relación no válidos
     """
+    try:
+        proyeccion = leer_proyeccion_notificaciones()
+    except BadRequestError as e:
+        return jsonify({'error': e.message}), 400
     max_intentos = request.args.get('max_intentos', 3, type=int)
+    descartadas = request.args.get('descartadas', 'false').lower() == 'true'
+    cursor = request.args.get('cursor')
+    per_page = max(1, min(request.args.get('per_page', 20, type=int), 100))
 
-    # Notificaciones no enviadas con menos de X intentos
-    notificaciones = Notificacion.query.filter(
+    # Notificaciones no enviadas con menos de X intentos, por el índice (enviado, created_at)
+    # created_at forma parte del cursor aunque no se pida
+    query = Notificacion.query.options(*opciones_notificaciones(proyeccion, ('created_at',))).filter(
         Notificacion.enviado == False,
-        Notificacion.intentos < max_intentos
-    ).order_by(Notificacion.created_at.desc()).all()
+        Notificacion.descartada == descartadas
+    )
+    if not descartadas:
+        query = query.filter(Notificacion.intentos < max_intentos)
+
+    if cursor:
+        try:
+            ultimo = decodificar_cursor(cursor, (datetime, int))
+        except ValueError:
+            return jsonify({'error': 'Cursor inválido'}), 400
+        query = query.filter(tuple_(Notificacion.created_at, Notificacion.id) < tuple_(*ultimo))
+
+    notificaciones = (
+        query.order_by(Notificacion.created_at.desc(), Notificacion.id.desc())
+        .limit(per_page + 1)
+        .all()
+    )
+
+    siguiente_cursor = None
+    if len(notificaciones) > per_page:
+        notificaciones = notificaciones[:per_page]
+        siguiente_cursor = codificar_cursor(notificaciones[-1].created_at, notificaciones[-1].id)
 
     return jsonify({
-        'notificaciones': [notif.to_dict(include_relations=True) for notif in notificaciones],
-        'total': len(notificaciones)
+        'notificaciones': [notif.serializar(proyeccion) for notif in notificaciones],
+        'siguiente_cursor': siguiente_cursor,
+        'per_page': per_page
     }), 200
 
 
@@ -215,10 +309,16 @@ def obtener_estadisticas_notificaciones():
         Notificacion.intentos > 0
     ).count()
 
+    descartadas = Notificacion.query.filter(
+        Notificacion.enviado == False,
+        Notificacion.descartada == True
+    ).count()
+
     return jsonify({
         'total': total,
         'enviadas': enviadas,
         'pendientes': pendientes,
         'con_errores': con_errores,
+        'descartadas': descartadas,
         'por_tipo': por_tipo
     }), 200
@@ -0,0 +1,97 @@
+"""Blueprint de utilidades de sistema (solo administradores)."""
+from flask import Blueprint, Response, current_app, jsonify, request, url_for
+from flask_jwt_extended import jwt_required
+from app.services.auth_service import rol_requerido
+from app.utils.perfilador import directorio_por_defecto, iniciar_sesion, obtener_resultado
+
+sistema_bp = Blueprint('sistema', __name__)
+
+
+def _directorio_perfilador():
+    """Directorio compartido del perfilador."""
+    return current_app.config.get('PERFILADOR_DIR') or directorio_por_defecto()
+
+
+@sistema_bp.route('/perfilador', methods=['POST'])
+@jwt_required()
+@rol_requerido('administrador')
+def iniciar_perfilado():
+    """
+    Armar una sesión de perfilado por muestreo (solo administradores).
+
+    Todos los workers que atiendan requests durante la ventana participan.
+    El resultado se obtiene con GET /api/sistema/perfilador/<id> al terminar.
+
+    Headers:
+        - Authorization: Bearer <access_token>
+
+    Body:
+        {
+            "segundos": 10,
+            "ruta": "^/api/solicitudes",   // opcional; sin ruta se muestrea el worker completo
+            "formato": "collapsed",        // collapsed | pstats (pstats requiere ruta)
+            "intervalo_ms": 5
+        }
+
+    Returns:
+        202: Sesión armada
+        400: Parámetros no válidos
+        404: Perfilador deshabilitado
+    """
+    if not current_app.config.get('PERFILADOR_HABILITADO', True):
+        return jsonify({'error': 'El perfilador está deshabilitado'}), 404
+
+    data = request.get_json(silent=True) or {}
+
+    try:
+        sesion = iniciar_sesion(
+            _directorio_perfilador(),
+            segundos=float(data.get('segundos', 10)),
+            ruta=data.get('ruta') or None,
+            formato=data.get('formato', 'collapsed'),
+            intervalo_ms=int(data.get('intervalo_ms', 5))
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({
+        'message': 'Sesión de perfilado iniciada',
+        'sesion': sesion,
+        'resultado': url_for('sistema.obtener_perfilado', sesion_id=sesion['id'])
+    }), 202
+
+
+@sistema_bp.route('/perfilador/<sesion_id>', methods=['GET'])
+@jwt_required()
+@rol_requerido('administrador')
+def obtener_perfilado(sesion_id):
+    """
+    Descargar el resultado de una sesión de perfilado (solo administradores).
+
+    Headers:
+        - Authorization: Bearer <access_token>
+
+    Returns:
+        200: Pilas colapsadas (text/plain) o volcado pstats (binario)
+        202: La sesión sigue en curso
+        404: Sesión no encontrada o sin muestras
+    """
+    estado, sesion, contenido = obtener_resultado(_directorio_perfilador(), sesion_id)
+
+    if estado == 'no_encontrada':
+        return jsonify({'error': 'Sesión de perfilado no encontrada'}), 404
+
+    if estado == 'en_curso':
+        return jsonify({'message': 'La sesión de perfilado sigue en curso', 'sesion': sesion}), 202
+
+    if estado == 'sin_muestras':
+        return jsonify({'error': 'La sesión no capturó muestras', 'sesion': sesion}), 404
+
+    if sesion['formato'] == 'pstats':
+        return Response(
+            contenido,
+            mimetype='application/octet-stream',
+            headers={'Content-Disposition': f'attachment; filename=perfil-{sesion_id}.pstats'}
+        )
+
+    return Response(contenido, mimetype='text/plain')
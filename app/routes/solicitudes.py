@@ -2,14 +2,79 @@
 from datetime import datetime
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
+from sqlalchemy import literal_column, text, tuple_
 from app import db
-from app.models.solicitud import Solicitud
-from app.models.usuario import Usuario
+from app.models.solicitud import (
+    Solicitud, CAMPOS_SOLICITUD, RELACIONES_SOLICITUD, RANGO_PRIORIDAD_SQL, PENDIENTE_SQL
+)
+from app.models.usuario import Usuario, CAMPOS_USUARIO_PUBLICOS
+from app.models.archivo import SolicitudArchivada
+from app.exceptions import BadRequestError
 from app.services.auth_service import obtener_usuario_actual, rol_requerido
-from app.tasks.email_tasks import enviar_email_solicitud
+from app.services.busqueda_service import buscar_solicitudes
+from app.services.cambios_service import obtener_cambios, version_purgada
+from app.services.preferencias_service import entrega
+from app.services.retencion_service import paginar_con_archivadas
+from app.tasks.email_tasks import encolar_email_solicitud
+from app.utils.campos import leer_proyeccion, opciones_carga
+from app.utils.cursores import codificar_cursor, decodificar_cursor
 
 solicitudes_bp = Blueprint('solicitudes', __name__)
 
+# Al expandir usuario o aprobador solo se cargan las columnas que se devuelven
+RELACIONES_CARGA = {relacion: CAMPOS_USUARIO_PUBLICOS for relacion in RELACIONES_SOLICITUD}
+
+
+def leer_proyeccion_solicitudes():
+    """
+    Leer ?fields= y ?expand= de un endpoint de solicitudes.
+
+    Sin expand se incluyen usuario y aprobador, como hasta ahora.
+
+    Returns:
+        Proyeccion: Campos y relaciones a devolver
+
+    Raises:
+        BadRequestError: Campo o relación no válidos (el endpoint responde 400)
+    """
+    return leer_proyeccion(CAMPOS_SOLICITUD, RELACIONES_SOLICITUD, expand_defecto=RELACIONES_SOLICITUD)
+
+
+def opciones_solicitudes(modelo, proyeccion, necesarias=()):
+    """
+    Opciones de carga de Solicitud (o SolicitudArchivada) para una proyección.
+
+    Args:
+        modelo: Solicitud o SolicitudArchivada
+        proyeccion: Proyeccion de leer_proyeccion_solicitudes
+        necesarias: Columnas que usa el endpoint aunque no se devuelvan
+
+    Returns:
+        list: Opciones para query.options()
+    """
+    return opciones_carga(modelo, proyeccion, RELACIONES_CARGA, necesarias)
+
+
+def aplicar_visibilidad(query, usuario, usuario_id=None):
+    """
+    Restringir una query de solicitudes según el rol del usuario.
+
+    Args:
+        query: Query base de Solicitud
+        usuario: Usuario autenticado
+        usuario_id: Filtro opcional por usuario (solo jefe/admin)
+
+    Returns:
+        Query filtrada
+    """
+    # Si no es jefe/admin, solo ver sus propias solicitudes
+    if not usuario.puede_aprobar:
+        return query.filter_by(usuario_id=usuario.id)
+    if usuario_id:
+        # Jefe/admin puede filtrar por usuario específico
+        return query.filter_by(usuario_id=usuario_id)
+    return query
+
 
 @solicitudes_bp.route('', methods=['POST'])
 @jwt_required()
@@ -73,7 +138,7 @@ def crear_solicitud():
         db.session.commit()
 
         # Enviar notificación por email (asíncrono)
-        enviar_email_solicitud.delay(solicitud.id, 'solicitud_creada')
+        encolar_email_solicitud(solicitud, 'solicitud_creada')
 
         return jsonify({
             'message': 'Solicitud creada exitosamente',
@@ -98,52 +163,284 @@ def listar_solicitudes():
         - estado (str, opcional): Filtrar por estado
         - prioridad (str, opcional): Filtrar por prioridad
         - usuario_id (int, opcional): Filtrar por usuario (solo jefe/admin)
+        - incluir_archivadas (bool, opcional): Incluir solicitudes archivadas (por defecto false)
         - page (int, opcional): Número de página (por defecto 1)
         - per_page (int, opcional): Items por página (por defecto 10, máximo 100)
+        - fields (str, opcional): Campos a devolver separados por comas (por defecto todos)
+        - expand (str, opcional): Relaciones a incluir: usuario, aprobador (por defecto ambas)
 
     Returns:
         200: Lista de solicitudes
+        400: Campo o relación no válidos
     """
     usuario = obtener_usuario_actual()
+    try:
+        proyeccion = leer_proyeccion_solicitudes()
+    except BadRequestError as e:
+        return jsonify({'error': e.message}), 400
 
     # Obtener parámetros de query
     tipo = request.args.get('tipo')
     estado = request.args.get('estado')
     prioridad = request.args.get('prioridad')
     usuario_id = request.args.get('usuario_id', type=int)
+    incluir_archivadas = request.args.get('incluir_archivadas', 'false').lower() in ['true', '1', 'yes']
     page = request.args.get('page', 1, type=int)
     per_page = min(request.args.get('per_page', 10, type=int), 100)
 
-    # Construir query base
-    query = Solicitud.query
+    def aplicar_filtros(query):
+        """Aplicar los filtros del listado (comunes a activas y archivadas)."""
+        query = aplicar_visibilidad(query, usuario, usuario_id)
+        if tipo:
+            query = query.filter_by(tipo=tipo)
+        if estado:
+            query = query.filter_by(estado=estado)
+        if prioridad:
+            query = query.filter_by(prioridad=prioridad)
+        return query
+
+    # Construir query base con reglas de visibilidad por rol
+    query = aplicar_filtros(Solicitud.query)
+
+    if incluir_archivadas:
+        items, total = paginar_con_archivadas(
+            query,
+            aplicar_filtros(SolicitudArchivada.query),
+            page,
+            per_page,
+            opciones_activas=opciones_solicitudes(Solicitud, proyeccion),
+            opciones_archivadas=opciones_solicitudes(SolicitudArchivada, proyeccion, ('archivado_at',))
+        )
+
+        return jsonify({
+            'solicitudes': [sol.serializar(proyeccion) for sol in items],
+            'total': total,
+            'pages': (total + per_page - 1) // per_page,
+            'current_page': page,
+            'per_page': per_page
+        }), 200
 
-    # Si no es jefe/admin, solo ver sus propias solicitudes
-    if not usuario.puede_aprobar:
-        query = query.filter_by(usuario_id=usuario.id)
-    elif usuario_id:
-        # Jefe/admin puede filtrar por usuario específico
-        query = query.filter_by(usuario_id=usuario_id)
+    # Ordenar por fecha de creación (más recientes primero)
+    query = query.options(*opciones_solicitudes(Solicitud, proyeccion)).order_by(Solicitud.created_at.desc())
+
+    # Paginación
+    paginacion = query.paginate(page=page, per_page=per_page, error_out=False)
+
+    return jsonify({
+        'solicitudes': [sol.serializar(proyeccion) for sol in paginacion.items],
+        'total': paginacion.total,
+        'pages': paginacion.pages,
+        'current_page': page,
+        'per_page': per_page
+    }), 200
+
+
+@solicitudes_bp.route('/bandeja', methods=['GET'])
+@jwt_required()
+@rol_requerido('jefe', 'administrador')
+def bandeja():
+    """
+    Bandeja de aprobación: solicitudes pendientes, más urgentes y antiguas primero.
+
+    Se resuelve con un único recorrido del índice parcial idx_solicitud_bandeja
+    (rango de prioridad, created_at, id) WHERE estado = 'pendiente' y pagina por
+    keyset: cada página empieza tras la última fila de la anterior.
+
+    Headers:
+        - Authorization: Bearer <access_token>
+
+    Query params:
+        - tipo (str, opcional): Filtrar por tipo
+        - cursor (str, opcional): Cursor devuelto en siguiente_cursor
+        - per_page (int, opcional): Items por página (por defecto 10, máximo 100)
+        - fields (str, opcional): Campos a devolver separados por comas (por defecto todos)
+        - expand (str, opcional): Relaciones a incluir: usuario, aprobador (por defecto ambas)
+
+    Returns:
+        200: Página de solicitudes pendientes y cursor de la siguiente
+        400: Cursor inválido, campo o relación no válidos
+    """
+    try:
+        proyeccion = leer_proyeccion_solicitudes()
+    except BadRequestError as e:
+        return jsonify({'error': e.message}), 400
+    tipo = request.args.get('tipo')
+    cursor = request.args.get('cursor')
+    per_page = max(1, min(request.args.get('per_page', 10, type=int), 100))
+
+    rango = literal_column(RANGO_PRIORIDAD_SQL)
+
+    query = (
+        db.session.query(Solicitud, rango)
+        # created_at forma parte del cursor aunque no se pida
+        .options(*opciones_solicitudes(Solicitud, proyeccion, ('created_at',)))
+        .filter(text(PENDIENTE_SQL))
+    )
+
+    if tipo:
+        query = query.filter(Solicitud.tipo == tipo)
+
+    if cursor:
+        try:
+            ultimo = decodificar_cursor(cursor, (int, datetime, int))
+        except ValueError:
+            return jsonify({'error': 'Cursor inválido'}), 400
+        query = query.filter(tuple_(rango, Solicitud.created_at, Solicitud.id) > tuple_(*ultimo))
+
+    filas = (
+        query.order_by(rango, Solicitud.created_at, Solicitud.id)
+        .limit(per_page + 1)
+        .all()
+    )
+
+    hay_mas = len(filas) > per_page
+    filas = filas[:per_page]
+
+    siguiente_cursor = None
+    if hay_mas:
+        ultima, rango_ultima = filas[-1]
+        siguiente_cursor = codificar_cursor(rango_ultima, ultima.created_at, ultima.id)
+
+    return jsonify({
+        'solicitudes': [sol.serializar(proyeccion) for sol, _ in filas],
+        'siguiente_cursor': siguiente_cursor,
+        'per_page': per_page
+    }), 200
+
+
+@solicitudes_bp.route('/cambios', methods=['GET'])
+@jwt_required()
+def cambios():
+    """
+    Feed de cambios para sincronización incremental.
+
+    Devuelve las solicitudes creadas o modificadas y las eliminadas después
+    del cursor, en orden de versión (secuencia monotónica de cambios). El
+    cliente guarda siguiente_cursor y lo envía en la próxima llamada; si
+    hay_mas es true debe seguir pidiendo páginas.
+
+    Headers:
+        - Authorization: Bearer <access_token>
+
+    Query params:
+        - since (str, opcional): Cursor devuelto en siguiente_cursor (sin él, sincronización completa)
+        - per_page (int, opcional): Cambios por página (por defecto 100, máximo 500)
+        - fields (str, opcional): Campos de cada solicitud separados por comas (por defecto todos)
+        - expand (str, opcional): Relaciones a incluir: usuario, aprobador (por defecto ambas)
+
+    Returns:
+        200: Cambios y cursor para la siguiente llamada
+        400: Cursor inválido, campo o relación no válidos
+        410: Cursor anterior a las lápidas purgadas (resincronizar desde cero)
+    """
+    usuario = obtener_usuario_actual()
+    try:
+        proyeccion = leer_proyeccion_solicitudes()
+    except BadRequestError as e:
+        return jsonify({'error': e.message}), 400
+    since = request.args.get('since')
+    per_page = max(1, min(request.args.get('per_page', 100, type=int), 500))
+
+    desde = 0
+    if since:
+        try:
+            desde, = decodificar_cursor(since, (int,))
+        except ValueError:
+            return jsonify({'error': 'Cursor inválido'}), 400
+
+        if desde < version_purgada():
+            return jsonify({'error': 'El cursor ha caducado, es necesario sincronizar desde cero'}), 410
+
+    filas, hay_mas = obtener_cambios(
+        desde,
+        per_page,
+        usuario_id=None if usuario.puede_aprobar else usuario.id,
+        opciones=opciones_solicitudes(Solicitud, proyeccion, ('version',))
+    )
+
+    cambios = []
+    for version, solicitud, eliminada in filas:
+        if solicitud is not None:
+            cambios.append({
+                'version': version,
+                'operacion': 'upsert',
+                'solicitud': solicitud.serializar(proyeccion)
+            })
+        else:
+            cambios.append({'version': version, 'operacion': 'delete', **eliminada.to_dict()})
+
+    ultima = filas[-1][0] if filas else desde
+
+    return jsonify({
+        'cambios': cambios,
+        'siguiente_cursor': codificar_cursor(ultima),
+        'hay_mas': hay_mas,
+        'per_page': per_page
+    }), 200
+
+
+@solicitudes_bp.route('/buscar', methods=['GET'])
+@jwt_required()
+def buscar():
+    """
+    Buscar solicitudes por texto en título y descripción.
+
+    Usa el índice de texto completo (tsvector/GIN en PostgreSQL, FTS5 en SQLite)
+    y ordena los resultados por relevancia. Aplica las mismas reglas de
+    visibilidad que el listado.
+
+    Headers:
+        - Authorization: Bearer <access_token>
+
+    Query params:
+        - q (str, requerido): Texto a buscar
+        - tipo (str, opcional): Filtrar por tipo
+        - estado (str, opcional): Filtrar por estado
+        - usuario_id (int, opcional): Filtrar por usuario (solo jefe/admin)
+        - page (int, opcional): Número de página (por defecto 1)
+        - per_page (int, opcional): Items por página (por defecto 10, máximo 100)
+        - fields (str, opcional): Campos a devolver separados por comas (por defecto todos)
+        - expand (str, opcional): Relaciones a incluir: usuario, aprobador (por defecto ambas)
+
+    Returns:
+        200: Lista de solicitudes ordenadas por relevancia
+        400: Parámetro q ausente, campo o relación no válidos
+    """
+    usuario = obtener_usuario_actual()
+    try:
+        proyeccion = leer_proyeccion_solicitudes()
+    except BadRequestError as e:
+        return jsonify({'error': e.message}), 400
+
+    texto = (request.args.get('q') or '').strip()
+    if not texto:
+        return jsonify({'error': 'El parámetro q es requerido'}), 400
+
+    tipo = request.args.get('tipo')
+    estado = request.args.get('estado')
+    usuario_id = request.args.get('usuario_id', type=int)
+    page = request.args.get('page', 1, type=int)
+    per_page = min(request.args.get('per_page', 10, type=int), 100)
+
+    query = aplicar_visibilidad(Solicitud.query, usuario, usuario_id)
+    query = query.options(*opciones_solicitudes(Solicitud, proyeccion))
 
-    # Filtros adicionales
     if tipo:
         query = query.filter_by(tipo=tipo)
     if estado:
         query = query.filter_by(estado=estado)
-    if prioridad:
-        query = query.filter_by(prioridad=prioridad)
 
-    # Ordenar por fecha de creación (más recientes primero)
-    query = query.order_by(Solicitud.created_at.desc())
+    query = buscar_solicitudes(query, texto)
 
-    # Paginación
     paginacion = query.paginate(page=page, per_page=per_page, error_out=False)
 
     return jsonify({
-        'solicitudes': [sol.to_dict(include_relations=True) for sol in paginacion.items],
+        'solicitudes': [sol.serializar(proyeccion) for sol in paginacion.items],
         'total': paginacion.total,
         'pages': paginacion.pages,
         'current_page': page,
-        'per_page': per_page
+        'per_page': per_page,
+        'q': texto
     }), 200
 
 
@@ -151,18 +448,41 @@ def listar_solicitudes():
 @jwt_required()
 def obtener_solicitud(solicitud_id):
     """
-    Obtener una solicitud específica.
+    Obtener una solicitud específica (también si está archivada).
 
     Headers:
         - Authorization: Bearer <access_token>
 
+    Query params:
+        - fields (str, opcional): Campos a devolver separados por comas (por defecto todos)
+        - expand (str, opcional): Relaciones a incluir: usuario, aprobador (por defecto ambas)
+
     Returns:
         200: Datos de la solicitud
+        400: Campo o relación no válidos
         403: Sin permisos para ver esta solicitud
         404: Solicitud no encontrada
     """
     usuario = obtener_usuario_actual()
-    solicitud = Solicitud.query.get(solicitud_id)
+    try:
+        proyeccion = leer_proyeccion_solicitudes()
+    except BadRequestError as e:
+        return jsonify({'error': e.message}), 400
+
+    # usuario_id se necesita para comprobar los permisos
+    solicitud = (
+        Solicitud.query
+        .options(*opciones_solicitudes(Solicitud, proyeccion, ('usuario_id',)))
+        .get(solicitud_id)
+    )
+
+    if not solicitud:
+        # Las solicitudes terminadas antiguas viven en el archivo
+        solicitud = (
+            SolicitudArchivada.query
+            .options(*opciones_solicitudes(SolicitudArchivada, proyeccion, ('usuario_id', 'archivado_at')))
+            .get(solicitud_id)
+        )
 
     if not solicitud:
         return jsonify({'error': 'Solicitud no encontrada'}), 404
@@ -171,7 +491,7 @@ def obtener_solicitud(solicitud_id):
     if not usuario.puede_aprobar and solicitud.usuario_id != usuario.id:
         return jsonify({'error': 'No tienes permisos para ver esta solicitud'}), 403
 
-    return jsonify({'solicitud': solicitud.to_dict(include_relations=True)}), 200
+    return jsonify({'solicitud': solicitud.serializar(proyeccion)}), 200
 
 
 @solicitudes_bp.route('/<int:solicitud_id>', methods=['PUT'])
@@ -268,6 +588,7 @@ def eliminar_solicitud(solicitud_id):
         return jsonify({'error': 'No se puede eliminar una solicitud que ya fue procesada'}), 403
 
     try:
+        # Las notificaciones se borran con ON DELETE CASCADE (passive_deletes)
         db.session.delete(solicitud)
         db.session.commit()
         return jsonify({'message': 'Solicitud eliminada exitosamente'}), 200
@@ -318,8 +639,13 @@ def cambiar_estado_solicitud(solicitud_id):
     comentarios = data.get('comentarios')
     solicitud.cambiar_estado(nuevo_estado, usuario.id, comentarios)
 
-    # Crear notificación in-app ANTES del commit para que ambos cambios estén en la misma transacción
+    # Canales elegidos por el solicitante (caché por proceso, sin consulta en el caso habitual)
+    canales = None
     if nuevo_estado in ['aprobada', 'rechazada']:
+        canales = entrega(solicitud.usuario_id, f'solicitud_{nuevo_estado}')
+
+    # Crear notificación in-app ANTES del commit para que ambos cambios estén en la misma transacción
+    if canales and canales.app:
         from app.models.notificacion import Notificacion
 
         tipo_notificacion = f'solicitud_{nuevo_estado}'
@@ -343,9 +669,9 @@ def cambiar_estado_solicitud(solicitud_id):
         db.session.commit()
 
         # Enviar notificación por email DESPUÉS del commit exitoso (asíncrono)
-        if nuevo_estado in ['aprobada', 'rechazada']:
+        if canales and canales.email:
             tipo_notificacion = f'solicitud_{nuevo_estado}'
-            enviar_email_solicitud.delay(solicitud.id, tipo_notificacion)
+            encolar_email_solicitud(solicitud, tipo_notificacion)
 
         return jsonify({
             'message': f'Solicitud {nuevo_estado} exitosamente',
@@ -2,7 +2,9 @@
 Schemas de validación para la API de Solicitudes.
 """
 
-from .usuario_schema import UsuarioRegistroSchema, UsuarioLoginSchema, UsuarioUpdateSchema, CambiarPasswordSchema
+from .usuario_schema import (
+    UsuarioRegistroSchema, UsuarioLoginSchema, UsuarioUpdateSchema, PerfilUpdateSchema, CambiarPasswordSchema
+)
 from .solicitud_schema import SolicitudCreateSchema, SolicitudUpdateSchema, CambiarEstadoSchema
 from .notificacion_schema import MarcarLeidaSchema
 
@@ -10,6 +12,7 @@ __all__ = [
     'UsuarioRegistroSchema',
     'UsuarioLoginSchema',
     'UsuarioUpdateSchema',
+    'PerfilUpdateSchema',
     'CambiarPasswordSchema',
     'SolicitudCreateSchema',
     'SolicitudUpdateSchema',
@@ -102,6 +102,38 @@ class UsuarioUpdateSchema(Schema):
     )
 
 
+class PreferenciaNotificacionSchema(Schema):
+    """Schema para validar una preferencia de notificación."""
+
+    tipo = fields.Str(
+        required=True,
+        validate=validate.OneOf(['solicitud_creada', 'solicitud_aprobada', 'solicitud_rechazada',
+                                 'solicitud_actualizada', 'recordatorio']),
+        error_messages={
+            'required': 'El tipo de notificación es requerido'
+        }
+    )
+    canal = fields.Str(
+        required=False,
+        validate=validate.OneOf(['ambos', 'email', 'app', 'ninguno']),
+        error_messages={
+            'invalid': 'El canal debe ser uno de: ambos, email, app, ninguno'
+        }
+    )
+    resumen = fields.Bool(
+        required=False
+    )
+
+
+class PerfilUpdateSchema(UsuarioUpdateSchema):
+    """Schema para validar la actualización del perfil propio."""
+
+    preferencias_notificacion = fields.List(
+        fields.Nested(PreferenciaNotificacionSchema),
+        required=False
+    )
+
+
 class CambiarPasswordSchema(Schema):
     """Schema para validar el cambio de contraseña."""
 
@@ -9,14 +9,24 @@ from flask_jwt_extended import (
 )
 from app import db
 from app.models.usuario import Usuario
+from app.services.password_service import verificar_login
+from app.services.refresh_token_service import (
+    registrar_refresh_token,
+    rotar_refresh_token,
+    revocar_sesiones_usuario
+)
 
 
-def crear_tokens(usuario):
+def crear_tokens(usuario, familia=None):
     """
     Crear tokens de acceso y refresh para un usuario.
 
+    El refresh token se registra en el almacén de tokens para poder rotarlo
+    y revocarlo sin invalidar las sesiones de los demás usuarios.
+
     Args:
         usuario: Objeto Usuario
+        familia: Familia de la sesión al rotar (None = nueva sesión)
 
     Returns:
         dict: Diccionario con los tokens
@@ -25,8 +35,12 @@ def crear_tokens(usuario):
     # Convertir a string para compatibilidad con PyJWT 2.x
     identity = str(usuario.id)
 
-    access_token = create_access_token(identity=identity)
-    refresh_token = create_refresh_token(identity=identity)
+    claims = registrar_refresh_token(usuario.id, familia)
+    db.session.commit()
+
+    # El rol viaja en el token para el límite de frecuencia (sin consultar la BD)
+    access_token = create_access_token(identity=identity, additional_claims={'rol': usuario.rol})
+    refresh_token = create_refresh_token(identity=identity, additional_claims=claims)
 
     return {
         'access_token': access_token,
@@ -35,6 +49,31 @@ def crear_tokens(usuario):
     }
 
 
+def refrescar_tokens(jwt_payload):
+    """
+    Rotar un refresh token y emitir un nuevo par de tokens de la misma sesión.
+
+    Args:
+        jwt_payload: Claims del refresh token presentado
+
+    Returns:
+        tuple: (tokens, error_mensaje)
+    """
+    familia, error = rotar_refresh_token(jwt_payload)
+
+    if error:
+        return None, error
+
+    usuario = db.session.get(Usuario, int(jwt_payload['sub']))
+
+    if not usuario or not usuario.activo:
+        revocar_sesiones_usuario(int(jwt_payload['sub']))
+        db.session.commit()
+        return None, 'Usuario inactivo'
+
+    return crear_tokens(usuario, familia), None
+
+
 def obtener_usuario_actual():
     """
     Obtener el usuario actual desde el JWT.
@@ -146,7 +185,8 @@ def autenticar_usuario(email, password):
     if not usuario.activo:
         return None, 'Usuario inactivo'
 
-    if not usuario.check_password(password):
+    # Verificar y, si cambió el coste configurado, actualizar el hash
+    if not verificar_login(usuario, password):
         return None, 'Credenciales inválidas'
 
     return usuario, None
@@ -168,6 +208,8 @@ def cambiar_password(usuario, password_actual, password_nueva):
         return False, 'Contraseña actual incorrecta'
 
     usuario.set_password(password_nueva)
+    # Cerrar las demás sesiones: quien tuviera la contraseña anterior pierde acceso
+    revocar_sesiones_usuario(usuario.id)
 
     try:
         db.session.commit()
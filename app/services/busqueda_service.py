@@ -0,0 +1,191 @@
+"""Servicio de búsqueda de texto respaldada por índices."""
+from sqlalchemy import and_, column, func, literal_column, select, table, or_
+from app import db
+from app.models.notificacion import Notificacion
+from app.models.solicitud import Solicitud, VECTOR_BUSQUEDA_SQL
+from app.models.usuario import Usuario
+
+
+# Tabla virtual FTS5 (solo SQLite)
+solicitudes_fts = table('solicitudes_fts', column('rowid'), column('rank'))
+
+
+def _dialecto():
+    """Obtener el nombre del dialecto de la base de datos activa."""
+    return db.engine.dialect.name
+
+
+def _consulta_fts5(texto):
+    """
+    Convertir texto libre en una consulta FTS5 segura.
+
+    Cada término se encierra entre comillas para que los caracteres
+    especiales de la sintaxis FTS5 no provoquen errores.
+
+    Args:
+        texto: Texto introducido por el usuario
+
+    Returns:
+        str: Consulta FTS5
+    """
+    terminos = [t.replace('"', '""') for t in texto.split() if t]
+    return ' '.join(f'"{t}"' for t in terminos)
+
+
+def condicion_busqueda_solicitudes(texto):
+    """
+    Construir la condición WHERE para buscar solicitudes por título/descripción.
+
+    En PostgreSQL usa el índice GIN sobre la expresión tsvector, en SQLite la
+    tabla FTS5 y en otros motores recurre a ILIKE.
+
+    Args:
+        texto: Texto a buscar
+
+    Returns:
+        Expresión SQLAlchemy para usar en filter()
+    """
+    dialecto = _dialecto()
+
+    if dialecto == 'postgresql':
+        vector = literal_column(VECTOR_BUSQUEDA_SQL)
+        consulta = func.websearch_to_tsquery(literal_column("'spanish'::regconfig"), texto)
+        return vector.op('@@')(consulta)
+
+    if dialecto == 'sqlite':
+        coincidencias = select(solicitudes_fts.c.rowid).where(
+            literal_column('solicitudes_fts').match(_consulta_fts5(texto))
+        )
+        return Solicitud.id.in_(coincidencias)
+
+    patron = f'%{texto}%'
+    return or_(Solicitud.titulo.ilike(patron), Solicitud.descripcion.ilike(patron))
+
+
+def orden_relevancia_solicitudes(texto):
+    """
+    Construir el criterio ORDER BY por relevancia de la búsqueda.
+
+    Args:
+        texto: Texto a buscar
+
+    Returns:
+        Expresión SQLAlchemy para usar en order_by()
+    """
+    dialecto = _dialecto()
+
+    if dialecto == 'postgresql':
+        vector = literal_column(VECTOR_BUSQUEDA_SQL)
+        consulta = func.websearch_to_tsquery(literal_column("'spanish'::regconfig"), texto)
+        return func.ts_rank_cd(vector, consulta).desc()
+
+    if dialecto == 'sqlite':
+        # rank de FTS5 es bm25: valores menores indican mayor relevancia
+        return select(solicitudes_fts.c.rank).where(
+            solicitudes_fts.c.rowid == Solicitud.id,
+            literal_column('solicitudes_fts').match(_consulta_fts5(texto))
+        ).scalar_subquery().asc()
+
+    return Solicitud.created_at.desc()
+
+
+def buscar_solicitudes(query, texto):
+    """
+    Aplicar búsqueda de texto completo y orden por relevancia a una query.
+
+    Args:
+        query: Query base de Solicitud (con filtros de visibilidad aplicados)
+        texto: Texto a buscar
+
+    Returns:
+        Query filtrada y ordenada
+    """
+    return query.filter(condicion_busqueda_solicitudes(texto)).order_by(
+        orden_relevancia_solicitudes(texto),
+        Solicitud.created_at.desc()
+    )
+
+
+def _escapar_like(texto):
+    """Escapar los comodines de LIKE en el texto del usuario."""
+    return texto.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _es_busqueda_email(texto):
+    """Determinar si el texto es un fragmento de email (contiene @, sin espacios)."""
+    return '@' in texto and not any(c.isspace() for c in texto)
+
+
+def _es_prefijo_email(texto):
+    """Determinar si el texto es el inicio de un email (juan@, juan@emp)."""
+    return _es_busqueda_email(texto) and not texto.startswith('@')
+
+
+def _condicion_trigram(texto, columnas, columna_email):
+    """
+    Construir una condición de búsqueda por subcadena sobre varias columnas.
+
+    Si el texto es el inicio de un email (parte local no vacía, p. ej.
+    "juan@emp") se usa un prefijo sobre lower(email), resuelto con el índice
+    text_pattern_ops. Un fragmento sin parte local ("@empresa.com") se busca
+    como subcadena del email. En otro caso cada término debe aparecer en
+    alguna de las columnas; en PostgreSQL los ILIKE sin CAST se resuelven con
+    los índices GIN gin_trgm_ops.
+
+    Args:
+        texto: Texto a buscar
+        columnas: Columnas donde buscar
+        columna_email: Columna de email para el camino por prefijo
+
+    Returns:
+        Expresión SQLAlchemy para usar en filter()
+    """
+    texto = texto.strip()
+
+    if _es_prefijo_email(texto):
+        prefijo = _escapar_like(texto.lower()) + '%'
+        return func.lower(columna_email).like(prefijo, escape='\\')
+
+    if _es_busqueda_email(texto):
+        return columna_email.ilike(f'%{_escapar_like(texto)}%', escape='\\')
+
+    condiciones = []
+    for termino in texto.split():
+        patron = f'%{_escapar_like(termino)}%'
+        condiciones.append(or_(*[col.ilike(patron, escape='\\') for col in columnas]))
+
+    return and_(*condiciones)
+
+
+def condicion_busqueda_usuarios(texto):
+    """
+    Construir la condición de búsqueda de usuarios (email, nombre, apellido).
+
+    Args:
+        texto: Texto a buscar
+
+    Returns:
+        Expresión SQLAlchemy para usar en filter()
+    """
+    return _condicion_trigram(
+        texto,
+        [Usuario.email, Usuario.nombre, Usuario.apellido],
+        Usuario.email
+    )
+
+
+def condicion_busqueda_notificaciones(texto):
+    """
+    Construir la condición de búsqueda de notificaciones (destinatario, asunto, mensaje).
+
+    Args:
+        texto: Texto a buscar
+
+    Returns:
+        Expresión SQLAlchemy para usar en filter()
+    """
+    return _condicion_trigram(
+        texto,
+        [Notificacion.destinatario_email, Notificacion.asunto, Notificacion.mensaje],
+        Notificacion.destinatario_email
+    )
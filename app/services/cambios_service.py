@@ -0,0 +1,114 @@
+"""
+Servicio del feed de cambios de solicitudes.
+
+Los clientes sincronizan con GET /api/solicitudes/cambios?since=<cursor>
+en lugar de descargar el listado completo. Cada alta o modificación asigna
+a la solicitud la siguiente versión de secuencias_cambios y cada baja deja
+una lápida con su propia versión, así que el feed es un recorrido por el
+índice idx_solicitud_version (y la clave de las lápidas) desde la versión
+del cursor: coste proporcional a los cambios, no al total de filas.
+"""
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, select
+from sqlalchemy.orm import joinedload
+from app import db
+from app.models.cambio import SolicitudEliminada
+from app.models.marca_agua import MarcaAgua
+from app.models.solicitud import Solicitud
+
+
+# Mayor versión de lápida purgada: un cursor anterior ya no es completo
+MARCA_PURGADO = 'cambios:solicitudes:purgado'
+
+
+def version_purgada():
+    """
+    Mayor versión de lápida eliminada por la purga.
+
+    Returns:
+        int: Versión (0 si nunca se purgó)
+    """
+    valor = MarcaAgua.obtener(MARCA_PURGADO)
+    return int(valor) if valor else 0
+
+
+def obtener_cambios(desde, limite, usuario_id=None, opciones=None):
+    """
+    Cambios posteriores a una versión, en orden de versión.
+
+    Args:
+        desde: Última versión que tiene el cliente (0 = sincronización completa)
+        limite: Máximo de cambios a devolver
+        usuario_id: Limitar a las solicitudes de un usuario (None = todas)
+        opciones: Opciones de carga de las solicitudes (por defecto la fila
+            completa con usuario y aprobador)
+
+    Returns:
+        tuple: (lista de (version, Solicitud o None, SolicitudEliminada o None), hay_mas)
+    """
+    if opciones is None:
+        opciones = [joinedload(Solicitud.usuario), joinedload(Solicitud.aprobador)]
+
+    query = Solicitud.query.options(*opciones).filter(Solicitud.version > desde)
+    lapidas = SolicitudEliminada.query.filter(SolicitudEliminada.version > desde)
+    if usuario_id is not None:
+        query = query.filter(Solicitud.usuario_id == usuario_id)
+        lapidas = lapidas.filter(SolicitudEliminada.usuario_id == usuario_id)
+
+    # Cada origen aporta como mucho limite + 1 filas; la mezcla por versión
+    # decide cuáles entran en la página
+    solicitudes = query.order_by(Solicitud.version).limit(limite + 1).all()
+    eliminadas = lapidas.order_by(SolicitudEliminada.version).limit(limite + 1).all()
+
+    cambios = sorted(
+        [(s.version, s, None) for s in solicitudes] + [(e.version, None, e) for e in eliminadas],
+        key=lambda cambio: cambio[0]
+    )
+    return cambios[:limite], len(cambios) > limite
+
+
+def purgar_lapidas(dias=None, tamano_lote=1000, max_lotes=None):
+    """
+    Eliminar lápidas antiguas en lotes acotados.
+
+    Guarda la mayor versión purgada para que el feed responda 410 a los
+    cursores anteriores (el cliente debe resincronizar desde cero).
+
+    Args:
+        dias: Antigüedad mínima en días (por defecto CAMBIOS_LAPIDAS_DIAS)
+        tamano_lote: Lápidas eliminadas por transacción
+        max_lotes: Máximo de lotes por ejecución (None = sin límite)
+
+    Returns:
+        dict: Resumen de la ejecución
+    """
+    dias = dias if dias is not None else current_app.config['CAMBIOS_LAPIDAS_DIAS']
+    fecha_limite = datetime.utcnow() - timedelta(days=dias)
+    total = 0
+    lotes = 0
+
+    while max_lotes is None or lotes < max_lotes:
+        versiones = db.session.execute(
+            select(SolicitudEliminada.version)
+            .where(SolicitudEliminada.eliminada_en < fecha_limite)
+            .order_by(SolicitudEliminada.version)
+            .limit(tamano_lote)
+        ).scalars().all()
+
+        if not versiones:
+            break
+
+        try:
+            db.session.execute(delete(SolicitudEliminada).where(SolicitudEliminada.version.in_(versiones)))
+            MarcaAgua.guardar(MARCA_PURGADO, str(max(versiones[-1], version_purgada())))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        total += len(versiones)
+        lotes += 1
+
+    return {'eliminadas': total, 'lotes': lotes}
+
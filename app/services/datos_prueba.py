@@ -0,0 +1,333 @@
+"""Servicio de generación de datos de prueba."""
+import csv
+import io
+import itertools
+import math
+import random
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from app import db
+from app.models.cambio import reservar_versiones
+from app.models.notificacion import Notificacion
+from app.models.solicitud import Solicitud
+from app.models.usuario import Usuario
+from app.services.password_service import generar_hash
+
+
+# Usuarios fijos de seed-db (email, nombre, apellido, rol, password)
+USUARIOS_BASE = [
+    ('admin@solicitudes.com', 'Admin', 'Sistema', 'administrador', 'admin123'),
+    ('jefe@solicitudes.com', 'Juan', 'Pérez', 'jefe', 'jefe123'),
+    ('empleado@solicitudes.com', 'María', 'García', 'empleado', 'empleado123'),
+]
+
+# Password común de los usuarios sintéticos (se hashea una sola vez)
+PASSWORD_SINTETICO = 'usuario123'
+
+# Uno de cada N usuarios sintéticos es jefe
+PROPORCION_JEFES = 20
+
+# Distribuciones (valor, peso)
+TIPOS = [('compra', 35), ('soporte_tecnico', 30), ('mantenimiento', 25), ('otro', 10)]
+PRIORIDADES = [('baja', 20), ('media', 45), ('alta', 25), ('urgente', 10)]
+TIPOS_NOTIFICACION = [('solicitud_aprobada', 40), ('solicitud_rechazada', 10),
+                      ('solicitud_actualizada', 40), ('recordatorio', 10)]
+
+# Estado según la antigüedad de la solicitud: (días máximos, [(estado, peso)])
+ESTADOS_POR_ANTIGUEDAD = [
+    (7, [('pendiente', 60), ('aprobada', 15), ('en_proceso', 15), ('rechazada', 5), ('completada', 5)]),
+    (30, [('pendiente', 20), ('aprobada', 20), ('en_proceso', 25), ('rechazada', 10), ('completada', 25)]),
+    (None, [('pendiente', 3), ('aprobada', 5), ('en_proceso', 4), ('rechazada', 18), ('completada', 70)]),
+]
+
+TITULOS = {
+    'compra': ['Compra de laptops', 'Compra de monitores', 'Licencias de software', 'Material de oficina',
+               'Sillas ergonómicas', 'Teléfonos para el equipo comercial'],
+    'mantenimiento': ['Mantenimiento de aire acondicionado', 'Reparación de ascensor', 'Pintura de oficinas',
+                      'Revisión eléctrica', 'Mantenimiento preventivo de servidores'],
+    'soporte_tecnico': ['Problema con impresora', 'Acceso a VPN', 'Correo no sincroniza',
+                        'Reinstalación de sistema operativo', 'Error en aplicación interna'],
+    'otro': ['Reserva de sala', 'Solicitud de capacitación', 'Cambio de puesto', 'Tarjeta de acceso'],
+}
+AREAS = ['Finanzas', 'Ventas', 'Recursos Humanos', 'Operaciones', 'Tecnología', 'Legal', 'Marketing']
+NOMBRES = ['Ana', 'Luis', 'Carmen', 'Jorge', 'Lucía', 'Pedro', 'Sofía', 'Diego', 'Elena', 'Pablo',
+           'Marta', 'Andrés', 'Laura', 'Javier', 'Isabel', 'Raúl']
+APELLIDOS = ['García', 'Martínez', 'López', 'Sánchez', 'Pérez', 'Gómez', 'Fernández', 'Ruiz',
+             'Díaz', 'Moreno', 'Romero', 'Torres']
+
+COLUMNAS_USUARIOS = ['id', 'email', 'password_hash', 'nombre', 'apellido', 'rol', 'activo',
+                     'created_at', 'updated_at']
+COLUMNAS_SOLICITUDES = ['id', 'tipo', 'titulo', 'descripcion', 'estado', 'prioridad', 'comentarios',
+                        'usuario_id', 'aprobador_id', 'fecha_aprobacion', 'created_at', 'updated_at',
+                        'version']
+COLUMNAS_NOTIFICACIONES = ['id', 'tipo', 'usuario_id', 'titulo', 'mensaje', 'leida', 'fecha_lectura',
+                           'enviado', 'intentos', 'solicitud_id', 'created_at', 'updated_at']
+
+
+def crear_usuarios_base():
+    """
+    Crear los usuarios fijos de prueba si no existen.
+
+    Returns:
+        dict: Usuarios por rol
+    """
+    usuarios = {}
+
+    for email, nombre, apellido, rol, password in USUARIOS_BASE:
+        usuario = Usuario.query.filter_by(email=email).first()
+        if not usuario:
+            usuario = Usuario(email=email, nombre=nombre, apellido=apellido, rol=rol)
+            usuario.set_password(password)
+            db.session.add(usuario)
+        usuarios[rol] = usuario
+
+    db.session.commit()
+    return usuarios
+
+
+class _Selector:
+    """Elección ponderada rápida a partir de pesos acumulados."""
+
+    def __init__(self, rnd, opciones):
+        self.rnd = rnd
+        self.valores = [valor for valor, _ in opciones]
+        self.acumulados = list(itertools.accumulate(peso for _, peso in opciones))
+
+    def __call__(self):
+        return self.rnd.choices(self.valores, cum_weights=self.acumulados)[0]
+
+
+def _fecha_creacion(rnd, ahora, dias):
+    """
+    Generar una fecha de creación realista.
+
+    El volumen crece con el tiempo (más solicitudes recientes), la actividad
+    se concentra en días laborables y en horario de oficina.
+    """
+    dias_atras = dias * (1 - math.sqrt(rnd.random()))
+    fecha = ahora - timedelta(days=dias_atras)
+
+    # Los fines de semana tienen un 20% de la actividad de un día laborable;
+    # el resto se reparte entre los días laborables de esa semana
+    if fecha.weekday() >= 5 and rnd.random() < 0.8:
+        fecha -= timedelta(days=fecha.weekday() - 4 + rnd.randrange(5))
+
+    hora = min(19, max(7, int(rnd.gauss(11, 3))))
+    fecha = fecha.replace(hour=hora, minute=rnd.randrange(60), second=rnd.randrange(60), microsecond=0)
+    return min(fecha, ahora)
+
+
+def _usuario_sesgado(rnd, primer_id, total):
+    """Elegir un usuario con sesgo: unos pocos concentran muchas solicitudes."""
+    return primer_id + int(total * rnd.random() ** 2)
+
+
+def _siguiente_id(modelo):
+    """Siguiente id libre de una tabla."""
+    return (db.session.query(db.func.max(modelo.id)).scalar() or 0) + 1
+
+
+def _copiar_postgres(tabla, columnas, filas, tamano_lote):
+    """Cargar filas con COPY FROM STDIN en bloques de tamano_lote."""
+    total = 0
+    conexion = db.engine.raw_connection()
+    try:
+        cursor = conexion.cursor()
+        sentencia = f"COPY {tabla} ({', '.join(columnas)}) FROM STDIN WITH (FORMAT csv)"
+
+        while True:
+            bloque = list(itertools.islice(filas, tamano_lote))
+            if not bloque:
+                break
+
+            buffer = io.StringIO()
+            escritor = csv.writer(buffer)
+            for fila in bloque:
+                escritor.writerow(['' if fila[c] is None else fila[c] for c in columnas])
+            buffer.seek(0)
+
+            cursor.copy_expert(sentencia, buffer)
+            conexion.commit()
+            total += len(bloque)
+
+        cursor.close()
+    finally:
+        conexion.close()
+
+    return total
+
+
+def _insertar_por_lotes(modelo, filas, tamano_lote):
+    """Insertar filas con executemany (Core, sin pasar por el ORM) en lotes de tamano_lote."""
+    total = 0
+
+    while True:
+        bloque = list(itertools.islice(filas, tamano_lote))
+        if not bloque:
+            break
+        db.session.execute(modelo.__table__.insert(), bloque)
+        db.session.commit()
+        total += len(bloque)
+
+    return total
+
+
+def _cargar(modelo, columnas, filas, tamano_lote, metodo, log):
+    """Cargar filas con el método indicado e informar del progreso."""
+    inicio = time.perf_counter()
+    tabla = modelo.__tablename__
+
+    if metodo == 'copy':
+        total = _copiar_postgres(tabla, columnas, filas, tamano_lote)
+    else:
+        total = _insertar_por_lotes(modelo, filas, tamano_lote)
+
+    duracion = time.perf_counter() - inicio
+    if log and total:
+        log(f"✓ {tabla}: {total} filas en {duracion:.1f}s ({total / max(duracion, 1e-6):,.0f} filas/s)")
+
+    # Los ids se asignan explícitamente: sincronizar la secuencia en PostgreSQL
+    if total and db.engine.dialect.name == 'postgresql':
+        db.session.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{tabla}', 'id'), (SELECT max(id) FROM {tabla}))"
+        ))
+        db.session.commit()
+
+    return total
+
+
+def generar_volumen(usuarios=100, solicitudes=1000, notificaciones=1000, semilla=42,
+                    tamano_lote=5000, dias=365, metodo='auto', log=None):
+    """
+    Generar usuarios, solicitudes y notificaciones sintéticas en bloque.
+
+    Las filas se generan en streaming (sin materializar la tabla completa en
+    memoria) con distribuciones realistas de tipo, prioridad y estado, este
+    último en función de la antigüedad. En PostgreSQL se cargan con COPY; en
+    otros motores con executemany por lotes.
+
+    Args:
+        usuarios: Usuarios sintéticos a crear (además de los fijos)
+        solicitudes: Solicitudes a crear
+        notificaciones: Notificaciones in-app a crear
+        semilla: Semilla del generador aleatorio (datos reproducibles)
+        tamano_lote: Filas por lote
+        dias: Ventana temporal de los datos (días hacia atrás)
+        metodo: 'auto', 'copy' o 'executemany'
+        log: Función para informar del progreso (opcional)
+
+    Returns:
+        dict: Filas creadas por tabla
+    """
+    if metodo == 'auto':
+        metodo = 'copy' if db.engine.dialect.name == 'postgresql' else 'executemany'
+    if metodo == 'copy' and db.engine.dialect.name != 'postgresql':
+        raise ValueError('COPY solo está disponible en PostgreSQL')
+
+    rnd = random.Random(semilla)
+    ahora = datetime.utcnow().replace(microsecond=0)
+    base = crear_usuarios_base()
+    password_hash = generar_hash(PASSWORD_SINTETICO)
+
+    tipo = _Selector(rnd, TIPOS)
+    prioridad = _Selector(rnd, PRIORIDADES)
+    tipo_notificacion = _Selector(rnd, TIPOS_NOTIFICACION)
+    estados = [(limite, _Selector(rnd, pesos)) for limite, pesos in ESTADOS_POR_ANTIGUEDAD]
+
+    # Usuarios: ids contiguos a partir del primero libre
+    primer_usuario = _siguiente_id(Usuario)
+    ids_jefes = [u.id for u in base.values() if u.rol != 'empleado']
+    ids_jefes += [primer_usuario + i for i in range(usuarios) if (primer_usuario + i) % PROPORCION_JEFES == 0]
+
+    def _usuarios():
+        for i in range(usuarios):
+            n = primer_usuario + i
+            creado = ahora - timedelta(days=rnd.uniform(0, dias))
+            yield {
+                'id': n,
+                'email': f'usuario{n}@solicitudes.com',
+                'password_hash': password_hash,
+                'nombre': rnd.choice(NOMBRES),
+                'apellido': rnd.choice(APELLIDOS),
+                'rol': 'jefe' if n % PROPORCION_JEFES == 0 else 'empleado',
+                'activo': rnd.random() > 0.03,
+                'created_at': creado,
+                'updated_at': creado
+            }
+
+    creados = {'usuarios': _cargar(Usuario, COLUMNAS_USUARIOS, _usuarios(), tamano_lote, metodo, log)}
+
+    # Solicitantes: usuarios sintéticos con sesgo (o los fijos si no se crean)
+    if usuarios:
+        def solicitante():
+            return _usuario_sesgado(rnd, primer_usuario, usuarios)
+    else:
+        ids_base = [u.id for u in base.values()]
+
+        def solicitante():
+            return rnd.choice(ids_base)
+
+    primera_solicitud = _siguiente_id(Solicitud)
+
+    # Bloque de versiones del feed de cambios para las solicitudes nuevas
+    primera_version = 0
+    if solicitudes:
+        primera_version = reservar_versiones(db.session.connection(), solicitudes) - solicitudes + 1
+        db.session.commit()
+
+    def _solicitudes():
+        for i in range(solicitudes):
+            creada = _fecha_creacion(rnd, ahora, dias)
+            antiguedad = (ahora - creada).days
+            estado = next(sel for limite, sel in estados if limite is None or antiguedad <= limite)()
+            t = tipo()
+            resuelta = estado != 'pendiente'
+            aprobacion = creada + timedelta(hours=rnd.expovariate(1 / 30)) if resuelta else None
+            aprobacion = min(aprobacion, ahora) if aprobacion else None
+            yield {
+                'id': primera_solicitud + i,
+                'tipo': t,
+                'titulo': f'{rnd.choice(TITULOS[t])} - {rnd.choice(AREAS)}',
+                'descripcion': f'Solicitud del área de {rnd.choice(AREAS)}: {rnd.choice(TITULOS[t]).lower()}.',
+                'estado': estado,
+                'prioridad': prioridad(),
+                'comentarios': 'Rechazada por presupuesto' if estado == 'rechazada' else None,
+                'usuario_id': solicitante(),
+                'aprobador_id': rnd.choice(ids_jefes) if resuelta else None,
+                'fecha_aprobacion': aprobacion,
+                'created_at': creada,
+                'updated_at': aprobacion or creada,
+                'version': primera_version + i
+            }
+
+    creados['solicitudes'] = _cargar(Solicitud, COLUMNAS_SOLICITUDES, _solicitudes(), tamano_lote, metodo, log)
+
+    primera_notificacion = _siguiente_id(Notificacion)
+    ultima_solicitud = primera_solicitud + solicitudes - 1
+
+    def _notificaciones():
+        for i in range(notificaciones):
+            creada = _fecha_creacion(rnd, ahora, dias)
+            leida = rnd.random() < min(0.95, 0.3 + (ahora - creada).days / 30)
+            lectura = min(creada + timedelta(hours=rnd.expovariate(1 / 6)), ahora) if leida else None
+            yield {
+                'id': primera_notificacion + i,
+                'tipo': tipo_notificacion(),
+                'usuario_id': solicitante(),
+                'titulo': 'Actualización de solicitud',
+                'mensaje': 'Tu solicitud ha cambiado de estado',
+                'leida': leida,
+                'fecha_lectura': lectura,
+                'enviado': False,
+                'intentos': 0,
+                'solicitud_id': rnd.randint(primera_solicitud, ultima_solicitud) if solicitudes else None,
+                'created_at': creada,
+                'updated_at': lectura or creada
+            }
+
+    creados['notificaciones'] = _cargar(
+        Notificacion, COLUMNAS_NOTIFICACIONES, _notificaciones(), tamano_lote, metodo, log
+    )
+
+    return creados
@@ -0,0 +1,229 @@
+"""Servicio de eliminación de usuarios y solicitudes con borrados por conjuntos."""
+from flask import current_app
+from sqlalchemy import bindparam, delete, func, or_, select, update
+from app import db
+from app.models.cambio import registrar_eliminaciones, reservar_versiones
+from app.models.notificacion import Notificacion
+from app.models.refresh_token import RefreshToken
+from app.models.solicitud import Solicitud
+from app.models.usuario import Usuario
+
+
+def contar_dependencias(usuario_id):
+    """
+    Contar las filas que arrastra la eliminación de un usuario.
+
+    Args:
+        usuario_id: ID del usuario
+
+    Returns:
+        int: Solicitudes propias más notificaciones propias o de sus solicitudes
+    """
+    solicitudes = select(Solicitud.id).where(Solicitud.usuario_id == usuario_id)
+
+    total_solicitudes = db.session.execute(
+        select(func.count()).select_from(solicitudes.subquery())
+    ).scalar()
+    total_notificaciones = db.session.execute(
+        select(func.count()).select_from(Notificacion).where(or_(
+            Notificacion.usuario_id == usuario_id,
+            Notificacion.solicitud_id.in_(solicitudes)
+        ))
+    ).scalar()
+
+    return total_solicitudes + total_notificaciones
+
+
+def eliminacion_en_segundo_plano(usuario_id):
+    """
+    Determinar si la eliminación de un usuario debe delegarse a Celery.
+
+    Args:
+        usuario_id: ID del usuario
+
+    Returns:
+        bool: True si arrastra más filas de las permitidas en una request
+    """
+    return contar_dependencias(usuario_id) > current_app.config['USUARIOS_ELIMINACION_SINCRONA_MAX']
+
+
+def _borrar_por_lotes(tabla, condicion, tamano_lote):
+    """
+    Borrar un lote de filas de una tabla que cumplen una condición.
+
+    Sin ORDER BY para que la base de datos resuelva la condición con los
+    índices de las claves foráneas en lugar de recorrer la clave primaria.
+
+    Returns:
+        int: Filas eliminadas (0 cuando no queda ninguna)
+    """
+    ids = db.session.execute(
+        select(tabla.c.id).where(condicion).limit(tamano_lote)
+    ).scalars().all()
+
+    if not ids:
+        return 0
+
+    db.session.execute(delete(tabla).where(tabla.c.id.in_(ids)))
+    return len(ids)
+
+
+def _versionar_solicitudes(ids, **valores):
+    """Actualizar solicitudes con sentencias Core asignando una versión nueva a cada una."""
+    solicitudes = Solicitud.__table__
+    conexion = db.session.connection()
+    primera = reservar_versiones(conexion, len(ids)) - len(ids) + 1
+    conexion.execute(
+        update(solicitudes)
+        .where(solicitudes.c.id == bindparam('b_id'))
+        .values(version=bindparam('b_version'), **valores),
+        [{'b_id': solicitud_id, 'b_version': primera + i} for i, solicitud_id in enumerate(ids)]
+    )
+
+
+def _desvincular_aprobador(usuario_id, tamano_lote):
+    """Quitar al usuario como aprobador de un lote de solicitudes ajenas."""
+    solicitudes = Solicitud.__table__
+    ids = db.session.execute(
+        select(solicitudes.c.id)
+        .where(solicitudes.c.aprobador_id == usuario_id)
+        .limit(tamano_lote)
+    ).scalars().all()
+
+    if not ids:
+        return 0
+
+    _versionar_solicitudes(ids, aprobador_id=None)
+    return len(ids)
+
+
+def _borrar_solicitudes(usuario_id, tamano_lote):
+    """Borrar un lote de solicitudes de un usuario dejando sus lápidas para el feed de cambios."""
+    solicitudes = Solicitud.__table__
+    ids = db.session.execute(
+        select(solicitudes.c.id).where(solicitudes.c.usuario_id == usuario_id).limit(tamano_lote)
+    ).scalars().all()
+
+    if not ids:
+        return 0
+
+    registrar_eliminaciones(db.session.connection(), [(solicitud_id, usuario_id) for solicitud_id in ids])
+    db.session.execute(delete(solicitudes).where(solicitudes.c.id.in_(ids)))
+    return len(ids)
+
+
+def registrar_cambios_eliminacion(usuario_id):
+    """
+    Registrar en el feed de cambios lo que arrastra el borrado en cascada de un usuario (sin commit).
+
+    La eliminación síncrona delega en ON DELETE CASCADE / SET NULL, que no
+    pasa por el ORM: se dejan las lápidas de sus solicitudes y se versionan
+    las que aprobó antes de borrar el usuario en la misma transacción.
+
+    Args:
+        usuario_id: ID del usuario
+    """
+    solicitudes = Solicitud.__table__
+    propias = db.session.execute(
+        select(solicitudes.c.id).where(solicitudes.c.usuario_id == usuario_id)
+    ).scalars().all()
+    aprobadas = db.session.execute(
+        select(solicitudes.c.id).where(
+            solicitudes.c.aprobador_id == usuario_id,
+            solicitudes.c.usuario_id != usuario_id
+        )
+    ).scalars().all()
+
+    registrar_eliminaciones(db.session.connection(), [(solicitud_id, usuario_id) for solicitud_id in propias])
+    if aprobadas:
+        _versionar_solicitudes(aprobadas)
+
+
+def eliminar_usuario_por_lotes(usuario_id, tamano_lote=None, max_lotes=None, progreso=None, previo=None):
+    """
+    Eliminar un usuario y todo lo que depende de él en lotes acotados.
+
+    Cada lote es una transacción corta: notificaciones (propias y de sus
+    solicitudes), desvinculación de las solicitudes que aprobó, sus
+    solicitudes y, por último, sus refresh tokens y el propio usuario. Si se
+    alcanza max_lotes la eliminación queda a medias y puede reanudarse
+    llamando de nuevo con el mismo usuario.
+
+    Args:
+        usuario_id: ID del usuario
+        tamano_lote: Filas por lote (por defecto USUARIOS_ELIMINACION_LOTE)
+        max_lotes: Máximo de lotes por ejecución (None = sin límite)
+        progreso: Callback opcional que recibe el resumen tras cada lote
+        previo: Resumen de las ejecuciones anteriores de la misma
+            eliminación; sus contadores se acumulan en el resultado
+
+    Returns:
+        dict: Resumen con filas eliminadas y si la eliminación terminó
+    """
+    tamano_lote = tamano_lote or current_app.config['USUARIOS_ELIMINACION_LOTE']
+
+    notificaciones = Notificacion.__table__
+    solicitudes = Solicitud.__table__
+    ids_solicitudes = select(solicitudes.c.id).where(solicitudes.c.usuario_id == usuario_id)
+
+    fases = (
+        ('notificaciones', lambda: _borrar_por_lotes(
+            notificaciones,
+            or_(notificaciones.c.usuario_id == usuario_id, notificaciones.c.solicitud_id.in_(ids_solicitudes)),
+            tamano_lote
+        )),
+        ('aprobaciones', lambda: _desvincular_aprobador(usuario_id, tamano_lote)),
+        ('solicitudes', lambda: _borrar_solicitudes(usuario_id, tamano_lote)),
+    )
+
+    resumen = {
+        'usuario_id': usuario_id,
+        'notificaciones': 0,
+        'aprobaciones': 0,
+        'solicitudes': 0,
+        'lotes': 0,
+        'fase': None,
+        'completada': False
+    }
+    if previo:
+        for clave in ('notificaciones', 'aprobaciones', 'solicitudes', 'lotes'):
+            resumen[clave] = previo.get(clave, 0)
+
+    lotes = 0
+    for fase, lote in fases:
+        resumen['fase'] = fase
+
+        while True:
+            if max_lotes is not None and lotes >= max_lotes:
+                return resumen
+
+            try:
+                filas = lote()
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+
+            if not filas:
+                break
+
+            resumen[fase] += filas
+            resumen['lotes'] += 1
+            lotes += 1
+            if progreso:
+                progreso(resumen)
+
+    try:
+        db.session.execute(delete(RefreshToken.__table__).where(RefreshToken.usuario_id == usuario_id))
+        db.session.execute(delete(Usuario.__table__).where(Usuario.id == usuario_id))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    resumen['fase'] = None
+    resumen['completada'] = True
+    if progreso:
+        progreso(resumen)
+
+    return resumen
@@ -0,0 +1,115 @@
+"""
+Servicio de enrutamiento de aprobadores.
+
+Calcula qué aprobadores reciben los emails de una solicitud a partir de las
+reglas de reglas_aprobacion. La tabla de reglas se carga completa en memoria
+y se reutiliza durante ENRUTAMIENTO_CACHE_SEGUNDOS, de modo que enrutar una
+difusión no consulta la base de datos. Los cambios desde el panel de
+administración invalidan la caché del proceso; el resto de procesos (workers)
+los ven al caducar.
+"""
+import threading
+import time
+from collections import defaultdict
+from flask import current_app
+from sqlalchemy import select
+from app import db
+from app.models.regla_aprobacion import ReglaAprobacion
+from app.models.usuario import Usuario
+
+
+ROLES_APROBADORES = ('jefe', 'administrador')
+
+# Roles a los que se envía cuando ninguna regla cubre la solicitud
+ROLES_RESPALDO = {
+    'administradores': ('administrador',),
+    'aprobadores': ROLES_APROBADORES,
+    'ninguno': (),
+}
+
+_cache = {'tabla': None, 'respaldo': None, 'expira': 0.0}
+_lock = threading.Lock()
+
+
+def _cargar():
+    """
+    Leer las reglas activas de aprobadores activos y los aprobadores de respaldo.
+
+    Returns:
+        tuple: (tabla {(tipo, solicitante_id): set(aprobador_id)}, lista de respaldo)
+    """
+    filas = db.session.execute(
+        select(ReglaAprobacion.tipo, ReglaAprobacion.solicitante_id, ReglaAprobacion.aprobador_id)
+        .join(Usuario, Usuario.id == ReglaAprobacion.aprobador_id)
+        .where(
+            ReglaAprobacion.activa == True,
+            Usuario.activo == True,
+            Usuario.rol.in_(ROLES_APROBADORES)
+        )
+    ).all()
+
+    tabla = defaultdict(set)
+    for tipo, solicitante_id, aprobador_id in filas:
+        tabla[(tipo, solicitante_id)].add(aprobador_id)
+
+    roles = ROLES_RESPALDO.get(current_app.config['ENRUTAMIENTO_RESPALDO'], ())
+    respaldo = []
+    if roles:
+        respaldo = db.session.execute(
+            select(Usuario.id)
+            .where(Usuario.rol.in_(roles), Usuario.activo == True)
+            .order_by(Usuario.id)
+        ).scalars().all()
+
+    return dict(tabla), respaldo
+
+
+def obtener_tabla_enrutamiento():
+    """
+    Tabla de enrutamiento en caché (se recarga al caducar).
+
+    Returns:
+        tuple: (tabla de reglas, aprobadores de respaldo)
+    """
+    ahora = time.monotonic()
+    if _cache['tabla'] is None or ahora >= _cache['expira']:
+        with _lock:
+            if _cache['tabla'] is None or ahora >= _cache['expira']:
+                tabla, respaldo = _cargar()
+                _cache['tabla'], _cache['respaldo'] = tabla, respaldo
+                _cache['expira'] = ahora + current_app.config['ENRUTAMIENTO_CACHE_SEGUNDOS']
+
+    return _cache['tabla'], _cache['respaldo']
+
+
+def invalidar_enrutamiento():
+    """Descartar la tabla de enrutamiento de este proceso."""
+    _cache['tabla'] = None
+
+
+def aprobadores_solicitud(solicitud):
+    """
+    Aprobadores que deben recibir los emails de una solicitud.
+
+    Se combinan las reglas por tipo, por solicitante y generales; si ninguna
+    cubre la solicitud se usa el respaldo de ENRUTAMIENTO_RESPALDO. El
+    solicitante nunca se notifica a sí mismo.
+
+    Args:
+        solicitud: Objeto Solicitud
+
+    Returns:
+        list: IDs de usuario ordenados
+    """
+    tabla, respaldo = obtener_tabla_enrutamiento()
+
+    ids = set()
+    for tipo in (solicitud.tipo, None):
+        for solicitante_id in (solicitud.usuario_id, None):
+            ids |= tabla.get((tipo, solicitante_id), set())
+
+    if not ids:
+        ids = set(respaldo)
+
+    ids.discard(solicitud.usuario_id)
+    return sorted(ids)
@@ -0,0 +1,69 @@
+"""Servicio de throttling de intentos de login (por IP y por email)."""
+from flask import current_app
+from app.utils.limitador import obtener_limitador
+from app.utils.logger import log_warning
+from app.utils.metricas import LOGIN_THROTTLED
+
+
+def _clave_email(email):
+    return 'login:email:' + (email or '').strip().lower()
+
+
+def comprobar_intento_login(email, ip, origen='api'):
+    """
+    Consumir un intento de login para la IP y el email indicados.
+
+    Se llama antes de buscar al usuario y de verificar la contraseña, de
+    modo que los intentos rechazados no llegan a ejecutar bcrypt. La cubeta
+    por IP frena ráfagas desde un mismo origen; la cubeta por email frena
+    ataques distribuidos contra una misma cuenta.
+
+    Args:
+        email: Email recibido en el formulario
+        ip: Dirección del cliente
+        origen: Punto de entrada (api, admin, frontend) para las métricas
+
+    Returns:
+        int: 0 si se permite el intento, o segundos a esperar (Retry-After)
+    """
+    config = current_app.config
+    if not config.get('LOGIN_THROTTLING_HABILITADO', True):
+        return 0
+
+    limitador = obtener_limitador(current_app)
+
+    comprobaciones = (
+        ('ip', 'login:ip:' + (ip or 'desconocida'),
+         config['LOGIN_IP_CAPACIDAD'], config['LOGIN_IP_PERIODO']),
+        ('email', _clave_email(email),
+         config['LOGIN_EMAIL_CAPACIDAD'], config['LOGIN_EMAIL_PERIODO']),
+    )
+
+    for motivo, clave, capacidad, periodo in comprobaciones:
+        espera = limitador.consumir(clave, capacidad, periodo)
+        if espera:
+            LOGIN_THROTTLED.labels(motivo=motivo, origen=origen).inc()
+            log_warning(
+                'Intento de login limitado',
+                motivo=motivo,
+                origen=origen,
+                ip=ip,
+                retry_after=espera
+            )
+            return espera
+
+    return 0
+
+
+def registrar_login_exitoso(email):
+    """
+    Restablecer la cubeta del email tras un login correcto.
+
+    La cubeta por IP no se toca: un login válido no debe abrir la puerta a
+    más intentos desde una IP que está probando otras cuentas.
+
+    Args:
+        email: Email con el que se inició sesión
+    """
+    if current_app.config.get('LOGIN_THROTTLING_HABILITADO', True):
+        obtener_limitador(current_app).reiniciar(_clave_email(email))
@@ -0,0 +1,182 @@
+"""Servicio de hashing de contraseñas (bcrypt)."""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import bcrypt as _bcrypt
+from flask import current_app
+from app import db
+from app.exceptions import ServiceUnavailableError
+
+
+# Pool y semáforo del proceso actual (se recrean tras un fork)
+_pool = None
+_semaforo = None
+_pid = None
+_lock = threading.Lock()
+
+
+def _hashear(password, rondas):
+    """Calcular el hash bcrypt (función de módulo para poder usarse en procesos)."""
+    return _bcrypt.hashpw(password.encode('utf-8'), _bcrypt.gensalt(rounds=rondas)).decode('utf-8')
+
+
+def _verificar(password, password_hash):
+    """Comparar una contraseña con su hash bcrypt."""
+    try:
+        return _bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+    except ValueError:
+        # Hash con formato inválido o contraseña de más de 72 bytes
+        return False
+
+
+def _config(clave, defecto):
+    """Leer la configuración de la app activa (con valor por defecto fuera de contexto)."""
+    try:
+        return current_app.config.get(clave, defecto)
+    except RuntimeError:
+        return defecto
+
+
+def _recursos():
+    """
+    Obtener el pool de ejecución y el semáforo de este proceso.
+
+    Se crean perezosamente y se vuelven a crear si el PID cambió (workers de
+    gunicorn creados por fork desde el master).
+    """
+    global _pool, _semaforo, _pid
+
+    if _pid == os.getpid():
+        return _pool, _semaforo
+
+    with _lock:
+        if _pid != os.getpid():
+            tipo = _config('PASSWORD_HASH_POOL', 'ninguno')
+            workers = _config('PASSWORD_HASH_WORKERS', 2)
+            concurrencia = _config('PASSWORD_HASH_CONCURRENCIA', None) or workers
+
+            if tipo == 'hilos':
+                _pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+            elif tipo == 'procesos':
+                _pool = ProcessPoolExecutor(max_workers=workers)
+            else:
+                _pool = None
+
+            _semaforo = threading.BoundedSemaphore(concurrencia)
+            _pid = os.getpid()
+
+    return _pool, _semaforo
+
+
+def _ejecutar(funcion, *args):
+    """
+    Ejecutar una operación bcrypt respetando el límite de concurrencia.
+
+    Si no hay hueco libre en PASSWORD_HASH_ESPERA_MAX segundos se rechaza la
+    operación con 503 en lugar de acumular requests bloqueadas.
+
+    Raises:
+        ServiceUnavailableError: Si el subsistema de hashing está saturado
+    """
+    pool, semaforo = _recursos()
+    espera = _config('PASSWORD_HASH_ESPERA_MAX', 2.0)
+
+    if not semaforo.acquire(timeout=espera):
+        error = ServiceUnavailableError(
+            message='El servicio de autenticación está saturado, inténtalo de nuevo',
+            error_code='AUTH_SATURADO'
+        )
+        error.retry_after = 1
+        raise error
+
+    try:
+        if pool is None:
+            return funcion(*args)
+        return pool.submit(funcion, *args).result()
+    finally:
+        semaforo.release()
+
+
+def rondas_configuradas():
+    """Factor de coste bcrypt configurado."""
+    return _config('PASSWORD_BCRYPT_ROUNDS', 12)
+
+
+def generar_hash(password):
+    """
+    Generar el hash bcrypt de una contraseña con el coste configurado.
+
+    Args:
+        password: Contraseña en texto plano
+
+    Returns:
+        str: Hash bcrypt
+    """
+    return _ejecutar(_hashear, password, rondas_configuradas())
+
+
+def verificar_password(password_hash, password):
+    """
+    Verificar una contraseña contra su hash.
+
+    Args:
+        password_hash: Hash almacenado
+        password: Contraseña en texto plano
+
+    Returns:
+        bool: True si la contraseña es correcta
+    """
+    if not password_hash or password is None:
+        return False
+    return _ejecutar(_verificar, password, password_hash)
+
+
+def necesita_rehash(password_hash):
+    """
+    Determinar si un hash se generó con parámetros distintos a los actuales.
+
+    Args:
+        password_hash: Hash almacenado ($2b$<coste>$...)
+
+    Returns:
+        bool: True si el coste o la variante no coinciden con la configuración
+    """
+    partes = (password_hash or '').split('$')
+    if len(partes) < 4 or partes[1] != '2b':
+        return True
+    try:
+        return int(partes[2]) != rondas_configuradas()
+    except ValueError:
+        return True
+
+
+def verificar_login(usuario, password):
+    """
+    Verificar la contraseña en un login y actualizar el hash si hace falta.
+
+    Si la contraseña es correcta y el hash se generó con otro coste, se
+    vuelve a hashear con los parámetros actuales de forma transparente.
+
+    Args:
+        usuario: Objeto Usuario
+        password: Contraseña en texto plano
+
+    Returns:
+        bool: True si la contraseña es correcta
+    """
+    if not verificar_password(usuario.password_hash, password):
+        return False
+
+    if necesita_rehash(usuario.password_hash):
+        try:
+            usuario.password_hash = generar_hash(password)
+            db.session.commit()
+        except ServiceUnavailableError:
+            # El rehash es oportunista: se reintentará en el siguiente login
+            db.session.rollback()
+        except Exception as e:
+            db.session.rollback()
+            from app.utils.logger import log_error
+            log_error('Error al actualizar el hash de la contraseña', exception=e, usuario_id=usuario.id)
+
+    return True
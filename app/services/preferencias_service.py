@@ -0,0 +1,302 @@
+"""
+Servicio de preferencias de notificación.
+
+Decide por qué canales se entrega cada tipo de notificación a un usuario
+según preferencias_notificacion. Las preferencias se cachean por proceso
+(worker de Celery o de gunicorn) durante PREFERENCIAS_CACHE_SEGUNDOS y se
+cargan en una sola consulta para todos los destinatarios de una difusión,
+de modo que descartar una entrega no cuesta ni una consulta ni una fila.
+
+Los cambios desde /api/usuarios/perfil incrementan una versión por usuario
+en Redis (PREFERENCIAS_INVALIDACION = 'redis'). Cada lectura de la caché
+compara las versiones de los destinatarios con un único MGET, así que los
+workers de Celery descartan al momento las preferencias cambiadas en otro
+proceso. Si Redis no responde se sigue usando la caché hasta que caduque.
+"""
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import select
+from app import db
+from app.models.notificacion import Notificacion
+from app.models.preferencia_notificacion import PreferenciaNotificacion
+
+
+# email: enviar el email al momento; app: crear la notificación in-app;
+# resumen: incluirla en el resumen diario por email
+Entrega = namedtuple('Entrega', ['email', 'app', 'resumen'])
+
+ENTREGA_DEFECTO = Entrega(email=True, app=True, resumen=False)
+
+TIPOS_NOTIFICACION = (
+    'solicitud_creada', 'solicitud_aprobada', 'solicitud_rechazada',
+    'solicitud_actualizada', 'recordatorio'
+)
+
+# Tipos con notificación in-app propia (la crea cambiar_estado_solicitud);
+# para el resto los emails en resumen se registran in-app al enviarlos
+TIPOS_CON_NOTIFICACION_APP = ('solicitud_aprobada', 'solicitud_rechazada')
+
+# Claves de versión en Redis: una por usuario y una global (invalidar a todos)
+PREFIJO_VERSION = 'preferencias:version:'
+CLAVE_VERSION_GLOBAL = PREFIJO_VERSION + 'todos'
+
+# Segundos sin consultar Redis tras un fallo
+ESPERA_TRAS_FALLO = 5.0
+
+# usuario_id -> (instante de caducidad, versión, {tipo: (canal, resumen)})
+_cache = {}
+_lock = threading.Lock()
+
+# Clientes de Redis por URL (uno por proceso) e instante hasta el que no se reintenta
+_clientes = {}
+_fallo_hasta = 0.0
+
+
+def _calcular_entrega(canal, resumen):
+    """Traducir una preferencia (canal, resumen) a los canales de entrega."""
+    email = canal in ('ambos', 'email')
+    app = canal in ('ambos', 'app')
+    if resumen and email:
+        # El email se agrupa en el resumen diario, que se construye a partir
+        # de las notificaciones in-app
+        return Entrega(email=False, app=True, resumen=True)
+    return Entrega(email=email, app=app, resumen=False)
+
+
+def _cliente_versiones():
+    """Cliente de Redis para las versiones (None si la invalidación es solo local o Redis falló hace poco)."""
+    config = current_app.config
+    if config.get('PREFERENCIAS_INVALIDACION', 'memoria') != 'redis':
+        return None
+    if _fallo_hasta and time.monotonic() < _fallo_hasta:
+        return None
+
+    url = config['PREFERENCIAS_REDIS_URL']
+    cliente = _clientes.get(url)
+    if cliente is None:
+        import redis
+        cliente = redis.Redis.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2)
+        _clientes[url] = cliente
+    return cliente
+
+
+def _fallo_redis(error):
+    """Dejar de consultar Redis durante ESPERA_TRAS_FALLO segundos."""
+    global _fallo_hasta
+    from app.utils.logger import log_warning
+
+    log_warning('Versiones de preferencias no disponibles, se usa la caducidad de la caché', error=str(error))
+    _fallo_hasta = time.monotonic() + ESPERA_TRAS_FALLO
+
+
+def _versiones(usuario_ids):
+    """
+    Versión compartida de las preferencias de cada usuario.
+
+    Args:
+        usuario_ids: IDs de usuario
+
+    Returns:
+        dict: usuario_id -> versión, o None si no hay invalidación compartida
+    """
+    cliente = _cliente_versiones()
+    if cliente is None:
+        return None
+
+    try:
+        valores = cliente.mget([CLAVE_VERSION_GLOBAL] + [f'{PREFIJO_VERSION}{uid}' for uid in usuario_ids])
+    except Exception as e:
+        _fallo_redis(e)
+        return None
+
+    version_global = int(valores[0] or 0)
+    return {
+        usuario_id: (version_global, int(valor or 0))
+        for usuario_id, valor in zip(usuario_ids, valores[1:])
+    }
+
+
+def _cargar(usuario_ids):
+    """
+    Preferencias de varios usuarios (solo consulta las que no están en caché).
+
+    Args:
+        usuario_ids: IDs de usuario
+
+    Returns:
+        dict: usuario_id -> {tipo: (canal, resumen)}
+    """
+    ahora = time.monotonic()
+    usuario_ids = list(set(usuario_ids))
+    # Antes de consultar la base de datos: un cambio posterior deja la
+    # entrada con una versión antigua y se recarga en la siguiente lectura
+    versiones = _versiones(usuario_ids)
+
+    preferencias, faltan = {}, []
+    for usuario_id in usuario_ids:
+        version = versiones[usuario_id] if versiones else None
+        entrada = _cache.get(usuario_id)
+        if entrada and entrada[0] > ahora and (versiones is None or entrada[1] == version):
+            preferencias[usuario_id] = entrada[2]
+        else:
+            faltan.append(usuario_id)
+
+    if not faltan:
+        return preferencias
+
+    nuevas = {usuario_id: {} for usuario_id in faltan}
+    filas = db.session.execute(
+        select(PreferenciaNotificacion.usuario_id, PreferenciaNotificacion.tipo,
+               PreferenciaNotificacion.canal, PreferenciaNotificacion.resumen)
+        .where(PreferenciaNotificacion.usuario_id.in_(faltan))
+    ).all()
+    for usuario_id, tipo, canal, resumen in filas:
+        nuevas[usuario_id][tipo] = (canal, resumen)
+
+    expira = ahora + current_app.config['PREFERENCIAS_CACHE_SEGUNDOS']
+    with _lock:
+        for usuario_id, por_tipo in nuevas.items():
+            _cache[usuario_id] = (expira, versiones[usuario_id] if versiones else None, por_tipo)
+
+    preferencias.update(nuevas)
+    return preferencias
+
+
+def entregas(usuario_ids, tipo):
+    """
+    Canales de entrega de un tipo de notificación para varios usuarios.
+
+    Args:
+        usuario_ids: IDs de usuario
+        tipo: Tipo de notificación
+
+    Returns:
+        dict: usuario_id -> Entrega
+    """
+    preferencias = _cargar(usuario_ids)
+
+    resultado = {}
+    for usuario_id in usuario_ids:
+        preferencia = preferencias[usuario_id].get(tipo)
+        resultado[usuario_id] = _calcular_entrega(*preferencia) if preferencia else ENTREGA_DEFECTO
+    return resultado
+
+
+def entrega(usuario_id, tipo):
+    """
+    Canales de entrega de un tipo de notificación para un usuario.
+
+    Args:
+        usuario_id: ID del usuario
+        tipo: Tipo de notificación
+
+    Returns:
+        Entrega: Canales (email, app, resumen)
+    """
+    return entregas([usuario_id], tipo)[usuario_id]
+
+
+def invalidar_preferencias(usuario_id=None):
+    """
+    Descartar las preferencias cacheadas en este proceso y en el resto.
+
+    Se llama después del commit: incrementa la versión del usuario en Redis
+    para que los demás procesos (workers de gunicorn y Celery) las recarguen.
+
+    Args:
+        usuario_id: Usuario a invalidar (None = todos)
+    """
+    with _lock:
+        if usuario_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(usuario_id, None)
+
+    cliente = _cliente_versiones()
+    if cliente is None:
+        return
+
+    try:
+        cliente.incr(CLAVE_VERSION_GLOBAL if usuario_id is None else f'{PREFIJO_VERSION}{usuario_id}')
+    except Exception as e:
+        _fallo_redis(e)
+
+
+def obtener_preferencias(usuario_id):
+    """
+    Preferencias de un usuario para todos los tipos (con los valores por defecto).
+
+    Args:
+        usuario_id: ID del usuario
+
+    Returns:
+        list: Diccionarios con tipo, canal y resumen
+    """
+    guardadas = {
+        p.tipo: p for p in PreferenciaNotificacion.query.filter_by(usuario_id=usuario_id)
+    }
+    return [
+        guardadas[tipo].to_dict() if tipo in guardadas
+        else {'tipo': tipo, 'canal': 'ambos', 'resumen': False}
+        for tipo in TIPOS_NOTIFICACION
+    ]
+
+
+def guardar_preferencias(usuario_id, preferencias):
+    """
+    Crear o actualizar preferencias de un usuario (sin commit).
+
+    Args:
+        usuario_id: ID del usuario
+        preferencias: Lista de diccionarios con tipo y opcionalmente canal y resumen
+    """
+    guardadas = {
+        p.tipo: p for p in PreferenciaNotificacion.query.filter_by(usuario_id=usuario_id)
+    }
+    for datos in preferencias:
+        preferencia = guardadas.get(datos['tipo'])
+        if preferencia is None:
+            preferencia = PreferenciaNotificacion(usuario_id=usuario_id, tipo=datos['tipo'], canal='ambos', resumen=False)
+            db.session.add(preferencia)
+            guardadas[datos['tipo']] = preferencia
+        if 'canal' in datos:
+            preferencia.canal = datos['canal']
+        if 'resumen' in datos:
+            preferencia.resumen = datos['resumen']
+        preferencia.updated_at = datetime.utcnow()
+
+
+def notificaciones_para_resumen(desde, hasta, usuarios=None):
+    """
+    Notificaciones in-app no leídas que van en el resumen diario.
+
+    Args:
+        desde: Inicio de la ventana (exclusivo)
+        hasta: Fin de la ventana (inclusivo)
+        usuarios: IDs de usuario a los que limitar la consulta (None = todos)
+
+    Returns:
+        dict: usuario_id -> lista de Notificacion ordenadas por fecha
+    """
+    query = Notificacion.query.join(
+        PreferenciaNotificacion,
+        (PreferenciaNotificacion.usuario_id == Notificacion.usuario_id)
+        & (PreferenciaNotificacion.tipo == Notificacion.tipo)
+    ).filter(
+        PreferenciaNotificacion.resumen == True,
+        PreferenciaNotificacion.canal.in_(['ambos', 'email']),
+        Notificacion.leida == False,
+        Notificacion.created_at > desde,
+        Notificacion.created_at <= hasta
+    )
+    if usuarios is not None:
+        query = query.filter(Notificacion.usuario_id.in_(list(usuarios)))
+    notificaciones = query.order_by(Notificacion.usuario_id, Notificacion.created_at).all()
+
+    por_usuario = {}
+    for notificacion in notificaciones:
+        por_usuario.setdefault(notificacion.usuario_id, []).append(notificacion)
+    return por_usuario
@@ -0,0 +1,178 @@
+"""
+Servicio de recordatorios de SLA de solicitudes pendientes.
+
+Cuatro criterios generan recordatorios para los aprobadores:
+
+- proxima: la fecha requerida vence en RECORDATORIOS_DIAS_ANTES días o menos.
+- vencida: la fecha requerida ya pasó.
+- nueva: se creó después de la última ejecución con la fecha requerida ya
+  dentro del plazo de proxima (las marcas de fecha ya la habían superado).
+- estancada: lleva más de RECORDATORIOS_HORAS_ESTANCADA horas pendiente.
+
+Cada criterio recorre las pendientes en orden de su clave ((fecha_requerida,
+id) o (created_at, id)) a partir de una marca de agua persistida en
+marcas_agua, de modo que cada ejecución solo visita las solicitudes que han
+entrado en el criterio desde la anterior. proxima y vencida usan el índice
+(estado, fecha_requerida); nueva y estancada, el de created_at.
+"""
+from datetime import date, datetime, timedelta
+from flask import current_app
+from sqlalchemy import select, tuple_
+from app import db
+from app.models.marca_agua import MarcaAgua
+from app.models.notificacion import Notificacion
+from app.models.solicitud import Solicitud
+from app.utils.cursores import codificar_cursor, decodificar_cursor
+from app.utils.logger import log_warning
+
+
+CRITERIOS = ('proxima', 'vencida', 'nueva', 'estancada')
+
+
+def _criterio(nombre, ahora):
+    """
+    Columna de ordenación, tipo del cursor, límite superior, marca inicial y
+    condiciones adicionales de un criterio.
+
+    La marca inicial evita que la primera ejecución recuerde todo el histórico
+    de pendientes: solo se consideran las que entraron en el criterio durante
+    los últimos RECORDATORIOS_VENTANA_INICIAL_DIAS.
+
+    Returns:
+        tuple: (columna, tipo, límite, marca inicial, condiciones)
+    """
+    config = current_app.config
+    inicio = ahora - timedelta(days=config['RECORDATORIOS_VENTANA_INICIAL_DIAS'])
+    plazo = ahora.date() + timedelta(days=config['RECORDATORIOS_DIAS_ANTES'])
+
+    if nombre == 'proxima':
+        return Solicitud.fecha_requerida, date, plazo, (inicio.date(), 0), ()
+    if nombre == 'vencida':
+        return Solicitud.fecha_requerida, date, ahora.date() - timedelta(days=1), (inicio.date(), 0), ()
+    if nombre == 'nueva':
+        return Solicitud.created_at, datetime, ahora, (inicio, 0), (Solicitud.fecha_requerida <= plazo,)
+
+    horas = timedelta(hours=config['RECORDATORIOS_HORAS_ESTANCADA'])
+    return Solicitud.created_at, datetime, ahora - horas, (inicio - horas, 0), ()
+
+
+def _leer_marca(nombre, tipo, inicial):
+    """Leer la marca de agua de un criterio o devolver la inicial."""
+    valor = MarcaAgua.obtener(f'recordatorios:{nombre}')
+    if valor is None:
+        return inicial
+
+    try:
+        clave, ultimo_id = decodificar_cursor(valor, (str, int))
+        return (date.fromisoformat(clave) if tipo is date else datetime.fromisoformat(clave)), ultimo_id
+    except ValueError:
+        log_warning(f'Marca de agua de recordatorios inválida ({nombre}), se reinicia')
+        return inicial
+
+
+def _ya_recordadas(ids, desde):
+    """
+    Solicitudes que ya recibieron un recordatorio desde una fecha.
+
+    Usa el índice (solicitud_id, tipo) de notificaciones.
+
+    Returns:
+        set: IDs de solicitudes a omitir
+    """
+    return set(db.session.execute(
+        select(Notificacion.solicitud_id).where(
+            Notificacion.solicitud_id.in_(ids),
+            Notificacion.tipo == 'recordatorio',
+            Notificacion.created_at >= desde
+        ).distinct()
+    ).scalars())
+
+
+def generar_recordatorios(tamano_lote=None, max_lotes=None, encolar=None, ahora=None):
+    """
+    Encolar recordatorios para las pendientes que han entrado en algún criterio.
+
+    Cada lote lee como máximo tamano_lote solicitudes de un criterio, descarta
+    las que ya tienen un recordatorio en las últimas RECORDATORIOS_DEDUP_HORAS,
+    encola el resto y guarda la marca de agua. Si se
+    alcanza max_lotes la siguiente ejecución continúa donde se quedó.
+
+    Args:
+        tamano_lote: Solicitudes por lote (por defecto RECORDATORIOS_LOTE)
+        max_lotes: Máximo de lotes por ejecución (None = sin límite)
+        encolar: Función que recibe el ID y la prioridad de cada solicitud (por
+            defecto la tarea enviar_email_solicitud con tipo 'recordatorio')
+        ahora: Instante de referencia (por defecto ahora, UTC)
+
+    Returns:
+        dict: Recordatorios encolados y omitidos por criterio y lotes procesados
+    """
+    config = current_app.config
+    tamano_lote = tamano_lote or config['RECORDATORIOS_LOTE']
+    ahora = ahora or datetime.utcnow()
+    desde_dedup = ahora - timedelta(hours=config['RECORDATORIOS_DEDUP_HORAS'])
+
+    if encolar is None:
+        from app.tasks import prioridad_tarea
+        from app.tasks.email_tasks import enviar_email_solicitud
+
+        def encolar(solicitud_id, prioridad):
+            enviar_email_solicitud.apply_async(
+                (solicitud_id, 'recordatorio'), priority=prioridad_tarea(prioridad)
+            )
+
+    resumen = {'encolados': {}, 'omitidos': {}, 'lotes': 0, 'completado': True}
+    encolados_ahora = set()
+
+    for nombre in CRITERIOS:
+        columna, tipo, limite, inicial, condiciones = _criterio(nombre, ahora)
+        marca = _leer_marca(nombre, tipo, inicial)
+        resumen['encolados'][nombre] = 0
+        resumen['omitidos'][nombre] = 0
+
+        while True:
+            if max_lotes is not None and resumen['lotes'] >= max_lotes:
+                resumen['completado'] = False
+                return resumen
+
+            filas = db.session.execute(
+                select(Solicitud.id, columna, Solicitud.prioridad)
+                .where(
+                    Solicitud.estado == 'pendiente',
+                    tuple_(columna, Solicitud.id) > tuple_(*marca),
+                    columna <= limite,
+                    *condiciones
+                )
+                .order_by(columna, Solicitud.id)
+                .limit(tamano_lote)
+            ).all()
+
+            if not filas:
+                break
+
+            omitir = _ya_recordadas([fila[0] for fila in filas], desde_dedup) | encolados_ahora
+
+            for solicitud_id, _, prioridad in filas:
+                if solicitud_id in omitir:
+                    resumen['omitidos'][nombre] += 1
+                    continue
+                encolar(solicitud_id, prioridad)
+                encolados_ahora.add(solicitud_id)
+                resumen['encolados'][nombre] += 1
+
+            ultimo_id, ultima_clave, _ = filas[-1]
+            marca = (ultima_clave, ultimo_id)
+
+            try:
+                MarcaAgua.guardar(f'recordatorios:{nombre}', codificar_cursor(ultima_clave.isoformat(), ultimo_id))
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+
+            resumen['lotes'] += 1
+
+            if len(filas) < tamano_lote:
+                break
+
+    return resumen
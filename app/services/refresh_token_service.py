@@ -0,0 +1,154 @@
+"""Servicio del almacén de refresh tokens (rotación y revocación por familia)."""
+import hashlib
+import uuid
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import delete, select, update
+from app import db
+from app.models.refresh_token import RefreshToken
+from app.utils.logger import log_warning
+
+
+def _hash_jti(jti):
+    """SHA-256 del jti (clave del almacén)."""
+    return hashlib.sha256(jti.encode('utf-8')).digest()
+
+
+def registrar_refresh_token(usuario_id, familia=None):
+    """
+    Reservar un jti para un nuevo refresh token y guardarlo en el almacén.
+
+    No hace commit: el token se confirma junto con el resto de la operación
+    (login, registro o rotación).
+
+    Args:
+        usuario_id: ID del usuario
+        familia: Familia de la sesión (None = nueva sesión)
+
+    Returns:
+        dict: Claims a incluir en el token (jti y fam)
+    """
+    jti = str(uuid.uuid4())
+    familia = familia or uuid.uuid4().hex
+
+    db.session.add(RefreshToken(
+        jti_hash=_hash_jti(jti),
+        familia=familia,
+        usuario_id=usuario_id,
+        expira_en=datetime.utcnow() + current_app.config['JWT_REFRESH_TOKEN_EXPIRES']
+    ))
+
+    return {'jti': jti, 'fam': familia}
+
+
+def rotar_refresh_token(jwt_payload):
+    """
+    Consumir un refresh token presentado por el cliente.
+
+    El token se marca como usado con un UPDATE condicional, de modo que dos
+    peticiones concurrentes con el mismo token no pueden rotarlo ambas. Si se
+    presenta un token ya usado se asume que fue robado y se revoca su familia
+    completa (el atacante y el usuario legítimo deberán iniciar sesión).
+
+    Args:
+        jwt_payload: Claims del refresh token ya validado (firma y expiración)
+
+    Returns:
+        tuple: (familia, error_mensaje)
+    """
+    jti_hash = _hash_jti(jwt_payload['jti'])
+
+    resultado = db.session.execute(
+        update(RefreshToken)
+        .where(RefreshToken.jti_hash == jti_hash, RefreshToken.usado == False)
+        .values(usado=True)
+    )
+
+    if resultado.rowcount == 1:
+        familia = db.session.execute(
+            select(RefreshToken.familia).where(RefreshToken.jti_hash == jti_hash)
+        ).scalar_one()
+        return familia, None
+
+    familia = db.session.execute(
+        select(RefreshToken.familia).where(RefreshToken.jti_hash == jti_hash)
+    ).scalar()
+
+    if familia is None:
+        # Revocado, purgado o emitido antes del almacén
+        return None, 'Refresh token revocado'
+
+    revocar_familia(familia)
+    db.session.commit()
+    log_warning(
+        'Reutilización de refresh token, sesión revocada',
+        familia=familia,
+        usuario_id=jwt_payload.get('sub')
+    )
+    return None, 'Refresh token revocado'
+
+
+def revocar_familia(familia):
+    """
+    Revocar una sesión (todos los refresh tokens de la familia). No hace commit.
+
+    Args:
+        familia: Familia de la sesión
+
+    Returns:
+        int: Tokens eliminados
+    """
+    return db.session.execute(
+        delete(RefreshToken).where(RefreshToken.familia == familia)
+    ).rowcount
+
+
+def revocar_sesiones_usuario(usuario_id):
+    """
+    Revocar todas las sesiones de un usuario. No hace commit.
+
+    Args:
+        usuario_id: ID del usuario
+
+    Returns:
+        int: Tokens eliminados
+    """
+    return db.session.execute(
+        delete(RefreshToken).where(RefreshToken.usuario_id == usuario_id)
+    ).rowcount
+
+
+def purgar_refresh_tokens(tamano_lote=5000, max_lotes=None):
+    """
+    Eliminar del almacén los refresh tokens caducados en lotes acotados.
+
+    Args:
+        tamano_lote: Tokens eliminados por transacción
+        max_lotes: Máximo de lotes por ejecución (None = sin límite)
+
+    Returns:
+        dict: Resumen de la ejecución
+    """
+    ahora = datetime.utcnow()
+    total = 0
+    lotes = 0
+
+    while max_lotes is None or lotes < max_lotes:
+        claves = select(RefreshToken.jti_hash).where(RefreshToken.expira_en < ahora).limit(tamano_lote)
+
+        try:
+            eliminados = db.session.execute(
+                delete(RefreshToken).where(RefreshToken.jti_hash.in_(claves))
+            ).rowcount
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        if not eliminados:
+            break
+
+        total += eliminados
+        lotes += 1
+
+    return {'eliminados': total, 'lotes': lotes}
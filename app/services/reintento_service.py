@@ -0,0 +1,203 @@
+"""
+Servicio de reintento de emails de notificaciones fallidos.
+
+Los envíos fallidos quedan en notificaciones con enviado=False e intentos
+incrementado. El barrido recorre esas filas por el índice (enviado,
+created_at) desde una marca de agua que da la vuelta al llegar al final, de
+modo que ejecuciones acotadas acaban visitando toda la ventana. Cada fila se
+reintenta cuando ha pasado su espera (exponencial según intentos) y se
+descarta al agotar NOTIFICACIONES_MAX_INTENTOS.
+"""
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select, tuple_, update
+from app import db
+from app.models.marca_agua import MarcaAgua
+from app.models.notificacion import Notificacion
+from app.utils.cursores import codificar_cursor, decodificar_cursor
+from app.utils.metricas import EMAIL_REINTENTOS
+
+
+MARCA = 'reintentos:notificaciones'
+
+
+def espera_reintento(intentos):
+    """
+    Tiempo mínimo desde el último intento antes de volver a enviar.
+
+    Una notificación sin intentos registrados puede estar aún en la cola de
+    Celery, así que solo se recupera pasado NOTIFICACIONES_REINTENTO_GRACIA.
+
+    Args:
+        intentos: Intentos fallidos registrados
+
+    Returns:
+        timedelta: Espera
+    """
+    config = current_app.config
+    if intentos <= 0:
+        return timedelta(seconds=config['NOTIFICACIONES_REINTENTO_GRACIA'])
+
+    segundos = config['NOTIFICACIONES_REINTENTO_ESPERA_BASE'] * 2 ** (intentos - 1)
+    return timedelta(seconds=min(segundos, config['NOTIFICACIONES_REINTENTO_ESPERA_MAX']))
+
+
+def _despachar_lote(ids):
+    """Encolar el reenvío de un lote con una sola conexión SMTP."""
+    from app.tasks.email_tasks import reenviar_notificaciones_lote
+    reenviar_notificaciones_lote.delay(ids)
+
+
+def barrer_notificaciones_fallidas(tamano_lote=None, max_lotes=None, despachar=None, ahora=None):
+    """
+    Reencolar las notificaciones no enviadas cuya espera ha vencido.
+
+    Cada página lee tamano_lote filas no enviadas de la ventana de
+    NOTIFICACIONES_REINTENTO_VENTANA_DIAS. Las que agotaron los intentos se
+    descartan; las que cumplieron su espera se despachan juntas y su
+    updated_at se adelanta para que el siguiente barrido no las repita antes
+    de que el lote se procese.
+
+    Args:
+        tamano_lote: Filas por página y por lote de envío (por defecto NOTIFICACIONES_REINTENTO_LOTE)
+        max_lotes: Máximo de páginas por ejecución (None = hasta el final)
+        despachar: Función que recibe la lista de IDs de cada lote (por
+            defecto la tarea reenviar_notificaciones_lote)
+        ahora: Instante de referencia (por defecto ahora, UTC)
+
+    Returns:
+        dict: Notificaciones despachadas, descartadas, en espera y páginas leídas
+    """
+    config = current_app.config
+    tamano_lote = tamano_lote or config['NOTIFICACIONES_REINTENTO_LOTE']
+    despachar = despachar or _despachar_lote
+    ahora = ahora or datetime.utcnow()
+    max_intentos = config['NOTIFICACIONES_MAX_INTENTOS']
+    desde = ahora - timedelta(days=config['NOTIFICACIONES_REINTENTO_VENTANA_DIAS'])
+
+    marca = (desde, 0)
+    valor = MarcaAgua.obtener(MARCA)
+    if valor is not None:
+        try:
+            marca = max(marca, decodificar_cursor(valor, (datetime, int)))
+        except ValueError:
+            pass
+
+    resumen = {'despachadas': 0, 'descartadas': 0, 'en_espera': 0, 'lotes': 0, 'completado': False}
+
+    while max_lotes is None or resumen['lotes'] < max_lotes:
+        filas = db.session.execute(
+            select(Notificacion.id, Notificacion.created_at, Notificacion.updated_at, Notificacion.intentos)
+            .where(
+                Notificacion.enviado == False,
+                tuple_(Notificacion.created_at, Notificacion.id) > tuple_(*marca),
+                Notificacion.descartada == False,
+                Notificacion.destinatario_email.isnot(None)
+            )
+            .order_by(Notificacion.created_at, Notificacion.id)
+            .limit(tamano_lote)
+        ).all()
+
+        listas, agotadas = [], []
+        for fila in filas:
+            if fila.intentos >= max_intentos:
+                agotadas.append(fila.id)
+            elif (fila.updated_at or fila.created_at) + espera_reintento(fila.intentos) <= ahora:
+                listas.append(fila.id)
+            else:
+                resumen['en_espera'] += 1
+
+        # Al llegar al final la siguiente ejecución empieza de nuevo por el principio
+        completado = len(filas) < tamano_lote
+        marca = (filas[-1].created_at, filas[-1].id) if filas else marca
+
+        try:
+            if agotadas:
+                db.session.execute(
+                    update(Notificacion).where(Notificacion.id.in_(agotadas))
+                    .values(descartada=True, updated_at=ahora)
+                )
+            if listas:
+                db.session.execute(
+                    update(Notificacion).where(Notificacion.id.in_(listas)).values(updated_at=ahora)
+                )
+            MarcaAgua.guardar(MARCA, codificar_cursor(*((desde, 0) if completado else marca)))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        if listas:
+            despachar(listas)
+
+        resumen['despachadas'] += len(listas)
+        resumen['descartadas'] += len(agotadas)
+        resumen['lotes'] += 1
+        EMAIL_REINTENTOS.labels(resultado='despachada').inc(len(listas))
+        EMAIL_REINTENTOS.labels(resultado='descartada').inc(len(agotadas))
+
+        if completado:
+            resumen['completado'] = True
+            break
+
+    return resumen
+
+
+def reactivar_descartadas(tipo=None, desde=None, tamano_lote=None, despachar=None):
+    """
+    Reenviar en lote las notificaciones descartadas.
+
+    Reinicia sus intentos y las despacha en lotes de tamano_lote con una
+    conexión SMTP por lote; si vuelven a fallar, el barrido las reintenta
+    con la espera normal.
+
+    Args:
+        tipo: Filtrar por tipo de notificación (opcional)
+        desde: Solo las creadas a partir de esta fecha (opcional)
+        tamano_lote: Notificaciones por lote (por defecto NOTIFICACIONES_REINTENTO_LOTE)
+        despachar: Función que recibe la lista de IDs de cada lote
+
+    Returns:
+        dict: Notificaciones reactivadas y lotes despachados
+    """
+    tamano_lote = tamano_lote or current_app.config['NOTIFICACIONES_REINTENTO_LOTE']
+    despachar = despachar or _despachar_lote
+
+    condiciones = [Notificacion.enviado == False, Notificacion.descartada == True]
+    if tipo:
+        condiciones.append(Notificacion.tipo == tipo)
+    if desde:
+        condiciones.append(Notificacion.created_at >= desde)
+
+    resumen = {'reactivadas': 0, 'lotes': 0}
+    marca = (datetime.min, 0)
+
+    while True:
+        filas = db.session.execute(
+            select(Notificacion.id, Notificacion.created_at)
+            .where(*condiciones, tuple_(Notificacion.created_at, Notificacion.id) > tuple_(*marca))
+            .order_by(Notificacion.created_at, Notificacion.id)
+            .limit(tamano_lote)
+        ).all()
+
+        if not filas:
+            break
+
+        ids = [fila.id for fila in filas]
+        marca = (filas[-1].created_at, filas[-1].id)
+
+        try:
+            db.session.execute(
+                update(Notificacion).where(Notificacion.id.in_(ids))
+                .values(descartada=False, intentos=0, error_mensaje=None, updated_at=datetime.utcnow())
+            )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        despachar(ids)
+        resumen['reactivadas'] += len(ids)
+        resumen['lotes'] += 1
+
+    return resumen
@@ -0,0 +1,491 @@
+"""Servicio de retención, archivo y particionado de solicitudes y notificaciones."""
+import gzip
+import json
+import os
+from datetime import date, datetime, timedelta
+from sqlalchemy import delete, func, insert, literal, or_, select, text, union_all
+from app import db
+from app.models.archivo import NotificacionArchivada, SolicitudArchivada
+from app.models.cambio import registrar_eliminaciones
+from app.models.notificacion import Notificacion
+from app.models.solicitud import Solicitud
+
+
+def _condicion_archivable(fecha_limite):
+    """Notificaciones enviadas (email) o leídas (in-app) anteriores a la fecha límite."""
+    return (
+        Notificacion.created_at < fecha_limite,
+        or_(Notificacion.enviado == True, Notificacion.leida == True)
+    )
+
+
+def _serializar(valor):
+    """Convertir valores de columna a tipos serializables en JSON."""
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    return valor
+
+
+def _archivar_lote_tabla(ids, ahora):
+    """Copiar un lote de notificaciones a la tabla de archivo."""
+    tabla = Notificacion.__table__
+    columnas = [col.name for col in tabla.columns]
+
+    db.session.execute(
+        insert(NotificacionArchivada.__table__).from_select(
+            columnas + ['archivado_at'],
+            select(*tabla.columns, literal(ahora)).where(tabla.c.id.in_(ids))
+        )
+    )
+
+
+def _archivar_lote_jsonl(ids, archivo):
+    """Escribir un lote de notificaciones en un fichero JSONL comprimido."""
+    tabla = Notificacion.__table__
+    filas = db.session.execute(select(tabla).where(tabla.c.id.in_(ids))).mappings()
+
+    for fila in filas:
+        registro = {clave: _serializar(valor) for clave, valor in fila.items()}
+        archivo.write(json.dumps(registro, ensure_ascii=False) + '\n')
+
+
+def archivar_notificaciones(dias=None, tamano_lote=None, max_lotes=None, destino=None, directorio=None):
+    """
+    Mover notificaciones antiguas enviadas/leídas al archivo en lotes acotados.
+
+    Cada lote se copia y se elimina en una transacción corta, de modo que los
+    bloqueos sobre notificaciones duran lo que tarda un lote y no la ejecución
+    completa.
+
+    Args:
+        dias: Antigüedad mínima en días (por defecto NOTIFICACIONES_RETENCION_DIAS)
+        tamano_lote: Filas por lote (por defecto NOTIFICACIONES_ARCHIVO_LOTE)
+        max_lotes: Máximo de lotes por ejecución (None = sin límite)
+        destino: 'tabla' (notificaciones_archivo) o 'jsonl' (ficheros .jsonl.gz)
+        directorio: Directorio de los ficheros JSONL (por defecto ARCHIVO_DIR)
+
+    Returns:
+        dict: Resumen con filas archivadas, lotes y fichero generado
+    """
+    from flask import current_app
+
+    config = current_app.config
+    dias = dias if dias is not None else config['NOTIFICACIONES_RETENCION_DIAS']
+    tamano_lote = tamano_lote or config['NOTIFICACIONES_ARCHIVO_LOTE']
+    destino = destino or config['NOTIFICACIONES_ARCHIVO_DESTINO']
+
+    if destino not in ('tabla', 'jsonl'):
+        raise ValueError(f'Destino de archivo inválido: {destino}')
+
+    ahora = datetime.utcnow()
+    fecha_limite = ahora - timedelta(days=dias)
+    condicion = _condicion_archivable(fecha_limite)
+
+    archivo = None
+    ruta = None
+    if destino == 'jsonl':
+        directorio = directorio or config['ARCHIVO_DIR']
+        os.makedirs(directorio, exist_ok=True)
+        ruta = os.path.join(directorio, f"notificaciones-{ahora.strftime('%Y%m%d-%H%M%S')}.jsonl.gz")
+        archivo = gzip.open(ruta, 'wt', encoding='utf-8')
+
+    total = 0
+    lotes = 0
+    ultimo_id = 0
+
+    try:
+        while max_lotes is None or lotes < max_lotes:
+            # Recorrer por id para que cada lote sea un rango de índice acotado
+            ids = [
+                fila.id for fila in
+                db.session.query(Notificacion.id)
+                .filter(*condicion, Notificacion.id > ultimo_id)
+                .order_by(Notificacion.id)
+                .limit(tamano_lote)
+                .all()
+            ]
+
+            if not ids:
+                break
+
+            try:
+                if destino == 'tabla':
+                    _archivar_lote_tabla(ids, ahora)
+                else:
+                    _archivar_lote_jsonl(ids, archivo)
+                    archivo.flush()
+
+                db.session.execute(delete(Notificacion.__table__).where(Notificacion.id.in_(ids)))
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+
+            total += len(ids)
+            lotes += 1
+            ultimo_id = ids[-1]
+    finally:
+        if archivo:
+            archivo.close()
+
+    if ruta and total == 0:
+        os.remove(ruta)
+        ruta = None
+
+    return {'archivadas': total, 'lotes': lotes, 'destino': destino, 'fichero': ruta}
+
+
+# --- Archivo de solicitudes terminadas ---
+
+ESTADOS_ARCHIVABLES = ('completada', 'rechazada')
+
+
+def archivar_solicitudes(dias=None, tamano_lote=None, max_lotes=None):
+    """
+    Mover solicitudes completadas/rechazadas antiguas y sus notificaciones al archivo.
+
+    Cada lote copia las solicitudes a solicitudes_archivo y sus notificaciones
+    a notificaciones_archivo, y las elimina de las tablas principales en una
+    única transacción corta. Las solicitudes archivadas dejan una lápida en el
+    feed de cambios, como cualquier otra eliminación.
+
+    Args:
+        dias: Días desde la última actualización (por defecto SOLICITUDES_ARCHIVO_DIAS)
+        tamano_lote: Solicitudes por lote (por defecto SOLICITUDES_ARCHIVO_LOTE)
+        max_lotes: Máximo de lotes por ejecución (None = sin límite)
+
+    Returns:
+        dict: Resumen con solicitudes y notificaciones archivadas
+    """
+    from flask import current_app
+
+    config = current_app.config
+    dias = dias if dias is not None else config['SOLICITUDES_ARCHIVO_DIAS']
+    tamano_lote = tamano_lote or config['SOLICITUDES_ARCHIVO_LOTE']
+
+    ahora = datetime.utcnow()
+    fecha_limite = ahora - timedelta(days=dias)
+
+    tabla = Solicitud.__table__
+    tabla_notif = Notificacion.__table__
+    columnas = [col.name for col in tabla.columns]
+    columnas_notif = [col.name for col in tabla_notif.columns]
+
+    total = 0
+    total_notif = 0
+    lotes = 0
+    ultimo_id = 0
+
+    while max_lotes is None or lotes < max_lotes:
+        filas = (
+            db.session.query(Solicitud.id, Solicitud.usuario_id)
+            .filter(
+                Solicitud.estado.in_(ESTADOS_ARCHIVABLES),
+                func.coalesce(Solicitud.updated_at, Solicitud.created_at) < fecha_limite,
+                Solicitud.id > ultimo_id
+            )
+            .order_by(Solicitud.id)
+            .limit(tamano_lote)
+            .all()
+        )
+        ids = [fila.id for fila in filas]
+
+        if not ids:
+            break
+
+        try:
+            db.session.execute(
+                insert(SolicitudArchivada.__table__).from_select(
+                    columnas + ['archivado_at'],
+                    select(*tabla.columns, literal(ahora)).where(tabla.c.id.in_(ids))
+                )
+            )
+            resultado = db.session.execute(
+                insert(NotificacionArchivada.__table__).from_select(
+                    columnas_notif + ['archivado_at'],
+                    select(*tabla_notif.columns, literal(ahora)).where(tabla_notif.c.solicitud_id.in_(ids))
+                )
+            )
+            total_notif += max(resultado.rowcount, 0)
+
+            db.session.execute(delete(tabla_notif).where(tabla_notif.c.solicitud_id.in_(ids)))
+            registrar_eliminaciones(db.session.connection(), [(fila.id, fila.usuario_id) for fila in filas])
+            db.session.execute(delete(tabla).where(tabla.c.id.in_(ids)))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        total += len(ids)
+        lotes += 1
+        ultimo_id = ids[-1]
+
+    return {'archivadas': total, 'notificaciones': total_notif, 'lotes': lotes}
+
+
+def paginar_con_archivadas(query_activas, query_archivadas, page, per_page,
+                           opciones_activas=(), opciones_archivadas=()):
+    """
+    Paginar solicitudes activas y archivadas como un único listado.
+
+    Ordena la unión de ambos orígenes por created_at descendente y solo carga
+    las filas completas de la página pedida.
+
+    Args:
+        query_activas: Query de Solicitud con los filtros aplicados
+        query_archivadas: Query de SolicitudArchivada con los mismos filtros
+        page: Número de página
+        per_page: Items por página
+        opciones_activas: Opciones de carga de las solicitudes de la página
+        opciones_archivadas: Opciones de carga de las archivadas de la página
+
+    Returns:
+        tuple: (items, total) con instancias de Solicitud y SolicitudArchivada
+    """
+    activas = query_activas.with_entities(
+        Solicitud.id.label('id'),
+        Solicitud.created_at.label('created_at'),
+        literal(False).label('archivada')
+    ).order_by(None)
+    archivadas = query_archivadas.with_entities(
+        SolicitudArchivada.id.label('id'),
+        SolicitudArchivada.created_at.label('created_at'),
+        literal(True).label('archivada')
+    ).order_by(None)
+
+    union = union_all(activas.statement, archivadas.statement).subquery()
+
+    total = db.session.execute(select(func.count()).select_from(union)).scalar()
+
+    page = max(page, 1)
+    filas = db.session.execute(
+        select(union.c.id, union.c.archivada)
+        .order_by(union.c.created_at.desc(), union.c.id.desc())
+        .offset((page - 1) * per_page)
+        .limit(per_page)
+    ).all()
+
+    ids_activas = [fila.id for fila in filas if not fila.archivada]
+    ids_archivadas = [fila.id for fila in filas if fila.archivada]
+
+    cargadas = {}
+    if ids_activas:
+        for sol in Solicitud.query.options(*opciones_activas).filter(Solicitud.id.in_(ids_activas)):
+            cargadas[(sol.id, False)] = sol
+    if ids_archivadas:
+        query = SolicitudArchivada.query.options(*opciones_archivadas)
+        for sol in query.filter(SolicitudArchivada.id.in_(ids_archivadas)):
+            cargadas[(sol.id, True)] = sol
+
+    items = [cargadas[(fila.id, bool(fila.archivada))] for fila in filas if (fila.id, bool(fila.archivada)) in cargadas]
+    return items, total
+
+
+# --- Particionado mensual (solo PostgreSQL) ---
+
+def _inicio_mes(fecha):
+    """Primer día del mes de la fecha."""
+    return date(fecha.year, fecha.month, 1)
+
+
+def _mes_siguiente(fecha):
+    """Primer día del mes siguiente."""
+    if fecha.month == 12:
+        return date(fecha.year + 1, 1, 1)
+    return date(fecha.year, fecha.month + 1, 1)
+
+
+def _nombre_particion(mes, tabla='notificaciones'):
+    """Nombre de la partición mensual."""
+    return f'{tabla}_p{mes.year}_{mes.month:02d}'
+
+
+def esta_particionada(conn, tabla='notificaciones'):
+    """
+    Verificar si una tabla de PostgreSQL está particionada.
+
+    Args:
+        conn: Conexión SQLAlchemy
+        tabla: Nombre de la tabla
+
+    Returns:
+        bool: True si la tabla es particionada
+    """
+    if conn.dialect.name != 'postgresql':
+        return False
+
+    resultado = conn.execute(text("""
+        SELECT 1 FROM pg_partitioned_table p
+        JOIN pg_class c ON c.oid = p.partrelid
+        WHERE c.relname = :tabla
+    """), {'tabla': tabla}).first()
+    return resultado is not None
+
+
+def _crear_particiones(conn, tabla_padre, desde, hasta, prefijo='notificaciones'):
+    """Crear las particiones mensuales en el rango [desde, hasta]."""
+    creadas = []
+    mes = _inicio_mes(desde)
+
+    while mes <= hasta:
+        siguiente = _mes_siguiente(mes)
+        nombre = _nombre_particion(mes, prefijo)
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {nombre} PARTITION OF {tabla_padre} "
+            f"FOR VALUES FROM ('{mes.isoformat()}') TO ('{siguiente.isoformat()}')"
+        ))
+        creadas.append(nombre)
+        mes = siguiente
+
+    return creadas
+
+
+def crear_particiones_notificaciones(meses_adelante=None):
+    """
+    Crear por adelantado las particiones mensuales de notificaciones.
+
+    No hace nada si la base no es PostgreSQL o la tabla no está particionada.
+
+    Args:
+        meses_adelante: Meses futuros a preparar (por defecto NOTIFICACIONES_PARTICIONES_ADELANTE)
+
+    Returns:
+        list: Nombres de las particiones verificadas/creadas
+    """
+    from flask import current_app
+
+    if meses_adelante is None:
+        meses_adelante = current_app.config['NOTIFICACIONES_PARTICIONES_ADELANTE']
+
+    with db.engine.begin() as conn:
+        if not esta_particionada(conn):
+            return []
+
+        hoy = _inicio_mes(datetime.utcnow())
+        hasta = hoy
+        for _ in range(meses_adelante):
+            hasta = _mes_siguiente(hasta)
+
+        return _crear_particiones(conn, 'notificaciones', hoy, hasta)
+
+
+def particionar_notificaciones(tamano_lote=10000, meses_adelante=3, log=print):
+    """
+    Convertir la tabla notificaciones en una tabla particionada por mes de created_at.
+
+    La copia se hace en lotes por rango de id fuera de la transacción final.
+    Solo el último paso (copiar filas nuevas o modificadas durante la copia e
+    intercambiar nombres) se ejecuta con la tabla bloqueada. La tabla original
+    se conserva como notificaciones_legacy, sin claves foráneas para que no
+    impida eliminar usuarios ni solicitudes.
+
+    Args:
+        tamano_lote: Filas copiadas por transacción
+        meses_adelante: Particiones futuras a crear
+        log: Función para informar del progreso
+    """
+    from sqlalchemy.schema import CreateIndex
+
+    engine = db.engine
+    if engine.dialect.name != 'postgresql':
+        raise RuntimeError('El particionado solo está soportado en PostgreSQL')
+
+    tabla = Notificacion.__table__
+    nueva = 'notificaciones_particionada'
+
+    with engine.begin() as conn:
+        if esta_particionada(conn):
+            log('La tabla notificaciones ya está particionada')
+            return
+
+        conn.execute(text(f"DROP TABLE IF EXISTS {nueva}"))
+        conn.execute(text(
+            f"CREATE TABLE {nueva} (LIKE notificaciones INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            f"PARTITION BY RANGE (created_at)"
+        ))
+        # La clave de partición debe formar parte de la clave primaria
+        conn.execute(text(f"ALTER TABLE {nueva} ADD PRIMARY KEY (id, created_at)"))
+        conn.execute(text(
+            f"ALTER TABLE {nueva} ADD FOREIGN KEY (usuario_id) REFERENCES usuarios(id) ON DELETE CASCADE"
+        ))
+        conn.execute(text(
+            f"ALTER TABLE {nueva} ADD FOREIGN KEY (solicitud_id) REFERENCES solicitudes(id) ON DELETE CASCADE"
+        ))
+
+        minimo = conn.execute(text("SELECT min(created_at) FROM notificaciones")).scalar()
+        desde = minimo.date() if minimo else datetime.utcnow().date()
+        hasta = _inicio_mes(datetime.utcnow())
+        for _ in range(meses_adelante):
+            hasta = _mes_siguiente(hasta)
+
+        particiones = _crear_particiones(conn, nueva, desde, hasta)
+        log(f'✓ {len(particiones)} particiones mensuales creadas')
+
+    # Copia en lotes (la tabla original sigue en uso)
+    inicio_copia = datetime.utcnow()
+    ultimo_id = 0
+    copiadas = 0
+    while True:
+        with engine.begin() as conn:
+            hasta_id = conn.execute(text(
+                "SELECT max(id) FROM (SELECT id FROM notificaciones WHERE id > :ultimo "
+                "ORDER BY id LIMIT :lote) t"
+            ), {'ultimo': ultimo_id, 'lote': tamano_lote}).scalar()
+
+            if hasta_id is None:
+                break
+
+            resultado = conn.execute(text(
+                f"INSERT INTO {nueva} SELECT * FROM notificaciones WHERE id > :desde AND id <= :hasta"
+            ), {'desde': ultimo_id, 'hasta': hasta_id})
+            copiadas += resultado.rowcount
+            ultimo_id = hasta_id
+
+        log(f'  {copiadas} filas copiadas (id <= {ultimo_id})')
+
+    # Índices con nombre temporal, antes de bloquear la tabla original
+    with engine.begin() as conn:
+        for indice in tabla.indexes:
+            ddl = str(CreateIndex(indice).compile(dialect=engine.dialect))
+            ddl = ddl.replace(f'INDEX {indice.name} ON notificaciones ', f'INDEX {indice.name}_p ON {nueva} ', 1)
+            conn.execute(text(ddl))
+    log('✓ Índices creados en la tabla particionada')
+
+    # Intercambio final con la tabla bloqueada
+    with engine.begin() as conn:
+        conn.execute(text("LOCK TABLE notificaciones IN EXCLUSIVE MODE"))
+
+        # Filas modificadas durante la copia (marcadas como leídas/enviadas)
+        conn.execute(text(
+            f"DELETE FROM {nueva} WHERE id IN "
+            f"(SELECT id FROM notificaciones WHERE id <= :ultimo AND updated_at >= :inicio)"
+        ), {'ultimo': ultimo_id, 'inicio': inicio_copia})
+        conn.execute(text(
+            f"INSERT INTO {nueva} SELECT * FROM notificaciones "
+            f"WHERE id > :ultimo OR updated_at >= :inicio"
+        ), {'ultimo': ultimo_id, 'inicio': inicio_copia})
+
+        # Filas eliminadas durante la copia (archivado, eliminación de usuarios)
+        conn.execute(text(
+            f"DELETE FROM {nueva} n WHERE n.id <= :ultimo "
+            f"AND NOT EXISTS (SELECT 1 FROM notificaciones o WHERE o.id = n.id)"
+        ), {'ultimo': ultimo_id})
+
+        conn.execute(text("ALTER TABLE notificaciones RENAME TO notificaciones_legacy"))
+
+        # Las FK originales no tienen ON DELETE CASCADE: con ellas la tabla
+        # legacy bloquearía la eliminación de usuarios y solicitudes
+        claves_foraneas = conn.execute(text(
+            "SELECT conname FROM pg_constraint "
+            "WHERE conrelid = 'notificaciones_legacy'::regclass AND contype = 'f'"
+        )).scalars().all()
+        for nombre in claves_foraneas:
+            conn.execute(text(f'ALTER TABLE notificaciones_legacy DROP CONSTRAINT "{nombre}"'))
+        for indice in tabla.indexes:
+            conn.execute(text(f"ALTER INDEX IF EXISTS {indice.name} RENAME TO {indice.name}_legacy"))
+            conn.execute(text(f"ALTER INDEX {indice.name}_p RENAME TO {indice.name}"))
+
+        conn.execute(text(f"ALTER TABLE {nueva} RENAME TO notificaciones"))
+        conn.execute(text("ALTER SEQUENCE notificaciones_id_seq OWNED BY notificaciones.id"))
+
+    log('✓ notificaciones particionada (tabla original en notificaciones_legacy)')
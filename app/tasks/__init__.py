@@ -1,15 +1,86 @@
 """Tareas asíncronas de Celery."""
 from celery import Celery
+from celery.schedules import crontab
+from celery.signals import (
+    after_setup_logger,
+    after_setup_task_logger,
+    before_task_publish,
+    task_postrun,
+    task_prerun,
+    worker_init,
+    worker_process_shutdown
+)
 import os
+import shutil
 
 # Configurar Celery
 celery_app = Celery(
     'solicitudes',
     broker=os.getenv('REDIS_URL', 'redis://localhost:6379/0'),
     backend=os.getenv('REDIS_URL', 'redis://localhost:6379/0'),
-    include=['app.tasks.email_tasks']
+    include=['app.tasks.email_tasks', 'app.tasks.mantenimiento_tasks', 'app.tasks.recordatorio_tasks']
 )
 
+# Colas: cada una la consume un worker propio (ver docker-compose.yml) para
+# que una difusión a cientos de aprobadores o un archivado nocturno no
+# retrasen los emails de aprobación/rechazo.
+#   notificaciones: emails transaccionales (aprobada, rechazada, reenvíos)
+#   difusion:       emails a los aprobadores (solicitud creada, recordatorios) y resúmenes diarios
+#   mantenimiento:  barridos, retención, particiones y eliminaciones
+COLA_NOTIFICACIONES = 'notificaciones'
+COLA_DIFUSION = 'difusion'
+COLA_MANTENIMIENTO = 'mantenimiento'
+
+# Ajuste recomendado del worker de cada cola (--concurrency / --prefetch-multiplier).
+# Con prefetch 1 un worker libre toma siempre el mensaje de mayor prioridad
+# disponible; la difusión prima el throughput y el mantenimiento son tareas largas.
+WORKERS_POR_COLA = {
+    COLA_NOTIFICACIONES: {'concurrency': 4, 'prefetch_multiplier': 1},
+    COLA_DIFUSION: {'concurrency': 4, 'prefetch_multiplier': 4},
+    COLA_MANTENIMIENTO: {'concurrency': 1, 'prefetch_multiplier': 1},
+}
+
+TIPOS_DIFUSION = ('solicitud_creada', 'recordatorio')
+
+# Prioridad de los mensajes según Solicitud.prioridad. En el broker Redis
+# 0 es la prioridad más alta.
+PRIORIDADES_TAREA = {'urgente': 0, 'alta': 3, 'media': 6, 'baja': 9}
+PRIORIDAD_TAREA_DEFECTO = PRIORIDADES_TAREA['media']
+
+RUTAS_TAREAS = {
+    'app.tasks.email_tasks.enviar_bloque_difusion': {'queue': COLA_DIFUSION},
+    'app.tasks.email_tasks.registrar_difusion': {'queue': COLA_DIFUSION},
+    'app.tasks.email_tasks.enviar_resumenes_notificaciones': {'queue': COLA_DIFUSION},
+    'app.tasks.email_tasks.reenviar_notificacion': {'queue': COLA_NOTIFICACIONES},
+    'app.tasks.email_tasks.reenviar_notificaciones_lote': {'queue': COLA_NOTIFICACIONES},
+    'app.tasks.email_tasks.barrer_notificaciones_fallidas': {'queue': COLA_MANTENIMIENTO},
+    'app.tasks.recordatorio_tasks.*': {'queue': COLA_MANTENIMIENTO},
+    'app.tasks.mantenimiento_tasks.*': {'queue': COLA_MANTENIMIENTO},
+}
+
+
+def prioridad_tarea(prioridad):
+    """
+    Prioridad del mensaje de Celery para una prioridad de solicitud.
+
+    Args:
+        prioridad: Prioridad de la solicitud (baja, media, alta, urgente)
+
+    Returns:
+        int: Prioridad del mensaje (0 = más alta)
+    """
+    return PRIORIDADES_TAREA.get(prioridad, PRIORIDAD_TAREA_DEFECTO)
+
+
+def enrutar_email_solicitud(name, args, kwargs, options, task=None, **kw):
+    """Enviar las difusiones a su cola y el resto de emails de solicitud a la transaccional."""
+    if name != 'app.tasks.email_tasks.enviar_email_solicitud':
+        return None
+
+    tipo = args[1] if args and len(args) > 1 else (kwargs or {}).get('tipo_notificacion')
+    return {'queue': COLA_DIFUSION if tipo in TIPOS_DIFUSION else COLA_NOTIFICACIONES}
+
+
 # Configuración de Celery
 celery_app.conf.update(
     task_serializer='json',
@@ -20,6 +91,124 @@ celery_app.conf.update(
     task_track_started=True,
     task_time_limit=300,  # 5 minutos
     task_soft_time_limit=240,  # 4 minutos
+    # Colas y prioridades
+    task_default_queue=COLA_NOTIFICACIONES,
+    task_routes=(enrutar_email_solicitud, RUTAS_TAREAS),
+    task_default_priority=PRIORIDAD_TAREA_DEFECTO,
+    broker_transport_options={
+        'priority_steps': list(range(10)),
+        'sep': ':',
+        'queue_order_strategy': 'priority',
+    },
+    worker_prefetch_multiplier=1,
+    # Las tareas con acks_late se reencolan si el worker muere a mitad
+    task_reject_on_worker_lost=True,
 )
 
-__all__ = ['celery_app']
+# Tareas periódicas (celery-beat)
+celery_app.conf.beat_schedule = {
+    'archivar-notificaciones': {
+        'task': 'app.tasks.mantenimiento_tasks.archivar_notificaciones_antiguas',
+        'schedule': crontab(hour=3, minute=0),
+        # Acotado para no superar task_time_limit; el resto se procesa al día siguiente
+        'kwargs': {'max_lotes': 200},
+    },
+    'archivar-solicitudes': {
+        'task': 'app.tasks.mantenimiento_tasks.archivar_solicitudes_terminadas',
+        'schedule': crontab(hour=3, minute=30),
+        'kwargs': {'max_lotes': 200},
+    },
+    'crear-particiones-notificaciones': {
+        'task': 'app.tasks.mantenimiento_tasks.crear_particiones_notificaciones',
+        'schedule': crontab(hour=2, minute=30),
+    },
+    'purgar-refresh-tokens': {
+        'task': 'app.tasks.mantenimiento_tasks.purgar_refresh_tokens',
+        'schedule': crontab(minute=15),
+        'kwargs': {'max_lotes': 100},
+    },
+    'reintentar-notificaciones': {
+        'task': 'app.tasks.email_tasks.barrer_notificaciones_fallidas',
+        'schedule': crontab(minute='*/5'),
+        'kwargs': {'max_lotes': 20},
+    },
+    'generar-recordatorios': {
+        'task': 'app.tasks.recordatorio_tasks.generar_recordatorios',
+        'schedule': crontab(minute='*/15'),
+        'kwargs': {'max_lotes': 50},
+    },
+    'purgar-lapidas-solicitudes': {
+        'task': 'app.tasks.mantenimiento_tasks.purgar_lapidas_solicitudes',
+        'schedule': crontab(hour=4, minute=0),
+        'kwargs': {'max_lotes': 100},
+    },
+    'enviar-resumenes-notificaciones': {
+        'task': 'app.tasks.email_tasks.enviar_resumenes_notificaciones',
+        'schedule': crontab(hour=7, minute=0),
+    },
+}
+
+
+
+# Correlación de logs entre la API y los workers
+
+@before_task_publish.connect
+def propagar_request_id(headers=None, **kwargs):
+    """Añadir el ID de correlación de la request actual a los headers de la tarea."""
+    from app.utils.logger import obtener_request_id
+
+    request_id = obtener_request_id()
+    if request_id and headers is not None:
+        headers.setdefault('request_id', request_id)
+
+
+@task_prerun.connect
+def restaurar_request_id(task=None, **kwargs):
+    """Usar el ID de correlación recibido (o el id de la tarea) durante su ejecución."""
+    from app.utils.logger import establecer_request_id
+
+    request_id = getattr(task.request, 'request_id', None) if task else None
+    establecer_request_id(request_id or (task.request.id if task else None))
+
+
+@task_postrun.connect
+def limpiar_request_id(**kwargs):
+    """Limpiar el ID de correlación al terminar la tarea."""
+    from app.utils.logger import establecer_request_id
+
+    establecer_request_id(None)
+
+
+# Métricas de los workers (PROMETHEUS_MULTIPROC_DIR en un volumen que agrega
+# el /metrics de la API, ver app/utils/metricas.py)
+
+@worker_init.connect
+def preparar_metricas_worker(**kwargs):
+    """Vaciar el directorio de métricas del worker antes de arrancar el pool."""
+    directorio = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    if directorio:
+        shutil.rmtree(directorio, ignore_errors=True)
+        os.makedirs(directorio, exist_ok=True)
+
+
+@worker_process_shutdown.connect
+def descartar_metricas_proceso(pid=None, **kwargs):
+    """Descartar los gauges 'live' del proceso del pool que termina."""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(pid or os.getpid())
+
+
+@after_setup_logger.connect
+@after_setup_task_logger.connect
+def configurar_logs_worker(logger=None, **kwargs):
+    """Emitir los logs del worker en el mismo formato y con el ID de correlación."""
+    from app.utils.logger import FiltroContexto, crear_formatter
+
+    formatter = crear_formatter(os.getenv('LOG_FORMATO', 'json'))
+    for handler in logger.handlers:
+        handler.addFilter(FiltroContexto())
+        handler.setFormatter(formatter)
+
+
+__all__ = ['celery_app', 'prioridad_tarea']
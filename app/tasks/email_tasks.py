@@ -1,11 +1,18 @@
 """Tareas de Celery para el envío de emails."""
 import os
+import time
+from celery import chord, group
 from flask import Flask
 from flask_mail import Message
-from app.tasks import celery_app
+from app.tasks import TIPOS_DIFUSION, celery_app, prioridad_tarea
 from config import config_by_name
 
 
+MARCA_RESUMEN = 'resumen:notificaciones'
+# Inicio de la ventana pendiente de un usuario cuyo último resumen falló
+PREFIJO_RESUMEN_PENDIENTE = 'resumen:pendiente:'
+
+
 # Crear una app Flask mínima para el contexto
 def crear_app_contexto():
     """Crear una app Flask para el contexto de Celery."""
@@ -20,106 +27,292 @@ def crear_app_contexto():
     return app
 
 
-def obtener_solicitud_y_contexto(solicitud_id):
+def encolar_email_solicitud(solicitud, tipo_notificacion):
     """
-    Obtener la solicitud y crear el contexto de la app.
+    Encolar el email de una solicitud con la prioridad de la solicitud.
 
     Args:
-        solicitud_id: ID de la solicitud
+        solicitud: Objeto Solicitud
+        tipo_notificacion: Tipo de notificación
 
     Returns:
-        tuple: (app, solicitud)
+        AsyncResult: Tarea encolada
     """
-    app = crear_app_contexto()
+    return enviar_email_solicitud.apply_async(
+        (solicitud.id, tipo_notificacion),
+        priority=prioridad_tarea(solicitud.prioridad)
+    )
 
-    with app.app_context():
-        from app.models.solicitud import Solicitud
-        solicitud = Solicitud.query.get(solicitud_id)
-        return app, solicitud
 
+def _registrar_notificaciones_app(solicitud, tipo_notificacion, usuario_ids):
+    """
+    Registrar como in-app las notificaciones de los usuarios con resumen diario.
+
+    Sustituyen al email inmediato: el usuario las ve en la aplicación y las
+    recibe agrupadas en el resumen (enviar_resumenes_notificaciones).
+
+    Args:
+        solicitud: Objeto Solicitud
+        tipo_notificacion: Tipo de notificación
+        usuario_ids: IDs de los usuarios
+    """
+    from app import db
+    from app.models.notificacion import Notificacion
+
+    if not usuario_ids:
+        return
+
+    notificaciones = []
+    for usuario_id in usuario_ids:
+        notificacion = Notificacion.crear_notificacion_solicitud(solicitud, tipo_notificacion, None)
+        notificacion.usuario_id = usuario_id
+        notificacion.titulo = notificacion.asunto
+        notificaciones.append(notificacion)
+
+    db.session.add_all(notificaciones)
+    db.session.commit()
 
-@celery_app.task(bind=True, max_retries=3, default_retry_delay=60)
-def enviar_email_solicitud(self, solicitud_id, tipo_notificacion):
+
+def _enviar_notificaciones_solicitud(solicitud, tipo_notificacion, destinatarios):
+    """
+    Registrar y enviar las notificaciones de una solicitud con una conexión SMTP.
+
+    Las notificaciones se crean en una sola transacción antes de abrir la
+    conexión para que un fallo de SMTP deje constancia de cada destinatario
+    (enviado=False, intentos incrementado) y el barrido pueda reintentarlas.
+
+    Args:
+        solicitud: Objeto Solicitud
+        tipo_notificacion: Tipo de notificación
+        destinatarios: Usuarios destinatarios
+
+    Returns:
+        dict: Emails enviados y fallidos
+    """
+    from app import mail, db
+    from app.models.notificacion import Notificacion
+
+    notificaciones = [
+        Notificacion.crear_notificacion_solicitud(
+            solicitud,
+            tipo_notificacion,
+            destinatario.email,
+            destinatario.nombre_completo
+        )
+        for destinatario in destinatarios
+    ]
+    db.session.add_all(notificaciones)
+    db.session.commit()
+
+    resumen = {'enviadas': 0, 'fallidas': 0}
+    pendientes = list(zip(destinatarios, notificaciones))
+
+    try:
+        with mail.connect() as conexion:
+            while pendientes:
+                destinatario, notificacion = pendientes[0]
+                try:
+                    conexion.send(Message(
+                        subject=notificacion.asunto,
+                        recipients=[destinatario.email],
+                        body=crear_cuerpo_email(solicitud, tipo_notificacion, destinatario),
+                        html=crear_html_email(solicitud, tipo_notificacion, destinatario)
+                    ))
+                    notificacion.marcar_como_enviado()
+                    resumen['enviadas'] += 1
+                except Exception as e:
+                    # Registrar error (lo reintentará el barrido)
+                    notificacion.registrar_error(str(e))
+                    resumen['fallidas'] += 1
+                    print(f"Error al enviar email a {destinatario.email}: {str(e)}")
+                pendientes.pop(0)
+                db.session.commit()
+    except Exception as e:
+        # Fallo al abrir la conexión: cuenta como intento para las no tratadas
+        db.session.rollback()
+        for destinatario, notificacion in pendientes:
+            notificacion.registrar_error(str(e))
+            resumen['fallidas'] += 1
+        db.session.commit()
+        print(f"Error de conexión SMTP para solicitud {solicitud.id}: {str(e)}")
+
+    return resumen
+
+
+@celery_app.task
+def enviar_email_solicitud(solicitud_id, tipo_notificacion):
     """
     Enviar email de notificación de solicitud.
 
+    Las difusiones a aprobadores (solicitud_creada, recordatorio) van a los
+    que cubren el tipo y el solicitante según reglas_aprobacion, con el
+    respaldo de ENRUTAMIENTO_RESPALDO si ninguna regla coincide. Se reparten
+    en bloques de DIFUSION_TAMANO_BLOQUE destinatarios que procesan en
+    paralelo los workers de la cola de difusión; un último paso agrega las
+    estadísticas de entrega. El resto de tipos se envía aquí al creador.
+
+    Los envíos fallidos quedan registrados en su notificación (enviado=False,
+    intentos incrementado) y los reintenta el barrido de reintentos; reintentar
+    la tarea completa volvería a crear las notificaciones de todos los
+    destinatarios.
+
     Args:
         solicitud_id: ID de la solicitud
         tipo_notificacion: Tipo de notificación (solicitud_creada, solicitud_aprobada, etc.)
     """
-    app, solicitud = obtener_solicitud_y_contexto(solicitud_id)
+    app = crear_app_contexto()
 
-    if not solicitud:
-        print(f"Solicitud {solicitud_id} no encontrada")
-        return
+    with app.app_context():
+        from app import db
+        from app.models.solicitud import Solicitud
+
+        # Cargar la solicitud en la sesión de este contexto para poder
+        # recorrer sus relaciones (usuario, aprobador)
+        solicitud = db.session.get(Solicitud, solicitud_id)
+
+        if not solicitud:
+            print(f"Solicitud {solicitud_id} no encontrada")
+            return
+
+        if tipo_notificacion in TIPOS_DIFUSION:
+            # Enviar a los aprobadores que cubren la solicitud en bloques paralelos
+            from app.services.enrutamiento_service import aprobadores_solicitud
+            from app.services.preferencias_service import entregas
+
+            aprobadores = aprobadores_solicitud(solicitud)
+            por_usuario = entregas(aprobadores, tipo_notificacion)
+            _registrar_notificaciones_app(
+                solicitud, tipo_notificacion, [uid for uid in aprobadores if por_usuario[uid].resumen]
+            )
+            ids = [uid for uid in aprobadores if por_usuario[uid].email]
+
+            if not ids:
+                return
+
+            tamano = app.config['DIFUSION_TAMANO_BLOQUE']
+            prioridad = prioridad_tarea(solicitud.prioridad)
+            bloques = group(
+                enviar_bloque_difusion.s(solicitud_id, tipo_notificacion, ids[i:i + tamano]).set(priority=prioridad)
+                for i in range(0, len(ids), tamano)
+            )
+            chord(bloques)(
+                registrar_difusion.s(solicitud_id, tipo_notificacion, time.time()).set(priority=prioridad)
+            )
+            print(f"Difusión de solicitud {solicitud_id}: {len(ids)} destinatarios "
+                  f"en {len(bloques.tasks)} bloques")
+            return
+
+        # Enviar al creador de la solicitud si no ha desactivado el email
+        from app.services.preferencias_service import TIPOS_CON_NOTIFICACION_APP, entrega
+
+        canales = entrega(solicitud.usuario_id, tipo_notificacion)
+        if not canales.email:
+            if canales.resumen and tipo_notificacion not in TIPOS_CON_NOTIFICACION_APP:
+                _registrar_notificaciones_app(solicitud, tipo_notificacion, [solicitud.usuario_id])
+            return
+
+        resumen = _enviar_notificaciones_solicitud(solicitud, tipo_notificacion, [solicitud.usuario])
+        if resumen['enviadas']:
+            print(f"Email enviado a {solicitud.usuario.email} para solicitud {solicitud_id}")
+
+
+@celery_app.task
+def enviar_bloque_difusion(solicitud_id, tipo_notificacion, usuario_ids):
+    """
+    Enviar un bloque de una difusión con su propia conexión SMTP.
+
+    Args:
+        solicitud_id: ID de la solicitud
+        tipo_notificacion: Tipo de notificación
+        usuario_ids: IDs de los destinatarios del bloque
+
+    Returns:
+        dict: Emails enviados y fallidos del bloque
+    """
+    app = crear_app_contexto()
 
     with app.app_context():
-        from app import mail, db
-        from app.models.notificacion import Notificacion
-        from flask_mail import Message
-
-        # Determinar destinatario según el tipo de notificación
-        if tipo_notificacion == 'solicitud_creada':
-            # Enviar a jefes/administradores
-            from app.models.usuario import Usuario
-            destinatarios = Usuario.query.filter(
-                Usuario.rol.in_(['jefe', 'administrador']),
-                Usuario.activo == True
-            ).all()
-        else:
-            # Enviar al creador de la solicitud
-            destinatarios = [solicitud.usuario]
-
-        # Crear y enviar notificación para cada destinatario
-        for destinatario in destinatarios:
-            try:
-                # Crear registro de notificación
-                notificacion = Notificacion.crear_notificacion_solicitud(
-                    solicitud,
-                    tipo_notificacion,
-                    destinatario.email,
-                    destinatario.nombre_completo
-                )
-                db.session.add(notificacion)
-                db.session.commit()
+        from app import db
+        from app.models.solicitud import Solicitud
+        from app.models.usuario import Usuario
 
-                # Construir mensaje de email
-                asunto = notificacion.asunto
-                cuerpo = crear_cuerpo_email(solicitud, tipo_notificacion, destinatario)
+        solicitud = db.session.get(Solicitud, solicitud_id)
+        if not solicitud:
+            return {'enviadas': 0, 'fallidas': 0}
 
-                # Enviar email
-                msg = Message(
-                    subject=asunto,
-                    recipients=[destinatario.email],
-                    body=cuerpo,
-                    html=crear_html_email(solicitud, tipo_notificacion, destinatario)
-                )
+        destinatarios = Usuario.query.filter(
+            Usuario.id.in_(usuario_ids),
+            Usuario.activo == True
+        ).order_by(Usuario.id).all()
 
-                mail.send(msg)
+        return _enviar_notificaciones_solicitud(solicitud, tipo_notificacion, destinatarios)
 
-                # Marcar como enviado
-                notificacion.marcar_como_enviado()
-                db.session.commit()
 
-                print(f"Email enviado a {destinatario.email} para solicitud {solicitud_id}")
+@celery_app.task
+def registrar_difusion(resultados, solicitud_id, tipo_notificacion, inicio):
+    """
+    Agregar las estadísticas de entrega de todos los bloques de una difusión.
 
-            except Exception as e:
-                # Registrar error
-                if 'notificacion' in locals():
-                    notificacion.registrar_error(str(e))
-                    db.session.commit()
+    Se ejecuta en un worker de Celery: las métricas se escriben en su
+    directorio multiproceso y las expone el /metrics de la API.
 
-                print(f"Error al enviar email a {destinatario.email}: {str(e)}")
+    Args:
+        resultados: Resúmenes devueltos por cada bloque
+        solicitud_id: ID de la solicitud
+        tipo_notificacion: Tipo de notificación
+        inicio: Marca de tiempo (epoch) en la que se repartió la difusión
 
-                # Reintentar la tarea
-                try:
-                    raise self.retry(exc=e)
-                except Exception as retry_exc:
-                    print(f"No se pudo reintentar: {retry_exc}")
+    Returns:
+        dict: Totales de la difusión
+    """
+    from app.utils.metricas import EMAIL_DIFUSION, EMAIL_DIFUSION_DURACION
+
+    resumen = {
+        'solicitud_id': solicitud_id,
+        'bloques': len(resultados),
+        'enviadas': sum(r['enviadas'] for r in resultados),
+        'fallidas': sum(r['fallidas'] for r in resultados),
+        'segundos': round(time.time() - inicio, 3)
+    }
+
+    EMAIL_DIFUSION.labels(tipo=tipo_notificacion, resultado='enviada').inc(resumen['enviadas'])
+    EMAIL_DIFUSION.labels(tipo=tipo_notificacion, resultado='fallida').inc(resumen['fallidas'])
+    EMAIL_DIFUSION_DURACION.labels(tipo=tipo_notificacion).observe(resumen['segundos'])
+
+    print(f"Difusión de solicitud {solicitud_id} completada: {resumen['enviadas']} enviadas, "
+          f"{resumen['fallidas']} fallidas en {resumen['bloques']} bloques ({resumen['segundos']} s)")
+    return resumen
 
 
-@celery_app.task(bind=True, max_retries=3, default_retry_delay=60)
-def reenviar_notificacion(self, notificacion_id):
+def crear_mensaje_notificacion(notificacion):
+    """
+    Construir el email de una notificación ya registrada.
+
+    Args:
+        notificacion: Objeto Notificacion con destinatario_email
+
+    Returns:
+        Message: Mensaje listo para enviar
+    """
+    html = None
+    if notificacion.solicitud:
+        html = crear_html_email(
+            notificacion.solicitud,
+            notificacion.tipo,
+            None,
+            notificacion.destinatario_nombre
+        )
+
+    return Message(
+        subject=notificacion.asunto,
+        recipients=[notificacion.destinatario_email],
+        body=notificacion.mensaje,
+        html=html
+    )
+
+
+@celery_app.task(acks_late=True)
+def reenviar_notificacion(notificacion_id):
     """
     Reenviar una notificación existente.
 
@@ -131,48 +324,221 @@ def reenviar_notificacion(self, notificacion_id):
     with app.app_context():
         from app import mail, db
         from app.models.notificacion import Notificacion
-        from flask_mail import Message
 
-        notificacion = Notificacion.query.get(notificacion_id)
+        notificacion = db.session.get(Notificacion, notificacion_id)
 
         if not notificacion:
             print(f"Notificación {notificacion_id} no encontrada")
             return
 
         try:
-            # Construir mensaje de email
-            msg = Message(
-                subject=notificacion.asunto,
-                recipients=[notificacion.destinatario_email],
-                body=notificacion.mensaje,
-                html=crear_html_email(
-                    notificacion.solicitud,
-                    notificacion.tipo,
-                    None,
-                    notificacion.destinatario_nombre
-                )
-            )
-
-            mail.send(msg)
+            mail.send(crear_mensaje_notificacion(notificacion))
 
             # Marcar como enviado
             notificacion.marcar_como_enviado()
+            notificacion.descartada = False
             db.session.commit()
 
             print(f"Notificación {notificacion_id} reenviada exitosamente")
 
         except Exception as e:
-            # Registrar error
+            # Registrar error (lo reintentará el barrido)
             notificacion.registrar_error(str(e))
             db.session.commit()
 
             print(f"Error al reenviar notificación {notificacion_id}: {str(e)}")
 
-            # Reintentar la tarea
-            try:
-                raise self.retry(exc=e)
-            except Exception as retry_exc:
-                print(f"No se pudo reintentar: {retry_exc}")
+
+@celery_app.task(acks_late=True)
+def reenviar_notificaciones_lote(notificacion_ids):
+    """
+    Reenviar un lote de notificaciones reutilizando una conexión SMTP.
+
+    Las que vuelven a fallar registran el error; al agotar
+    NOTIFICACIONES_MAX_INTENTOS pasan a descartadas.
+
+    Args:
+        notificacion_ids: IDs de las notificaciones
+
+    Returns:
+        dict: Enviadas, fallidas y descartadas
+    """
+    app = crear_app_contexto()
+
+    with app.app_context():
+        from app import mail, db
+        from app.models.notificacion import Notificacion
+        from app.utils.metricas import EMAIL_REINTENTOS
+
+        max_intentos = app.config['NOTIFICACIONES_MAX_INTENTOS']
+        notificaciones = Notificacion.query.filter(
+            Notificacion.id.in_(notificacion_ids),
+            Notificacion.enviado == False
+        ).order_by(Notificacion.id).all()
+
+        resumen = {'enviadas': 0, 'fallidas': 0, 'descartadas': 0}
+        tratadas = set()
+
+        def _fallo(notificacion, error):
+            notificacion.registrar_error(str(error))
+            if notificacion.intentos >= max_intentos:
+                notificacion.descartar()
+                resumen['descartadas'] += 1
+            resumen['fallidas'] += 1
+
+        try:
+            with mail.connect() as conexion:
+                for notificacion in notificaciones:
+                    tratadas.add(notificacion.id)
+                    try:
+                        conexion.send(crear_mensaje_notificacion(notificacion))
+                        notificacion.marcar_como_enviado()
+                        resumen['enviadas'] += 1
+                    except Exception as e:
+                        _fallo(notificacion, e)
+                    # Confirmar cada envío para no repetirlo si el worker cae a mitad de lote
+                    db.session.commit()
+        except Exception as e:
+            # Fallo al abrir la conexión: cuenta como intento para las no tratadas
+            db.session.rollback()
+            for notificacion in notificaciones:
+                if notificacion.id not in tratadas:
+                    _fallo(notificacion, e)
+            db.session.commit()
+
+        EMAIL_REINTENTOS.labels(resultado='enviada').inc(resumen['enviadas'])
+        EMAIL_REINTENTOS.labels(resultado='fallida').inc(resumen['fallidas'])
+        print(f"Reintento de notificaciones: {resumen['enviadas']} enviadas, "
+              f"{resumen['fallidas']} fallidas, {resumen['descartadas']} descartadas")
+        return resumen
+
+
+@celery_app.task(acks_late=True)
+def barrer_notificaciones_fallidas(max_lotes=None):
+    """
+    Reencolar en lotes las notificaciones fallidas cuya espera ha vencido.
+
+    Args:
+        max_lotes: Máximo de páginas por ejecución (None = sin límite)
+
+    Returns:
+        dict: Resumen de la ejecución
+    """
+    app = crear_app_contexto()
+
+    with app.app_context():
+        from app.services.reintento_service import barrer_notificaciones_fallidas as barrer
+
+        resumen = barrer(max_lotes=max_lotes)
+        if resumen['despachadas'] or resumen['descartadas']:
+            print(f"Barrido de notificaciones: {resumen['despachadas']} reencoladas, "
+                  f"{resumen['descartadas']} descartadas")
+        return resumen
+
+
+@celery_app.task(acks_late=True)
+def enviar_resumenes_notificaciones(ahora=None):
+    """
+    Enviar el resumen diario a los usuarios que lo tienen activado.
+
+    Cada usuario recibe un único email con sus notificaciones in-app no
+    leídas de los tipos en resumen creadas desde el último resumen. Si la
+    conexión SMTP falla no se avanza la marca de agua. Si falla el envío a
+    un usuario concreto se guarda el inicio de su ventana en una marca
+    propia (resumen:pendiente:<id>) y el siguiente resumen le vuelve a
+    incluir esas notificaciones; la marca se borra al enviarlo.
+
+    Args:
+        ahora: Fin de la ventana en ISO 8601 (por defecto ahora, UTC)
+
+    Returns:
+        dict: Resúmenes enviados y fallidos
+    """
+    from datetime import datetime, timedelta
+
+    app = crear_app_contexto()
+
+    with app.app_context():
+        from app import mail, db
+        from app.models.marca_agua import MarcaAgua
+        from app.models.usuario import Usuario
+        from app.services.preferencias_service import notificaciones_para_resumen
+
+        hasta = datetime.fromisoformat(ahora) if ahora else datetime.utcnow()
+        valor = MarcaAgua.obtener(MARCA_RESUMEN)
+        desde = datetime.fromisoformat(valor) if valor else hasta - timedelta(days=1)
+
+        pendientes = {
+            int(nombre[len(PREFIJO_RESUMEN_PENDIENTE):]): datetime.fromisoformat(valor)
+            for nombre, valor in MarcaAgua.listar(PREFIJO_RESUMEN_PENDIENTE).items()
+        }
+
+        por_usuario = notificaciones_para_resumen(desde, hasta)
+        if pendientes:
+            # Notificaciones anteriores a la ventana de los resúmenes fallidos
+            atrasadas = notificaciones_para_resumen(min(pendientes.values()), desde, usuarios=list(pendientes))
+            for usuario_id, notificaciones in atrasadas.items():
+                notificaciones = [n for n in notificaciones if n.created_at > pendientes[usuario_id]]
+                if notificaciones:
+                    por_usuario[usuario_id] = notificaciones + por_usuario.get(usuario_id, [])
+
+        usuarios = {
+            u.id: u for u in Usuario.query.filter(
+                Usuario.id.in_(list(por_usuario)), Usuario.activo == True
+            )
+        } if por_usuario else {}
+
+        resumen = {'enviados': 0, 'fallidos': 0}
+        fallidos = set()
+        if usuarios:
+            with mail.connect() as conexion:
+                for usuario_id, notificaciones in por_usuario.items():
+                    usuario = usuarios.get(usuario_id)
+                    if not usuario:
+                        continue
+                    try:
+                        conexion.send(crear_mensaje_resumen(usuario, notificaciones))
+                        resumen['enviados'] += 1
+                    except Exception as e:
+                        resumen['fallidos'] += 1
+                        fallidos.add(usuario_id)
+                        print(f"Error al enviar resumen a {usuario.email}: {str(e)}")
+
+        for usuario_id in fallidos - set(pendientes):
+            MarcaAgua.guardar(f'{PREFIJO_RESUMEN_PENDIENTE}{usuario_id}', desde.isoformat())
+        for usuario_id in set(pendientes) - fallidos:
+            MarcaAgua.borrar(f'{PREFIJO_RESUMEN_PENDIENTE}{usuario_id}')
+        MarcaAgua.guardar(MARCA_RESUMEN, hasta.isoformat())
+        db.session.commit()
+
+        print(f"Resumen diario: {resumen['enviados']} enviados, {resumen['fallidos']} fallidos")
+        return resumen
+
+
+def crear_mensaje_resumen(usuario, notificaciones):
+    """
+    Construir el email de resumen diario de un usuario.
+
+    Args:
+        usuario: Usuario destinatario
+        notificaciones: Notificaciones in-app del resumen
+
+    Returns:
+        Message: Mensaje listo para enviar
+    """
+    cuerpo = f"Hola {usuario.nombre},\n\n"
+    cuerpo += f"Tienes {len(notificaciones)} notificaciones sin leer:\n\n"
+    for notificacion in notificaciones:
+        cuerpo += f"- {notificacion.created_at.strftime('%d/%m/%Y %H:%M')} {notificacion.titulo}\n"
+        if notificacion.mensaje:
+            cuerpo += f"  {notificacion.mensaje}\n"
+    cuerpo += "\nPuedes cambiar tus preferencias de notificación en tu perfil.\n"
+
+    return Message(
+        subject=f'Resumen de notificaciones ({len(notificaciones)})',
+        recipients=[usuario.email],
+        body=cuerpo
+    )
 
 
 def crear_cuerpo_email(solicitud, tipo_notificacion, destinatario):
@@ -195,6 +561,8 @@ def crear_cuerpo_email(solicitud, tipo_notificacion, destinatario):
         cuerpo += f"Tu solicitud ha sido aprobada:\n\n"
     elif tipo_notificacion == 'solicitud_rechazada':
         cuerpo += f"Tu solicitud ha sido rechazada:\n\n"
+    elif tipo_notificacion == 'recordatorio':
+        cuerpo += f"Esta solicitud sigue pendiente de revisión:\n\n"
 
     cuerpo += f"Tipo: {solicitud.tipo.replace('_', ' ').title()}\n"
     cuerpo += f"Título: {solicitud.titulo}\n"
@@ -202,6 +570,9 @@ def crear_cuerpo_email(solicitud, tipo_notificacion, destinatario):
     cuerpo += f"Estado: {solicitud.estado.replace('_', ' ').title()}\n"
     cuerpo += f"Prioridad: {solicitud.prioridad.title()}\n"
 
+    if solicitud.fecha_requerida:
+        cuerpo += f"Fecha requerida: {solicitud.fecha_requerida.strftime('%d/%m/%Y')}\n"
+
     if solicitud.aprobador:
         cuerpo += f"Procesado por: {solicitud.aprobador.nombre_completo}\n"
 
@@ -271,6 +642,8 @@ def crear_html_email(solicitud, tipo_notificacion, destinatario, destinatario_no
         html += "<p>Tu solicitud ha sido <strong>aprobada</strong>:</p>"
     elif tipo_notificacion == 'solicitud_rechazada':
         html += "<p>Tu solicitud ha sido <strong>rechazada</strong>:</p>"
+    elif tipo_notificacion == 'recordatorio':
+        html += "<p>Esta solicitud sigue <strong>pendiente de revisión</strong>:</p>"
 
     html += f"""
                 <div class="info-row"><span class="label">ID:</span> #{solicitud.id}</div>
@@ -0,0 +1,146 @@
+"""Tareas de Celery de mantenimiento de la base de datos."""
+from app.tasks import celery_app
+from app.tasks.email_tasks import crear_app_contexto
+
+
+@celery_app.task(acks_late=True)
+def archivar_notificaciones_antiguas(dias=None, max_lotes=None):
+    """
+    Archivar notificaciones antiguas enviadas/leídas en lotes acotados.
+
+    Args:
+        dias: Antigüedad mínima en días (por defecto la configurada)
+        max_lotes: Máximo de lotes por ejecución (None = sin límite)
+
+    Returns:
+        dict: Resumen de la ejecución
+    """
+    app = crear_app_contexto()
+
+    with app.app_context():
+        from app.services.retencion_service import archivar_notificaciones
+
+        resumen = archivar_notificaciones(dias=dias, max_lotes=max_lotes)
+        print(f"Notificaciones archivadas: {resumen['archivadas']} en {resumen['lotes']} lotes")
+        return resumen
+
+
+@celery_app.task(acks_late=True)
+def archivar_solicitudes_terminadas(dias=None, max_lotes=None):
+    """
+    Archivar solicitudes completadas/rechazadas antiguas junto con sus notificaciones.
+
+    Args:
+        dias: Días desde la última actualización (por defecto los configurados)
+        max_lotes: Máximo de lotes por ejecución (None = sin límite)
+
+    Returns:
+        dict: Resumen de la ejecución
+    """
+    app = crear_app_contexto()
+
+    with app.app_context():
+        from app.services.retencion_service import archivar_solicitudes
+
+        resumen = archivar_solicitudes(dias=dias, max_lotes=max_lotes)
+        print(f"Solicitudes archivadas: {resumen['archivadas']} "
+              f"({resumen['notificaciones']} notificaciones) en {resumen['lotes']} lotes")
+        return resumen
+
+
+@celery_app.task(acks_late=True)
+def crear_particiones_notificaciones():
+    """
+    Crear por adelantado las particiones mensuales de notificaciones.
+
+    Returns:
+        list: Particiones verificadas/creadas
+    """
+    app = crear_app_contexto()
+
+    with app.app_context():
+        from app.services.retencion_service import crear_particiones_notificaciones as crear
+
+        particiones = crear()
+        if particiones:
+            print(f"Particiones de notificaciones verificadas: {', '.join(particiones)}")
+        return particiones
+
+
+@celery_app.task(acks_late=True)
+def purgar_refresh_tokens(max_lotes=None):
+    """
+    Eliminar del almacén los refresh tokens caducados.
+
+    Args:
+        max_lotes: Máximo de lotes por ejecución (None = sin límite)
+
+    Returns:
+        dict: Resumen de la ejecución
+    """
+    app = crear_app_contexto()
+
+    with app.app_context():
+        from app.services.refresh_token_service import purgar_refresh_tokens as purgar
+
+        resumen = purgar(max_lotes=max_lotes)
+        if resumen['eliminados']:
+            print(f"Refresh tokens caducados eliminados: {resumen['eliminados']}")
+        return resumen
+
+
+@celery_app.task(acks_late=True)
+def purgar_lapidas_solicitudes(max_lotes=None):
+    """
+    Eliminar las lápidas del feed de cambios más antiguas que CAMBIOS_LAPIDAS_DIAS.
+
+    Args:
+        max_lotes: Máximo de lotes por ejecución (None = sin límite)
+
+    Returns:
+        dict: Resumen de la ejecución
+    """
+    app = crear_app_contexto()
+
+    with app.app_context():
+        from app.services.cambios_service import purgar_lapidas
+
+        resumen = purgar_lapidas(max_lotes=max_lotes)
+        if resumen['eliminadas']:
+            print(f"Lápidas de solicitudes eliminadas: {resumen['eliminadas']}")
+        return resumen
+
+
+@celery_app.task(bind=True, max_retries=None, acks_late=True)
+def eliminar_usuario(self, usuario_id, max_lotes=200, resumen=None):
+    """
+    Eliminar un usuario y sus solicitudes y notificaciones en lotes.
+
+    El progreso se publica como estado PROGRESS en el backend de resultados.
+    Si la eliminación no termina en max_lotes la tarea se reencola a sí misma
+    para no superar task_time_limit, con el resumen acumulado hasta entonces.
+
+    Args:
+        usuario_id: ID del usuario
+        max_lotes: Máximo de lotes por ejecución
+        resumen: Resumen de las ejecuciones anteriores (lo pasa el reintento)
+
+    Returns:
+        dict: Resumen de la eliminación
+    """
+    app = crear_app_contexto()
+
+    with app.app_context():
+        from app.services.eliminacion_service import eliminar_usuario_por_lotes
+
+        def publicar(resumen):
+            self.update_state(state='PROGRESS', meta=resumen)
+
+        resumen = eliminar_usuario_por_lotes(usuario_id, max_lotes=max_lotes, progreso=publicar, previo=resumen)
+
+        if not resumen['completada']:
+            raise self.retry(kwargs={'max_lotes': max_lotes, 'resumen': resumen}, countdown=0)
+
+        print(f"Usuario {usuario_id} eliminado: {resumen['solicitudes']} solicitudes, "
+              f"{resumen['notificaciones']} notificaciones en {resumen['lotes']} lotes")
+        return resumen
@@ -0,0 +1,26 @@
+"""Tareas de Celery de recordatorios de solicitudes pendientes."""
+from app.tasks import celery_app
+from app.tasks.email_tasks import crear_app_contexto
+
+
+@celery_app.task(acks_late=True)
+def generar_recordatorios(max_lotes=None):
+    """
+    Encolar recordatorios de SLA para las solicitudes pendientes.
+
+    Args:
+        max_lotes: Máximo de lotes por ejecución (None = sin límite)
+
+    Returns:
+        dict: Resumen de la ejecución
+    """
+    app = crear_app_contexto()
+
+    with app.app_context():
+        from app.services.recordatorio_service import generar_recordatorios as generar
+
+        resumen = generar(max_lotes=max_lotes)
+        total = sum(resumen['encolados'].values())
+        if total:
+            print(f"Recordatorios encolados: {total} {resumen['encolados']} en {resumen['lotes']} lotes")
+        return resumen
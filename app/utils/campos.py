@@ -0,0 +1,121 @@
+"""
+Selección de campos (?fields=) y relaciones (?expand=) en las respuestas.
+
+Sin parámetros los endpoints devuelven la fila completa y sus relaciones
+habituales. Con ?fields=id,titulo,estado solo se seleccionan esas columnas
+(load_only) y con ?expand=usuario solo se carga esa relación (joinedload);
+las columnas y relaciones no pedidas no se consultan.
+"""
+from collections import namedtuple
+from datetime import date
+from flask import request
+from sqlalchemy.orm import joinedload, load_only, noload
+from app.exceptions import BadRequestError
+
+
+Proyeccion = namedtuple('Proyeccion', ['campos', 'expand'])
+
+
+def _lista_parametro(nombre):
+    """Valores separados por comas de un parámetro (None si no se envió)."""
+    valor = request.args.get(nombre)
+    if valor is None:
+        return None
+    return [parte.strip() for parte in valor.split(',') if parte.strip()]
+
+
+def leer_proyeccion(campos_permitidos, relaciones_permitidas=(), expand_defecto=()):
+    """
+    Leer los parámetros fields y expand de la request.
+
+    El id se incluye siempre. Un expand vacío (?expand=) no carga ninguna
+    relación.
+
+    Args:
+        campos_permitidos: Columnas serializables, en el orden de la respuesta
+        relaciones_permitidas: Relaciones que se pueden expandir
+        expand_defecto: Relaciones incluidas cuando no se envía expand
+
+    Returns:
+        Proyeccion: Campos y relaciones a devolver
+
+    Raises:
+        BadRequestError: Si se pide un campo o una relación desconocidos
+    """
+    pedidos = _lista_parametro('fields')
+    if pedidos:
+        desconocidos = [campo for campo in pedidos if campo not in campos_permitidos]
+        if desconocidos:
+            raise BadRequestError(
+                message=f"Campos no válidos: {', '.join(desconocidos)}",
+                error_code='INVALID_FIELDS',
+                details={'permitidos': list(campos_permitidos)}
+            )
+        campos = tuple(c for c in campos_permitidos if c in pedidos or c == 'id')
+    else:
+        campos = tuple(campos_permitidos)
+
+    expand = _lista_parametro('expand')
+    if expand is None:
+        expand = tuple(expand_defecto)
+    else:
+        desconocidas = [rel for rel in expand if rel not in relaciones_permitidas]
+        if desconocidas:
+            raise BadRequestError(
+                message=f"Relaciones no válidas: {', '.join(desconocidas)}",
+                error_code='INVALID_EXPAND',
+                details={'permitidas': list(relaciones_permitidas)}
+            )
+        expand = tuple(r for r in relaciones_permitidas if r in expand)
+
+    return Proyeccion(campos, expand)
+
+
+def opciones_carga(modelo, proyeccion, relaciones=None, necesarias=()):
+    """
+    Opciones de carga de SQLAlchemy para una proyección.
+
+    Args:
+        modelo: Clase del modelo consultado
+        proyeccion: Proyeccion devuelta por leer_proyeccion
+        relaciones: Dict relación -> columnas del modelo relacionado que se
+            serializan al expandirla (None = todas)
+        necesarias: Columnas que el endpoint usa aunque no se devuelvan
+            (p. ej. las del cursor o las de la comprobación de permisos)
+
+    Returns:
+        list: Opciones para query.options()
+    """
+    columnas = dict.fromkeys(proyeccion.campos + tuple(necesarias))
+    opciones = [load_only(*[getattr(modelo, columna) for columna in columnas])]
+
+    for relacion, columnas_relacion in (relaciones or {}).items():
+        atributo = getattr(modelo, relacion)
+        if relacion not in proyeccion.expand:
+            opciones.append(noload(atributo))
+            continue
+        carga = joinedload(atributo)
+        if columnas_relacion:
+            destino = atributo.property.mapper.class_
+            carga = carga.load_only(*[getattr(destino, columna) for columna in columnas_relacion])
+        opciones.append(carga)
+
+    return opciones
+
+
+def serializar_campos(objeto, campos):
+    """
+    Serializar columnas de un objeto con el formato de los to_dict.
+
+    Args:
+        objeto: Instancia del modelo
+        campos: Columnas a incluir
+
+    Returns:
+        dict: Valores (fechas en ISO 8601)
+    """
+    data = {}
+    for campo in campos:
+        valor = getattr(objeto, campo)
+        data[campo] = valor.isoformat() if isinstance(valor, date) else valor
+    return data
@@ -0,0 +1,58 @@
+"""
+Cursores opacos para paginación keyset.
+
+Un cursor codifica los valores de la clave de ordenación de la última fila
+devuelta; la página siguiente empieza justo después de ella, de modo que el
+coste no depende de la profundidad (a diferencia de OFFSET).
+"""
+
+import base64
+import json
+from datetime import datetime
+
+
+def codificar_cursor(*valores):
+    """
+    Codificar los valores de la clave de ordenación en un cursor opaco.
+
+    Args:
+        valores: Valores de la última fila (datetimes se serializan en ISO)
+
+    Returns:
+        str: Cursor en base64 URL-safe
+    """
+    serializados = [v.isoformat() if isinstance(v, datetime) else v for v in valores]
+    datos = json.dumps(serializados, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(datos).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor, tipos):
+    """
+    Decodificar un cursor y convertir sus valores a los tipos esperados.
+
+    Args:
+        cursor: Cursor recibido del cliente
+        tipos: Tipos de cada valor (int, str o datetime)
+
+    Returns:
+        tuple: Valores de la clave de ordenación
+
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+    except (ValueError, TypeError) as e:
+        raise ValueError('Cursor inválido') from e
+
+    if not isinstance(valores, list) or len(valores) != len(tipos):
+        raise ValueError('Cursor inválido')
+
+    try:
+        return tuple(
+            datetime.fromisoformat(valor) if tipo is datetime else tipo(valor)
+            for tipo, valor in zip(tipos, valores)
+        )
+    except (ValueError, TypeError) as e:
+        raise ValueError('Cursor inválido') from e
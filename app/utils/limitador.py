@@ -0,0 +1,326 @@
+"""
+Limitación de frecuencia.
+
+Dos algoritmos sobre el mismo almacén:
+    - Cubeta de tokens (`consumir`): cada clave tiene `capacidad` tokens que
+      se recargan de forma continua en `periodo` segundos. Adecuado para
+      ráfagas cortas (p. ej. intentos de login).
+    - Ventana deslizante (`ventana`): aproxima el número de peticiones en los
+      últimos `periodo` segundos ponderando el contador de la ventana fija
+      anterior por la fracción que aún se solapa con la ventana deslizante.
+      Solo necesita dos contadores por clave.
+
+Backends:
+    - memoria: por proceso (con varios workers el límite efectivo se
+      multiplica por el número de workers).
+    - redis: compartido entre workers y réplicas; cada operación es un único
+      script Lua atómico (un round-trip). Si Redis falla se usa el almacén en
+      memoria durante unos segundos antes de volver a intentarlo.
+"""
+
+import math
+import threading
+import time
+from collections import namedtuple
+
+
+# Máximo de claves en memoria antes de purgar las que ya no limitan
+MAX_CLAVES_MEMORIA = 100000
+
+# Segundos sin intentar Redis tras un fallo
+ESPERA_TRAS_FALLO = 5.0
+
+# Resultado de una comprobación de ventana deslizante
+Resultado = namedtuple('Resultado', 'permitido limite restante reinicio')
+
+_SCRIPT_CUBETA = """
+local capacidad = tonumber(ARGV[1])
+local tasa = tonumber(ARGV[2])
+local ahora = tonumber(ARGV[3])
+local coste = tonumber(ARGV[4])
+
+local datos = redis.call('HMGET', KEYS[1], 't', 'ts')
+local tokens = tonumber(datos[1]) or capacidad
+local ts = tonumber(datos[2]) or ahora
+tokens = math.min(capacidad, tokens + math.max(0, ahora - ts) * tasa)
+
+local espera = 0
+if tokens >= coste then
+    tokens = tokens - coste
+else
+    espera = (coste - tokens) / tasa
+end
+
+redis.call('HSET', KEYS[1], 't', tostring(tokens), 'ts', tostring(ahora))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacidad / tasa * 1000))
+return tostring(espera)
+"""
+
+# KEYS: contador de la ventana actual, contador de la anterior
+# ARGV: límite, periodo (s), segundos transcurridos de la ventana actual, coste
+_SCRIPT_VENTANA = """
+local limite = tonumber(ARGV[1])
+local periodo = tonumber(ARGV[2])
+local transcurrido = tonumber(ARGV[3])
+local coste = tonumber(ARGV[4])
+
+local actual = tonumber(redis.call('GET', KEYS[1]) or '0')
+local anterior = tonumber(redis.call('GET', KEYS[2]) or '0')
+local estimado = anterior * (1 - transcurrido / periodo) + actual
+
+if estimado + coste > limite then
+    return {0, actual, anterior}
+end
+
+actual = redis.call('INCRBY', KEYS[1], coste)
+if actual == coste then
+    redis.call('PEXPIRE', KEYS[1], math.ceil(periodo * 2000))
+end
+return {1, actual, anterior}
+"""
+
+
+def _evaluar_ventana(permitido, actual, anterior, limite, periodo, transcurrido, coste):
+    """
+    Calcular las peticiones restantes y los segundos hasta poder reintentar.
+
+    Args:
+        permitido: Si la petición se aceptó
+        actual: Contador de la ventana actual (incluida la petición si se aceptó)
+        anterior: Contador de la ventana anterior
+        limite: Peticiones permitidas por periodo
+        periodo: Duración de la ventana en segundos
+        transcurrido: Segundos transcurridos de la ventana actual
+        coste: Peso de la petición
+
+    Returns:
+        Resultado
+    """
+    estimado = anterior * (1 - transcurrido / periodo) + actual
+    restante = max(0, int(limite - estimado))
+
+    if permitido or actual + coste > limite:
+        # Fin de la ventana actual
+        reinicio = periodo - transcurrido
+    else:
+        # Momento en que el peso de la ventana anterior deja hueco suficiente
+        peso = (limite - actual - coste) / anterior
+        reinicio = (1 - peso) * periodo - transcurrido
+
+    return Resultado(permitido, limite, restante, max(1, math.ceil(reinicio)))
+
+
+class AlmacenMemoria:
+    """Cubetas y ventanas en memoria del proceso."""
+
+    def __init__(self):
+        self._cubetas = {}
+        self._ventanas = {}
+        self._lock = threading.Lock()
+
+    def consumir(self, clave, capacidad, tasa, coste=1):
+        ahora = time.monotonic()
+
+        with self._lock:
+            tokens, ts = self._cubetas.get(clave, (capacidad, ahora))
+            tokens = min(capacidad, tokens + (ahora - ts) * tasa)
+
+            if tokens >= coste:
+                self._cubetas[clave] = (tokens - coste, ahora)
+                espera = 0.0
+            else:
+                self._cubetas[clave] = (tokens, ahora)
+                espera = (coste - tokens) / tasa
+
+            if len(self._cubetas) > MAX_CLAVES_MEMORIA:
+                self._purgar_cubetas(ahora, capacidad, tasa)
+
+        return espera
+
+    def ventana(self, clave, limite, periodo, coste=1):
+        ahora = time.time()
+        numero = int(ahora // periodo)
+        transcurrido = ahora - numero * periodo
+
+        with self._lock:
+            estado = self._ventanas.get(clave)
+            if estado is None or estado[0] < numero - 1:
+                actual, anterior = 0, 0
+            elif estado[0] == numero - 1:
+                actual, anterior = 0, estado[1]
+            else:
+                actual, anterior = estado[1], estado[2]
+
+            permitido = anterior * (1 - transcurrido / periodo) + actual + coste <= limite
+            if permitido:
+                actual += coste
+            self._ventanas[clave] = (numero, actual, anterior)
+
+            if len(self._ventanas) > MAX_CLAVES_MEMORIA:
+                self._purgar_ventanas(numero)
+
+        return permitido, actual, anterior, transcurrido
+
+    def reiniciar(self, clave):
+        with self._lock:
+            self._cubetas.pop(clave, None)
+            self._ventanas.pop(clave, None)
+
+    def _purgar_cubetas(self, ahora, capacidad, tasa):
+        """Eliminar las cubetas que ya se habrían recargado por completo."""
+        llenas = [
+            clave for clave, (tokens, ts) in self._cubetas.items()
+            if tokens + (ahora - ts) * tasa >= capacidad
+        ]
+        for clave in llenas:
+            del self._cubetas[clave]
+
+    def _purgar_ventanas(self, numero):
+        """Eliminar las ventanas que ya no pesan en la ventana actual."""
+        viejas = [clave for clave, estado in self._ventanas.items() if estado[0] < numero - 1]
+        for clave in viejas:
+            del self._ventanas[clave]
+
+
+class AlmacenRedis:
+    """Cubetas y ventanas en Redis (compartidas entre procesos)."""
+
+    def __init__(self, url, prefijo='limitador:'):
+        import redis
+        self.cliente = redis.Redis.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2)
+        self.prefijo = prefijo
+        self._script_cubeta = self.cliente.register_script(_SCRIPT_CUBETA)
+        self._script_ventana = self.cliente.register_script(_SCRIPT_VENTANA)
+
+    def consumir(self, clave, capacidad, tasa, coste=1):
+        espera = self._script_cubeta(keys=[self.prefijo + clave], args=[capacidad, tasa, time.time(), coste])
+        return float(espera)
+
+    def ventana(self, clave, limite, periodo, coste=1):
+        ahora = time.time()
+        numero = int(ahora // periodo)
+        transcurrido = ahora - numero * periodo
+
+        base = f'{self.prefijo}{clave}:'
+        permitido, actual, anterior = self._script_ventana(
+            keys=[base + str(numero), base + str(numero - 1)],
+            args=[limite, periodo, transcurrido, coste]
+        )
+        return bool(permitido), int(actual), int(anterior), transcurrido
+
+    def reiniciar(self, clave):
+        self.cliente.delete(self.prefijo + clave)
+
+
+class Limitador:
+    """Limitador de frecuencia sobre un almacén, con respaldo en memoria."""
+
+    def __init__(self, almacen, respaldo=None):
+        self.almacen = almacen
+        self.respaldo = respaldo
+        self._fallo_hasta = 0.0
+
+    def _ejecutar(self, operacion, *args):
+        """
+        Ejecutar una operación en el almacén principal o en el de respaldo.
+
+        Tras un fallo del almacén principal se usa el respaldo durante
+        ESPERA_TRAS_FALLO segundos para no pagar el timeout en cada request.
+        Sin respaldo se devuelve None (el llamador permite la petición): el
+        limitador protege la capacidad, no debe tumbar el servicio.
+        """
+        if self._fallo_hasta and time.monotonic() < self._fallo_hasta:
+            almacen = self.respaldo
+        else:
+            almacen = self.almacen
+
+        if almacen is None:
+            return None
+
+        try:
+            return getattr(almacen, operacion)(*args)
+        except Exception as e:
+            if almacen is self.respaldo:
+                return None
+
+            from app.utils.logger import log_warning
+            log_warning(
+                'Limitador no disponible, se usa el respaldo en memoria' if self.respaldo
+                else 'Limitador no disponible, se permite el intento',
+                error=str(e)
+            )
+            self._fallo_hasta = time.monotonic() + ESPERA_TRAS_FALLO
+            return self._ejecutar(operacion, *args) if self.respaldo else None
+
+    def consumir(self, clave, capacidad, periodo, coste=1):
+        """
+        Consumir tokens de la cubeta de una clave.
+
+        Args:
+            clave: Identificador de la cubeta
+            capacidad: Tokens máximos (ráfaga permitida)
+            periodo: Segundos para recargar la cubeta completa
+            coste: Tokens que consume el intento
+
+        Returns:
+            int: 0 si se permite, o segundos de espera (Retry-After)
+        """
+        espera = self._ejecutar('consumir', clave, capacidad, capacidad / periodo, coste)
+        return math.ceil(espera) if espera else 0
+
+    def ventana(self, clave, limite, periodo, coste=1):
+        """
+        Registrar una petición en la ventana deslizante de una clave.
+
+        Args:
+            clave: Identificador del contador
+            limite: Peticiones permitidas por periodo
+            periodo: Duración de la ventana en segundos
+            coste: Peso de la petición
+
+        Returns:
+            Resultado: permitido, límite, peticiones restantes y segundos
+            hasta el reinicio (o hasta poder reintentar si se rechazó)
+        """
+        estado = self._ejecutar('ventana', clave, limite, periodo, coste)
+        if estado is None:
+            return Resultado(True, limite, limite, 0)
+
+        permitido, actual, anterior, transcurrido = estado
+        return _evaluar_ventana(permitido, actual, anterior, limite, periodo, transcurrido, coste)
+
+    def reiniciar(self, clave):
+        """Vaciar el historial de una clave (p. ej. tras un login correcto)."""
+        self._ejecutar('reiniciar', clave)
+
+
+_limitadores = {}
+_lock = threading.Lock()
+
+
+def obtener_limitador(app):
+    """
+    Obtener el limitador configurado para la app (uno por proceso y backend).
+
+    Args:
+        app: Instancia de Flask
+
+    Returns:
+        Limitador
+    """
+    backend = app.config.get('LIMITADOR_BACKEND', 'memoria')
+    url = app.config.get('LIMITADOR_REDIS_URL')
+    clave = (backend, url)
+
+    limitador = _limitadores.get(clave)
+    if limitador is None:
+        with _lock:
+            limitador = _limitadores.get(clave)
+            if limitador is None:
+                if backend == 'redis':
+                    limitador = Limitador(AlmacenRedis(url), respaldo=AlmacenMemoria())
+                else:
+                    limitador = Limitador(AlmacenMemoria())
+                _limitadores[clave] = limitador
+
+    return limitador
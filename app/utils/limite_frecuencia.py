@@ -0,0 +1,129 @@
+"""
+Límite de frecuencia de la API por usuario, rol y endpoint.
+
+Cada request bajo LIMITE_FRECUENCIA_PREFIJO se cuenta en una ventana
+deslizante de LIMITE_FRECUENCIA_PERIODO segundos. La regla aplicable es la
+más específica de LIMITE_FRECUENCIA_REGLAS: endpoint ('solicitudes.listar_solicitudes'),
+blueprint ('solicitudes') o '*'. Cada regla fija el límite por rol
+(empleado, jefe, administrador) y para peticiones sin token (anonimo); un rol
+ausente en la regla no tiene límite. Solo se cuenta la regla más específica,
+de modo que cada request cuesta una única operación en el almacén.
+
+Las respuestas incluyen las cabeceras RateLimit-Limit, RateLimit-Remaining,
+RateLimit-Reset y RateLimit-Policy; al superar el límite se responde 429 con
+Retry-After.
+"""
+
+import time
+from flask import current_app, g, request
+from flask_jwt_extended import decode_token
+from app.exceptions import TooManyRequestsError
+from app.utils.limitador import obtener_limitador
+from app.utils.metricas import RATE_LIMITED
+
+
+# Tokens ya verificados en este proceso: token -> (rol, sujeto, expiración)
+MAX_TOKENS_VERIFICADOS = 10000
+_tokens_verificados = {}
+
+
+def _identificar():
+    """
+    Determinar el rol y el sujeto (usuario o IP) de la request.
+
+    El rol viaja como claim en el access token para no consultar la base de
+    datos en cada request; tokens emitidos sin él cuentan como empleado.
+    Verificar la firma de un JWT cuesta más que todo el resto del límite, así
+    que cada token se verifica una vez por proceso y se reutiliza hasta su
+    expiración.
+
+    Returns:
+        tuple: (rol, sujeto)
+    """
+    cabecera = request.headers.get('Authorization', '')
+
+    if cabecera.startswith('Bearer '):
+        token = cabecera[7:]
+        entrada = _tokens_verificados.get(token)
+
+        if entrada is None or entrada[2] <= time.time():
+            try:
+                datos = decode_token(token)
+            except Exception:
+                # Token inválido o caducado: la ruta responderá 401
+                return 'anonimo', f'ip:{request.remote_addr}'
+
+            entrada = (datos.get('rol', 'empleado'), f"u:{datos['sub']}", datos.get('exp', float('inf')))
+            if len(_tokens_verificados) >= MAX_TOKENS_VERIFICADOS:
+                _tokens_verificados.clear()
+            _tokens_verificados[token] = entrada
+
+        return entrada[0], entrada[1]
+
+    return 'anonimo', f'ip:{request.remote_addr}'
+
+
+def registrar_limite_frecuencia(app):
+    """
+    Registrar el límite de frecuencia de la API.
+
+    Debe registrarse después de las métricas para que las respuestas 429
+    también se contabilicen.
+
+    Args:
+        app: Instancia de Flask
+    """
+    if not app.config.get('LIMITE_FRECUENCIA_HABILITADO', True):
+        return
+
+    reglas = app.config.get('LIMITE_FRECUENCIA_REGLAS') or {}
+    periodo = app.config.get('LIMITE_FRECUENCIA_PERIODO', 60)
+    prefijo = app.config.get('LIMITE_FRECUENCIA_PREFIJO', '/api/')
+
+    # Regla resuelta por endpoint: (ámbito, límites por rol)
+    resueltas = {}
+
+    def _regla(endpoint):
+        regla = resueltas.get(endpoint)
+        if regla is None:
+            blueprint = endpoint.rpartition('.')[0]
+            ambito = next((a for a in (endpoint, blueprint, '*') if a in reglas), None)
+            regla = resueltas[endpoint] = (ambito, reglas.get(ambito) or {})
+        return regla
+
+    @app.before_request
+    def _limitar_frecuencia():
+        g.limite_frecuencia = None
+        if request.endpoint is None or not request.path.startswith(prefijo):
+            return
+
+        ambito, limites = _regla(request.endpoint)
+        if not limites:
+            return
+
+        rol, sujeto = _identificar()
+        limite = limites.get(rol)
+        if limite is None:
+            return
+
+        resultado = obtener_limitador(current_app).ventana(f'api:{ambito}:{sujeto}', limite, periodo)
+        g.limite_frecuencia = resultado
+
+        if not resultado.permitido:
+            RATE_LIMITED.labels(ambito=ambito, rol=rol).inc()
+            error = TooManyRequestsError(
+                message='Has excedido el límite de solicitudes permitidas, inténtalo más tarde',
+                details={'limite': limite, 'periodo_segundos': periodo}
+            )
+            error.retry_after = resultado.reinicio
+            raise error
+
+    @app.after_request
+    def _cabeceras_limite_frecuencia(response):
+        resultado = g.get('limite_frecuencia')
+        if resultado is not None:
+            response.headers['RateLimit-Limit'] = str(resultado.limite)
+            response.headers['RateLimit-Remaining'] = str(resultado.restante)
+            response.headers['RateLimit-Reset'] = str(resultado.reinicio)
+            response.headers['RateLimit-Policy'] = f'{resultado.limite};w={periodo}'
+        return response
@@ -2,9 +2,18 @@
 Configuración y utilidades de logging.
 """
 
+import atexit
+import json
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from datetime import datetime
 
 
@@ -12,17 +21,207 @@ from datetime import datetime
 LOGS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'logs')
 os.makedirs(LOGS_DIR, exist_ok=True)
 
+# Tamaño por defecto de la cola de logs
+LOG_QUEUE_SIZE = 10000
+
+# Listener activo (uno por proceso)
+_listener = None
+
+# Contexto de correlación: una request HTTP o una tarea de Celery
+_request_id = ContextVar('request_id', default=None)
+_muestreado = ContextVar('log_muestreado', default=True)
+
+# IDs de correlación aceptados desde el header X-Request-ID
+_REQUEST_ID_VALIDO = re.compile(r'^[A-Za-z0-9._-]{1,128}$')
+
+FORMATO_TEXTO = '[%(asctime)s] %(levelname)s [%(request_id)s] in %(module)s: %(message)s'
+
+
+def obtener_request_id():
+    """Obtener el ID de correlación del contexto actual (o None)."""
+    return _request_id.get()
+
+
+def establecer_request_id(request_id):
+    """
+    Establecer el ID de correlación del contexto actual.
+
+    Args:
+        request_id: ID de correlación (None para limpiar)
+    """
+    _request_id.set(request_id)
+    _muestreado.set(True)
+
+
+class FiltroContexto(logging.Filter):
+    """
+    Añade el request_id al registro y aplica el muestreo de logs INFO.
+
+    Se ejecuta en el hilo que emite el log (antes de encolar), de modo que
+    los registros descartados por muestreo no cuestan nada más.
+    """
+
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        if record.levelno <= logging.INFO and not _muestreado.get():
+            return False
+        return True
+
+
+class FormatterJSON(logging.Formatter):
+    """Formatea cada registro como una línea JSON."""
+
+    def format(self, record):
+        datos = {
+            'timestamp': datetime.utcfromtimestamp(record.created).isoformat() + 'Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'module': record.module,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+        }
+
+        contexto = getattr(record, 'contexto', None)
+        if contexto:
+            datos['context'] = contexto
+
+        if record.exc_info:
+            datos['exception'] = self.formatException(record.exc_info)
+
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+
+class FormatterTexto(logging.Formatter):
+    """Formato de texto legible que añade el contexto al final del mensaje."""
+
+    def __init__(self):
+        super().__init__(FORMATO_TEXTO, defaults={'request_id': '-'})
+
+    def format(self, record):
+        linea = super().format(record)
+        contexto = getattr(record, 'contexto', None)
+        if contexto:
+            primera, separador, resto = linea.partition('\n')
+            linea = f"{primera} | Context: {contexto}{separador}{resto}"
+        return linea
+
+
+def crear_formatter(formato):
+    """
+    Crear el formatter según la configuración.
+
+    Args:
+        formato: 'json' o 'texto'
+
+    Returns:
+        logging.Formatter
+    """
+    if formato == 'json':
+        return FormatterJSON()
+    return FormatterTexto()
+
+
+class QueueHandlerNoBloqueante(QueueHandler):
+    """
+    QueueHandler con cola acotada y política de descarte.
+
+    Cuando la cola está llena los registros por debajo de ERROR se descartan
+    sin bloquear. Los errores esperan un tiempo acotado (backpressure) antes
+    de descartarse. El número de descartes se informa en el siguiente
+    registro que entra en la cola.
+    """
+
+    def __init__(self, cola, timeout_errores=0.5):
+        super().__init__(cola)
+        self.timeout_errores = timeout_errores
+        self.descartados = 0
+
+    def prepare(self, record):
+        """
+        No formatear en el hilo de la request.
+
+        La cola es en memoria dentro del mismo proceso, así que el formateo
+        se delega a los handlers del listener.
+        """
+        return record
+
+    def enqueue(self, record):
+        """Encolar el registro aplicando la política de descarte."""
+        try:
+            if record.levelno >= logging.ERROR:
+                self.queue.put(record, timeout=self.timeout_errores)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartados += 1
+            return
+
+        if self.descartados:
+            descartados, self.descartados = self.descartados, 0
+            aviso = logging.LogRecord(
+                record.name, logging.WARNING, __file__, 0,
+                'Cola de logs llena: %d registros descartados', (descartados,), None
+            )
+            try:
+                self.queue.put_nowait(aviso)
+            except queue.Full:
+                self.descartados += descartados
+
+
+def _crear_handler_archivo(nombre):
+    """Crear el handler de archivo con rotación (10 ficheros de 10MB)."""
+    return RotatingFileHandler(
+        os.path.join(LOGS_DIR, nombre),
+        maxBytes=10485760,  # 10MB
+        backupCount=10
+    )
+
+
+def _crear_handlers(formatter, multiproceso):
+    """
+    Crear los handlers de salida.
+
+    Con varios procesos (workers de gunicorn) la rotación dentro de cada
+    proceso se solapa entre workers, así que se escribe en stdout y la
+    retención queda en manos del runtime de contenedores (driver json-file
+    con max-size en docker-compose.yml). Con un solo proceso se usan
+    solicitudes_api.log y errors.log con rotación.
+    """
+    if multiproceso:
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setLevel(logging.INFO)
+        stream_handler.setFormatter(formatter)
+        return [stream_handler]
+
+    # Handler para archivo
+    file_handler = _crear_handler_archivo('solicitudes_api.log')
+    file_handler.setLevel(logging.INFO)
+    file_handler.setFormatter(formatter)
+
+    # Handler para errores (archivo separado)
+    error_handler = _crear_handler_archivo('errors.log')
+    error_handler.setLevel(logging.ERROR)
+    error_handler.setFormatter(formatter)
+
+    return [file_handler, error_handler]
+
 
 def setup_logger(app=None):
     """
     Configura el logger de la aplicación.
 
+    Los handlers de archivo y consola se ejecutan en un QueueListener en
+    segundo plano; el logger solo encola registros en una cola acotada.
+    Si se recibe la app, registra además el contexto de correlación por request.
+
     Args:
         app: Instancia de Flask (opcional)
 
     Returns:
         Logger configurado
     """
+    global _listener
+
     logger = logging.getLogger('solicitudes_api')
     logger.setLevel(logging.INFO)
 
@@ -30,41 +229,102 @@ def setup_logger(app=None):
     if logger.handlers:
         return logger
 
-    # Formato de log
-    formatter = logging.Formatter(
-        '[%(asctime)s] %(levelname)s in %(module)s: %(message)s'
-    )
+    config = app.config if app else {}
+    multiproceso = config.get('LOG_MULTIPROCESO', False)
+    tamano_cola = config.get('LOG_QUEUE_SIZE', LOG_QUEUE_SIZE)
 
-    # Handler para archivo (con rotación)
-    file_handler = RotatingFileHandler(
-        os.path.join(LOGS_DIR, 'solicitudes_api.log'),
-        maxBytes=10485760,  # 10MB
-        backupCount=10
-    )
-    file_handler.setLevel(logging.INFO)
-    file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
+    # Formato de log (JSON por línea o texto)
+    formatter = crear_formatter(config.get('LOG_FORMATO', 'json'))
 
-    # Handler para errores (archivo separado)
-    error_handler = RotatingFileHandler(
-        os.path.join(LOGS_DIR, 'errors.log'),
-        maxBytes=10485760,  # 10MB
-        backupCount=10
-    )
-    error_handler.setLevel(logging.ERROR)
-    error_handler.setFormatter(formatter)
-    logger.addHandler(error_handler)
+    handlers = _crear_handlers(formatter, multiproceso)
 
-    # Handler para consola (solo en desarrollo)
-    if app and app.config.get('DEBUG'):
+    # Handler para consola (solo en desarrollo; en multiproceso ya se escribe en stdout)
+    if app and app.config.get('DEBUG') and not multiproceso:
         console_handler = logging.StreamHandler()
         console_handler.setLevel(logging.DEBUG)
-        console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
+        console_handler.setFormatter(FormatterTexto())
+        handlers.append(console_handler)
+
+    cola = queue.Queue(maxsize=tamano_cola)
+    queue_handler = QueueHandlerNoBloqueante(cola)
+    queue_handler.addFilter(FiltroContexto())
+    logger.addHandler(queue_handler)
+
+    _listener = QueueListener(cola, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(detener_logging)
+
+    if app:
+        registrar_contexto_request(app)
 
     return logger
 
 
+def registrar_contexto_request(app):
+    """
+    Registrar los hooks que asignan un ID de correlación a cada request.
+
+    El ID se toma del header X-Request-ID si es válido o se genera uno nuevo,
+    se devuelve en la respuesta y se usa en logs, respuestas de error y tareas
+    de Celery encoladas durante la request. También decide una única vez por
+    request si sus logs INFO se registran (LOG_MUESTREO por endpoint).
+
+    Args:
+        app: Instancia de Flask
+    """
+    from flask import g, request
+
+    tasas = app.config.get('LOG_MUESTREO', {})
+
+    @app.before_request
+    def _iniciar_contexto_log():
+        entrante = request.headers.get('X-Request-ID', '')
+        g.request_id = entrante if _REQUEST_ID_VALIDO.match(entrante) else uuid.uuid4().hex
+        g.inicio_request = time.perf_counter()
+
+        _request_id.set(g.request_id)
+        tasa = tasas.get(request.endpoint, 1.0)
+        _muestreado.set(tasa >= 1.0 or random.random() < tasa)
+
+    @app.after_request
+    def _cerrar_contexto_log(response):
+        request_id = g.get('request_id')
+        if request_id:
+            response.headers['X-Request-ID'] = request_id
+
+        if app.config.get('LOG_ACCESO') and g.get('inicio_request') is not None:
+            duracion_ms = (time.perf_counter() - g.inicio_request) * 1000
+            log_response(request, response.status_code, duracion_ms=round(duracion_ms, 2))
+
+        return response
+
+    @app.teardown_request
+    def _limpiar_contexto_log(exc=None):
+        establecer_request_id(None)
+
+
+def detener_logging():
+    """
+    Detener el listener vaciando la cola pendiente.
+
+    Se llama al salir del proceso y desde el hook worker_exit de gunicorn.
+    """
+    global _listener
+
+    if _listener is None:
+        return
+
+    listener, _listener = _listener, None
+    listener.stop()
+
+    for handler in listener.handlers:
+        try:
+            handler.flush()
+            handler.close()
+        except Exception:
+            pass
+
+
 def get_logger():
     """
     Obtiene el logger de la aplicación.
@@ -85,9 +345,9 @@ def log_info(message, **kwargs):
     """
     logger = get_logger()
     if kwargs:
-        logger.info(f"{message} | Context: {kwargs}")
+        logger.info(message, extra={'contexto': kwargs}, stacklevel=2)
     else:
-        logger.info(message)
+        logger.info(message, stacklevel=2)
 
 
 def log_error(message, exception=None, **kwargs):
@@ -107,9 +367,9 @@ def log_error(message, exception=None, **kwargs):
         context['exception_message'] = str(exception)
 
     if context:
-        logger.error(f"{message} | Context: {context}", exc_info=exception)
+        logger.error(message, exc_info=exception, extra={'contexto': context}, stacklevel=2)
     else:
-        logger.error(message, exc_info=exception)
+        logger.error(message, exc_info=exception, stacklevel=2)
 
 
 def log_warning(message, **kwargs):
@@ -122,9 +382,9 @@ def log_warning(message, **kwargs):
     """
     logger = get_logger()
     if kwargs:
-        logger.warning(f"{message} | Context: {kwargs}")
+        logger.warning(message, extra={'contexto': kwargs}, stacklevel=2)
     else:
-        logger.warning(message)
+        logger.warning(message, stacklevel=2)
 
 
 def log_debug(message, **kwargs):
@@ -137,9 +397,9 @@ def log_debug(message, **kwargs):
     """
     logger = get_logger()
     if kwargs:
-        logger.debug(f"{message} | Context: {kwargs}")
+        logger.debug(message, extra={'contexto': kwargs}, stacklevel=2)
     else:
-        logger.debug(message)
+        logger.debug(message, stacklevel=2)
 
 
 def log_request(request, user_id=None):
@@ -152,18 +412,18 @@ def log_request(request, user_id=None):
     """
     logger = get_logger()
     logger.info(
-        f"Request: {request.method} {request.path}",
-        extra={
+        "Request: %s %s", request.method, request.path,
+        extra={'contexto': {
             'method': request.method,
             'path': request.path,
             'user_id': user_id,
             'remote_addr': request.remote_addr,
             'user_agent': str(request.user_agent)
-        }
+        }}
     )
 
 
-def log_response(request, status_code, user_id=None):
+def log_response(request, status_code, user_id=None, duracion_ms=None):
     """
     Registra detalles de una response HTTP.
 
@@ -171,17 +431,23 @@ def log_response(request, status_code, user_id=None):
         request: Objeto request de Flask
         status_code: Código de estado HTTP
         user_id: ID del usuario (opcional)
+        duracion_ms: Duración de la request en milisegundos (opcional)
     """
     logger = get_logger()
     level = logging.ERROR if status_code >= 500 else logging.INFO
 
+    if not logger.isEnabledFor(level):
+        return
+
     logger.log(
         level,
-        f"Response: {request.method} {request.path} - {status_code}",
-        extra={
+        "Response: %s %s - %s", request.method, request.path, status_code,
+        extra={'contexto': {
             'method': request.method,
             'path': request.path,
+            'endpoint': request.endpoint,
             'status_code': status_code,
             'user_id': user_id,
-        }
+            'duracion_ms': duracion_ms,
+        }}
     )
@@ -0,0 +1,236 @@
+"""
+Métricas estilo Prometheus para la API.
+
+Con varios workers de gunicorn cada proceso escribe sus métricas en
+PROMETHEUS_MULTIPROC_DIR y el endpoint /metrics agrega todos los procesos.
+Los workers de Celery no exponen /metrics: escriben en su propio
+subdirectorio de PROMETHEUS_MULTIPROC_RAIZ (un volumen compartido con la API)
+y el endpoint agrega todos los subdirectorios.
+"""
+
+import glob
+import os
+import time
+from flask import Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    multiprocess
+)
+from app.utils.perfil_sql import perfil_request
+
+
+# Buckets de latencia en segundos (de 5 ms a 10 s)
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HTTP_REQUESTS = Counter(
+    'http_requests_total',
+    'Requests HTTP procesadas',
+    ['blueprint', 'endpoint', 'method', 'status']
+)
+HTTP_LATENCIA = Histogram(
+    'http_request_duration_seconds',
+    'Latencia de las requests HTTP',
+    ['blueprint', 'endpoint', 'method', 'status'],
+    buckets=BUCKETS_LATENCIA
+)
+DB_CONSULTAS = Histogram(
+    'db_queries_per_request',
+    'Consultas SQL ejecutadas por request',
+    ['endpoint'],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100)
+)
+DB_TIEMPO = Histogram(
+    'db_time_per_request_seconds',
+    'Tiempo total en base de datos por request',
+    ['endpoint'],
+    buckets=BUCKETS_LATENCIA
+)
+CELERY_ENCOLADO = Histogram(
+    'celery_enqueue_duration_seconds',
+    'Tiempo de publicación de tareas en el broker',
+    ['task'],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+LOGIN_THROTTLED = Counter(
+    'login_throttled_total',
+    'Intentos de login rechazados por el limitador antes de verificar la contraseña',
+    ['motivo', 'origen']
+)
+RATE_LIMITED = Counter(
+    'rate_limited_total',
+    'Requests rechazadas por el límite de frecuencia',
+    ['ambito', 'rol']
+)
+EMAIL_DIFUSION = Counter(
+    'email_broadcast_total',
+    'Emails de difusiones a aprobadores por resultado',
+    ['tipo', 'resultado']
+)
+EMAIL_DIFUSION_DURACION = Histogram(
+    'email_broadcast_duration_seconds',
+    'Tiempo desde el reparto de una difusión hasta que terminan todos sus bloques',
+    ['tipo'],
+    buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+)
+EMAIL_REINTENTOS = Counter(
+    'email_retries_total',
+    'Notificaciones tratadas por el barrido de reintentos de email',
+    ['resultado']
+)
+DB_POOL_TAMANO = Gauge('db_pool_size', 'Tamaño del pool de conexiones', multiprocess_mode='livesum')
+DB_POOL_EN_USO = Gauge('db_pool_checked_out', 'Conexiones del pool en uso', multiprocess_mode='livesum')
+DB_POOL_OVERFLOW = Gauge('db_pool_overflow', 'Conexiones por encima del tamaño del pool', multiprocess_mode='livesum')
+
+# Publicaciones de tareas en curso: id de tarea -> instante de inicio. Una
+# publicación fallida (broker caído) no dispara after_task_publish, así que
+# las entradas con más de MAX_ESPERA_PUBLICACION segundos se descartan y el
+# diccionario nunca supera MAX_PUBLICACIONES entradas.
+_publicaciones = {}
+MAX_PUBLICACIONES = 1000
+MAX_ESPERA_PUBLICACION = 30.0
+_celery_registrado = False
+
+
+def _etiquetas_endpoint():
+    """Obtener blueprint y endpoint de la request actual (cardinalidad acotada)."""
+    endpoint = request.endpoint or 'desconocido'
+    blueprint = request.blueprint or 'app'
+    return blueprint, endpoint
+
+
+def _actualizar_pool(engine):
+    """Actualizar los gauges del pool de conexiones (solo QueuePool los expone)."""
+    pool = engine.pool
+    if hasattr(pool, 'checkedout'):
+        DB_POOL_TAMANO.set(pool.size())
+        DB_POOL_EN_USO.set(pool.checkedout())
+        DB_POOL_OVERFLOW.set(max(pool.overflow(), 0))
+
+
+def _purgar_publicaciones(ahora):
+    """Descartar publicaciones que nunca terminaron (y las más antiguas si siguen sobrando)."""
+    limite = ahora - MAX_ESPERA_PUBLICACION
+    for tarea_id, inicio in list(_publicaciones.items()):
+        if inicio < limite:
+            _publicaciones.pop(tarea_id, None)
+
+    # Ráfaga de publicaciones fallidas recientes: conservar la mitad más nueva
+    while len(_publicaciones) > MAX_PUBLICACIONES // 2:
+        try:
+            _publicaciones.pop(next(iter(_publicaciones)), None)
+        except (StopIteration, RuntimeError):
+            break
+
+
+def _registrar_eventos_celery():
+    """Medir la latencia de publicación de tareas de Celery (una vez por proceso)."""
+    global _celery_registrado
+    if _celery_registrado:
+        return
+    _celery_registrado = True
+
+    from celery.signals import after_task_publish, before_task_publish
+
+    @before_task_publish.connect(weak=False)
+    def _antes_publicar(headers=None, **kwargs):
+        if headers and headers.get('id'):
+            ahora = time.perf_counter()
+            if len(_publicaciones) >= MAX_PUBLICACIONES:
+                _purgar_publicaciones(ahora)
+            _publicaciones[headers['id']] = ahora
+
+    @after_task_publish.connect(weak=False)
+    def _despues_publicar(headers=None, **kwargs):
+        if not headers:
+            return
+        inicio = _publicaciones.pop(headers.get('id'), None)
+        if inicio is not None:
+            CELERY_ENCOLADO.labels(task=headers.get('task', 'desconocida')).observe(time.perf_counter() - inicio)
+
+
+class ColectorServicios:
+    """Agregar las métricas multiproceso de todos los servicios (API y workers)."""
+
+    def __init__(self, raiz):
+        self.raiz = raiz
+
+    def collect(self):
+        archivos = glob.glob(os.path.join(self.raiz, '*', '*.db'))
+        return multiprocess.MultiProcessCollector.merge(archivos, accumulate=True)
+
+
+def generar_metricas():
+    """
+    Generar la exposición de métricas en formato texto de Prometheus.
+
+    Returns:
+        bytes: Métricas de todos los servicios (PROMETHEUS_MULTIPROC_RAIZ), de
+            todos los procesos (modo multiproceso) o del actual
+    """
+    raiz = os.getenv('PROMETHEUS_MULTIPROC_RAIZ')
+    if raiz:
+        registro = CollectorRegistry()
+        registro.register(ColectorServicios(raiz))
+        return generate_latest(registro)
+
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+        return generate_latest(registro)
+
+    return generate_latest(REGISTRY)
+
+
+def registrar_metricas(app):
+    """
+    Registrar la instrumentación de métricas y el endpoint /metrics.
+
+    Args:
+        app: Instancia de Flask
+    """
+    if not app.config.get('METRICAS_HABILITADAS', True):
+        return
+
+    from app import db
+
+    with app.app_context():
+        engine = db.engine
+    _registrar_eventos_celery()
+
+    @app.before_request
+    def _iniciar_metricas():
+        g.metricas_inicio = time.perf_counter()
+
+    @app.after_request
+    def _registrar_metricas_request(response):
+        inicio = g.get('metricas_inicio')
+        if inicio is None or request.endpoint == 'metricas':
+            return response
+
+        duracion = time.perf_counter() - inicio
+        blueprint, endpoint = _etiquetas_endpoint()
+        status = str(response.status_code)
+
+        HTTP_REQUESTS.labels(blueprint, endpoint, request.method, status).inc()
+        HTTP_LATENCIA.labels(blueprint, endpoint, request.method, status).observe(duracion)
+
+        # Consultas y tiempo de base de datos del perfilado SQL de la request
+        perfil = perfil_request()
+        if perfil is not None:
+            DB_CONSULTAS.labels(endpoint).observe(perfil.consultas)
+            DB_TIEMPO.labels(endpoint).observe(perfil.tiempo)
+
+        _actualizar_pool(engine)
+
+        return response
+
+    @app.route('/metrics', endpoint='metricas')
+    def metricas():
+        """Métricas en formato Prometheus."""
+        return Response(generar_metricas(), mimetype=CONTENT_TYPE_LATEST)
@@ -0,0 +1,257 @@
+"""
+Perfilado de SQL por request.
+
+Un único par de listeners before/after_cursor_execute por engine acumula el
+número de consultas, el tiempo total en base de datos y las N sentencias más
+lentas de cada request. Las sentencias por encima de SQL_UMBRAL_LENTA_MS se
+registran en el log junto con el endpoint que las ejecutó.
+"""
+
+import heapq
+import time
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+
+# Perfiles activos en el contexto actual (request y/o presupuestos anidados)
+_perfiles_activos = ContextVar('perfiles_sql', default=())
+
+# Engines con los listeners ya registrados
+_engines_registrados = weakref.WeakSet()
+
+# Longitud máxima de una sentencia en logs y cabeceras
+MAX_LONGITUD_SENTENCIA = 500
+
+
+class PresupuestoConsultasExcedido(AssertionError):
+    """Se ejecutaron más consultas SQL de las permitidas."""
+
+
+class PerfilSQL:
+    """Acumulador de consultas SQL de una request o de un bloque de código."""
+
+    __slots__ = ('consultas', 'tiempo', 'max_lentas', '_lentas')
+
+    def __init__(self, max_lentas=5):
+        self.consultas = 0
+        self.tiempo = 0.0
+        self.max_lentas = max_lentas
+        self._lentas = []
+
+    def registrar(self, sentencia, duracion):
+        """
+        Registrar una sentencia ejecutada.
+
+        Args:
+            sentencia: SQL ejecutado
+            duracion: Duración en segundos
+        """
+        self.consultas += 1
+        self.tiempo += duracion
+
+        if self.max_lentas <= 0:
+            return
+
+        entrada = (duracion, self.consultas, sentencia)
+        if len(self._lentas) < self.max_lentas:
+            heapq.heappush(self._lentas, entrada)
+        elif duracion > self._lentas[0][0]:
+            heapq.heapreplace(self._lentas, entrada)
+
+    @property
+    def lentas(self):
+        """Sentencias más lentas, de mayor a menor duración."""
+        return [
+            {
+                'sql': _recortar(sentencia),
+                'duracion_ms': round(duracion * 1000, 2),
+                'orden': orden
+            }
+            for duracion, orden, sentencia in sorted(self._lentas, reverse=True)
+        ]
+
+    def resumen(self):
+        """
+        Obtener el resumen del perfil.
+
+        Returns:
+            dict: Consultas, tiempo total en ms y sentencias más lentas
+        """
+        return {
+            'consultas': self.consultas,
+            'tiempo_ms': round(self.tiempo * 1000, 2),
+            'lentas': self.lentas
+        }
+
+
+def _recortar(sentencia):
+    """Normalizar espacios y recortar una sentencia SQL."""
+    sentencia = ' '.join(sentencia.split())
+    if len(sentencia) > MAX_LONGITUD_SENTENCIA:
+        return sentencia[:MAX_LONGITUD_SENTENCIA] + '...'
+    return sentencia
+
+
+def _valor_cabecera(texto):
+    """Texto apto para una cabecera HTTP (latin-1, sin saltos de línea)."""
+    return texto.encode('latin-1', 'replace').decode('latin-1')
+
+
+@contextmanager
+def _activar(perfil):
+    """Añadir un perfil a los activos durante el bloque."""
+    token = _perfiles_activos.set(_perfiles_activos.get() + (perfil,))
+    try:
+        yield perfil
+    finally:
+        _perfiles_activos.reset(token)
+
+
+def perfil_request():
+    """
+    Obtener el perfil SQL de la request actual.
+
+    Returns:
+        PerfilSQL o None si no hay request o el perfilado no está registrado
+    """
+    if not has_request_context():
+        return None
+    return g.get('perfil_sql')
+
+
+def registrar_eventos_sql(engine, umbral_lenta_ms=None):
+    """
+    Registrar los listeners de cursor en el engine (una vez por engine).
+
+    Args:
+        engine: Engine de SQLAlchemy
+        umbral_lenta_ms: Umbral para registrar sentencias lentas (None desactiva)
+    """
+    if engine in _engines_registrados:
+        return
+    _engines_registrados.add(engine)
+
+    umbral = umbral_lenta_ms / 1000 if umbral_lenta_ms else None
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _antes_consulta(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('perfil_inicio', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _despues_consulta(conn, cursor, statement, parameters, context, executemany):
+        inicios = conn.info.get('perfil_inicio')
+        if not inicios:
+            return
+        duracion = time.perf_counter() - inicios.pop()
+
+        for perfil in _perfiles_activos.get():
+            perfil.registrar(statement, duracion)
+
+        if umbral is not None and duracion >= umbral:
+            from app.utils.logger import log_warning
+            log_warning(
+                'Consulta SQL lenta',
+                duracion_ms=round(duracion * 1000, 2),
+                endpoint=request.endpoint if has_request_context() else None,
+                sql=_recortar(statement)
+            )
+
+
+@contextmanager
+def presupuesto_consultas(maximo, descripcion=None):
+    """
+    Verificar que un bloque no ejecuta más de `maximo` consultas SQL.
+
+    Pensado para scripts de prueba: envuelve una llamada al cliente de test
+    (o cualquier código) y lanza PresupuestoConsultasExcedido si se supera el
+    presupuesto. Requiere que el perfilado esté registrado en el engine.
+
+    Ejemplo:
+        with presupuesto_consultas(4, 'GET /api/solicitudes'):
+            client.get('/api/solicitudes', headers=headers)
+
+    Args:
+        maximo: Número máximo de consultas permitidas
+        descripcion: Texto para el mensaje de error
+
+    Yields:
+        PerfilSQL: Perfil con las consultas del bloque
+    """
+    with _activar(PerfilSQL(max_lentas=maximo + 1)) as perfil:
+        yield perfil
+
+    if perfil.consultas > maximo:
+        detalle = '\n'.join(f"  - {s['duracion_ms']} ms: {s['sql']}" for s in perfil.lentas)
+        raise PresupuestoConsultasExcedido(
+            f"{descripcion or 'Bloque'}: {perfil.consultas} consultas SQL "
+            f"(presupuesto {maximo})\n{detalle}"
+        )
+
+
+def registrar_perfil_sql(app):
+    """
+    Registrar el perfilado SQL por request.
+
+    Con SQL_PERFIL_CABECERAS la respuesta incluye X-SQL-Consultas,
+    X-SQL-Tiempo-Ms, Server-Timing (visible en las devtools del navegador) y
+    una cabecera X-SQL-Lentas por cada sentencia más lenta ("<ms>; <sql>").
+    Las requests que superan SQL_AVISO_CONSULTAS consultas se registran con
+    sus sentencias más lentas para detectar patrones N+1.
+
+    Args:
+        app: Instancia de Flask
+    """
+    if not app.config.get('SQL_PERFIL_HABILITADO', True):
+        return
+
+    from app import db
+
+    with app.app_context():
+        registrar_eventos_sql(db.engine, app.config.get('SQL_UMBRAL_LENTA_MS'))
+
+    max_lentas = app.config.get('SQL_PERFIL_MAX_LENTAS', 5)
+    aviso_consultas = app.config.get('SQL_AVISO_CONSULTAS')
+    cabeceras = app.config.get('SQL_PERFIL_CABECERAS', False)
+
+    @app.before_request
+    def _iniciar_perfil_sql():
+        g.perfil_sql = PerfilSQL(max_lentas=max_lentas)
+        g.perfil_sql_token = _perfiles_activos.set(_perfiles_activos.get() + (g.perfil_sql,))
+
+    @app.after_request
+    def _cerrar_perfil_sql(response):
+        perfil = g.get('perfil_sql')
+        if perfil is None:
+            return response
+
+        if aviso_consultas and perfil.consultas > aviso_consultas:
+            from app.utils.logger import log_warning
+            log_warning(
+                'Request con demasiadas consultas SQL',
+                endpoint=request.endpoint,
+                **perfil.resumen()
+            )
+
+        if cabeceras:
+            tiempo_ms = round(perfil.tiempo * 1000, 2)
+            response.headers['X-SQL-Consultas'] = str(perfil.consultas)
+            response.headers['X-SQL-Tiempo-Ms'] = str(tiempo_ms)
+            response.headers.add('Server-Timing', f'db;dur={tiempo_ms};desc="{perfil.consultas} consultas"')
+            for lenta in perfil.lentas:
+                response.headers.add('X-SQL-Lentas', _valor_cabecera(f"{lenta['duracion_ms']} ms; {lenta['sql']}"))
+
+        return response
+
+    @app.teardown_request
+    def _limpiar_perfil_sql(exc=None):
+        token = g.pop('perfil_sql_token', None)
+        if token is None:
+            return
+        try:
+            _perfiles_activos.reset(token)
+        except ValueError:
+            # Token creado en otro contexto (p. ej. respuestas en streaming)
+            _perfiles_activos.set(())
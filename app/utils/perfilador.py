@@ -0,0 +1,366 @@
+"""
+Perfilador por muestreo bajo demanda.
+
+Un administrador arma una sesión de perfilado con duración limitada. La sesión
+se publica en un fichero del directorio compartido PERFILADOR_DIR para que la
+vean todos los workers de gunicorn; cada worker la detecta en su siguiente
+request (como mucho una comprobación de fichero por segundo) y guarda sus
+resultados en el mismo directorio. Al consultar el resultado se combinan los
+ficheros de todos los workers.
+
+Modos:
+    - Sin ruta: muestrea todos los hilos del worker durante la ventana.
+    - Con ruta (regex sobre el path): solo las requests que coinciden, con
+      muestreo (collapsed) o con cProfile (pstats).
+
+Formatos de salida:
+    - collapsed: pilas colapsadas ("a;b;c N"), compatibles con flamegraph.pl
+      y speedscope.
+    - pstats: volcado de cProfile, legible con pstats/snakeviz.
+"""
+
+import cProfile
+import glob
+import json
+import os
+import pstats
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+
+
+FORMATOS = ('collapsed', 'pstats')
+MAX_SEGUNDOS = 120
+FICHERO_SESION = 'sesion.json'
+
+# Sesión activa en este proceso y próxima comprobación del fichero de sesión
+_sesion = None
+_proxima_revision = 0.0
+_lock = threading.Lock()
+
+
+def directorio_por_defecto():
+    """Directorio compartido por defecto para sesiones y resultados."""
+    return os.path.join(tempfile.gettempdir(), 'solicitudes_perfilador')
+
+
+def _escribir_atomico(ruta, contenido, modo='w'):
+    """Escribir un fichero de forma atómica (los workers pueden leerlo a la vez)."""
+    temporal = f'{ruta}.{os.getpid()}.tmp'
+    with open(temporal, modo) as f:
+        f.write(contenido)
+    os.replace(temporal, ruta)
+
+
+def _pila(frame):
+    """Convertir un frame en una pila colapsada (de la raíz a la hoja)."""
+    marcos = []
+    while frame is not None:
+        codigo = frame.f_code
+        marcos.append(f'{os.path.basename(codigo.co_filename)}:{codigo.co_name}')
+        frame = frame.f_back
+    return ';'.join(reversed(marcos))
+
+
+class Muestreador(threading.Thread):
+    """Hilo que toma muestras periódicas de las pilas de ejecución."""
+
+    def __init__(self, intervalo, hasta=None, hilo_objetivo=None, al_terminar=None):
+        """
+        Args:
+            intervalo: Segundos entre muestras
+            hasta: Instante (time.time) en el que dejar de muestrear
+            hilo_objetivo: ident del hilo a muestrear (None = todos)
+            al_terminar: Función llamada con las pilas al acabar la ventana
+        """
+        super().__init__(name='perfilador', daemon=True)
+        self.intervalo = intervalo
+        self.hasta = hasta
+        self.hilo_objetivo = hilo_objetivo
+        self.al_terminar = al_terminar
+        self.pilas = Counter()
+        self._detener = threading.Event()
+
+    def run(self):
+        propio = threading.get_ident()
+        while not self._detener.is_set():
+            if self.hasta is not None and time.time() >= self.hasta:
+                break
+
+            for hilo, frame in sys._current_frames().items():
+                if hilo == propio:
+                    continue
+                if self.hilo_objetivo is not None and hilo != self.hilo_objetivo:
+                    continue
+                self.pilas[_pila(frame)] += 1
+
+            self._detener.wait(self.intervalo)
+
+        if self.al_terminar is not None:
+            self.al_terminar(self.pilas)
+
+    def detener(self):
+        """Detener el muestreo y esperar al hilo."""
+        self._detener.set()
+        self.join()
+
+
+class _SesionLocal:
+    """Estado de una sesión de perfilado dentro de un worker."""
+
+    def __init__(self, datos, directorio):
+        self.id = datos['id']
+        self.hasta = datos['hasta']
+        self.formato = datos['formato']
+        self.intervalo = datos['intervalo_ms'] / 1000
+        self.ruta = re.compile(datos['ruta']) if datos.get('ruta') else None
+        self.directorio = directorio
+        self.pilas = Counter()
+        self.stats = None
+        self.muestreador = None
+
+    @property
+    def fichero_resultado(self):
+        extension = 'pstats' if self.formato == 'pstats' else 'collapsed'
+        return os.path.join(self.directorio, f'{self.id}-{os.getpid()}.{extension}')
+
+    def activa(self):
+        return time.time() < self.hasta
+
+    def iniciar_muestreo_proceso(self):
+        """Muestrear todos los hilos del worker hasta el final de la ventana."""
+        self.muestreador = Muestreador(
+            self.intervalo,
+            hasta=self.hasta,
+            al_terminar=lambda pilas: self.acumular(pilas=pilas)
+        )
+        self.muestreador.start()
+
+    def acumular(self, pilas=None, perfil=None):
+        """Añadir las muestras de una request y guardar el resultado parcial."""
+        with _lock:
+            if pilas:
+                self.pilas.update(pilas)
+            if perfil is not None:
+                perfil.create_stats()
+                if self.stats is None:
+                    self.stats = pstats.Stats(perfil)
+                else:
+                    self.stats.add(perfil)
+            self.guardar()
+
+    def guardar(self):
+        """Escribir el resultado acumulado de este worker."""
+        if self.formato == 'pstats':
+            if self.stats is not None:
+                self.stats.dump_stats(self.fichero_resultado)
+            return
+
+        if self.pilas:
+            contenido = ''.join(f'{pila} {n}\n' for pila, n in self.pilas.most_common())
+            _escribir_atomico(self.fichero_resultado, contenido)
+
+
+def iniciar_sesion(directorio, segundos, ruta=None, formato='collapsed', intervalo_ms=5):
+    """
+    Armar una sesión de perfilado para todos los workers.
+
+    Args:
+        directorio: Directorio compartido de sesiones y resultados
+        segundos: Duración de la ventana de captura
+        ruta: Regex sobre request.path (None = muestrear el worker completo)
+        formato: 'collapsed' o 'pstats'
+        intervalo_ms: Milisegundos entre muestras
+
+    Returns:
+        dict: Datos de la sesión
+
+    Raises:
+        ValueError: Si los parámetros no son válidos
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f'Formato no válido. Opciones: {", ".join(FORMATOS)}')
+    if not 0 < segundos <= MAX_SEGUNDOS:
+        raise ValueError(f'segundos debe estar entre 1 y {MAX_SEGUNDOS}')
+    if not 1 <= intervalo_ms <= 1000:
+        raise ValueError('intervalo_ms debe estar entre 1 y 1000')
+    if formato == 'pstats' and not ruta:
+        raise ValueError('El formato pstats requiere una ruta (cProfile solo perfila el hilo de la request)')
+    if ruta:
+        try:
+            re.compile(ruta)
+        except re.error as e:
+            raise ValueError(f'Ruta no válida: {e}')
+
+    os.makedirs(directorio, exist_ok=True)
+    _limpiar_resultados_antiguos(directorio)
+
+    datos = {
+        'id': uuid.uuid4().hex[:16],
+        'inicio': time.time(),
+        'hasta': time.time() + segundos,
+        'ruta': ruta,
+        'formato': formato,
+        'intervalo_ms': intervalo_ms
+    }
+    contenido = json.dumps(datos)
+    _escribir_atomico(os.path.join(directorio, f"{datos['id']}.json"), contenido)
+    _escribir_atomico(os.path.join(directorio, FICHERO_SESION), contenido)
+
+    return datos
+
+
+def _limpiar_resultados_antiguos(directorio, max_horas=24):
+    """Eliminar sesiones y resultados de más de max_horas."""
+    limite = time.time() - max_horas * 3600
+    for ruta in glob.glob(os.path.join(directorio, '*')):
+        try:
+            if os.path.getmtime(ruta) < limite:
+                os.remove(ruta)
+        except OSError:
+            pass
+
+
+def obtener_resultado(directorio, sesion_id):
+    """
+    Combinar los resultados de todos los workers de una sesión.
+
+    Args:
+        directorio: Directorio compartido de sesiones y resultados
+        sesion_id: ID de la sesión
+
+    Returns:
+        tuple: (estado, datos de la sesión, contenido) donde estado es
+        'no_encontrada', 'en_curso', 'sin_muestras' o 'completada'; el
+        contenido es texto (collapsed) o bytes (pstats)
+    """
+    if not re.fullmatch(r'[0-9a-f]{16}', sesion_id or ''):
+        return 'no_encontrada', None, None
+
+    try:
+        with open(os.path.join(directorio, f'{sesion_id}.json')) as f:
+            datos = json.load(f)
+    except (OSError, ValueError):
+        return 'no_encontrada', None, None
+
+    # Margen para que los workers terminen de escribir
+    if time.time() < datos['hasta'] + 1:
+        return 'en_curso', datos, None
+
+    if datos['formato'] == 'pstats':
+        ficheros = glob.glob(os.path.join(directorio, f'{sesion_id}-*.pstats'))
+        if not ficheros:
+            return 'sin_muestras', datos, None
+
+        stats = pstats.Stats(ficheros[0])
+        for fichero in ficheros[1:]:
+            stats.add(fichero)
+
+        fd, temporal = tempfile.mkstemp(suffix='.pstats')
+        os.close(fd)
+        try:
+            stats.dump_stats(temporal)
+            with open(temporal, 'rb') as f:
+                return 'completada', datos, f.read()
+        finally:
+            os.remove(temporal)
+
+    pilas = Counter()
+    for fichero in glob.glob(os.path.join(directorio, f'{sesion_id}-*.collapsed')):
+        with open(fichero) as f:
+            for linea in f:
+                pila, _, n = linea.rstrip('\n').rpartition(' ')
+                if pila and n.isdigit():
+                    pilas[pila] += int(n)
+
+    if not pilas:
+        return 'sin_muestras', datos, None
+
+    return 'completada', datos, ''.join(f'{pila} {n}\n' for pila, n in pilas.most_common())
+
+
+def _revisar_sesion(directorio):
+    """Cargar en este worker la sesión publicada, si hay una nueva y vigente."""
+    global _sesion
+
+    try:
+        with open(os.path.join(directorio, FICHERO_SESION)) as f:
+            datos = json.load(f)
+    except (OSError, ValueError):
+        return
+
+    if time.time() >= datos.get('hasta', 0):
+        return
+    if _sesion is not None and _sesion.id == datos['id']:
+        return
+
+    with _lock:
+        if _sesion is not None and _sesion.id == datos['id']:
+            return
+        sesion = _SesionLocal(datos, directorio)
+        if sesion.ruta is None:
+            sesion.iniciar_muestreo_proceso()
+        _sesion = sesion
+
+
+def registrar_perfilador(app):
+    """
+    Registrar los hooks del perfilador.
+
+    Sin sesión activa el coste por request es comparar un reloj; el fichero de
+    sesión se revisa como mucho cada PERFILADOR_REVISION_SEGUNDOS.
+
+    Args:
+        app: Instancia de Flask
+    """
+    if not app.config.get('PERFILADOR_HABILITADO', True):
+        return
+
+    from flask import g, request
+
+    cada = app.config.get('PERFILADOR_REVISION_SEGUNDOS', 1.0)
+
+    @app.before_request
+    def _iniciar_perfilador():
+        global _proxima_revision, _sesion
+
+        ahora = time.monotonic()
+        if ahora >= _proxima_revision:
+            _proxima_revision = ahora + cada
+            _revisar_sesion(app.config.get('PERFILADOR_DIR') or directorio_por_defecto())
+
+        sesion = _sesion
+        if sesion is None:
+            return
+        if not sesion.activa():
+            _sesion = None
+            return
+        if sesion.ruta is None or not sesion.ruta.search(request.path):
+            return
+
+        if sesion.formato == 'pstats':
+            perfil = cProfile.Profile()
+            perfil.enable()
+            g.perfilador = (sesion, perfil)
+        else:
+            muestreador = Muestreador(sesion.intervalo, hilo_objetivo=threading.get_ident())
+            muestreador.start()
+            g.perfilador = (sesion, muestreador)
+
+    @app.teardown_request
+    def _cerrar_perfilador(exc=None):
+        activo = g.pop('perfilador', None)
+        if activo is None:
+            return
+
+        sesion, captura = activo
+        if isinstance(captura, cProfile.Profile):
+            captura.disable()
+            sesion.acumular(perfil=captura)
+        else:
+            captura.detener()
+            sesion.acumular(pilas=captura.pilas)
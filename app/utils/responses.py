@@ -2,13 +2,15 @@
 Funciones helper para respuestas HTTP consistentes.
 """
 
-from flask import jsonify
+from flask import jsonify, g, has_request_context
 from datetime import datetime
 import uuid
 
 
 def _generate_request_id():
-    """Genera un ID único para la request."""
+    """Obtiene el ID de correlación de la request actual o genera uno nuevo."""
+    if has_request_context() and g.get('request_id'):
+        return g.request_id
     return str(uuid.uuid4())
 
 
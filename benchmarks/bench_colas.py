@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la latencia de los emails urgentes bajo carga de difusión.
+
+Simula el escenario que motivó separar las colas de Celery: se encolan
+varias difusiones (cada una "envía" a muchos aprobadores) y, mientras se
+procesan, llegan emails transaccionales de solicitudes urgentes. Se mide la
+latencia extremo a extremo (encolado -> ejecución) de los urgentes con:
+
+- una cola: todas las tareas en la misma cola y el mismo worker.
+- colas separadas: enrutado y prioridades de app.tasks, un worker por cola
+  con el ajuste de WORKERS_POR_COLA.
+
+Las tareas simulan el envío con sleep para no depender de SMTP ni de la base
+de datos. Los workers corren en este proceso (pool de hilos). Con el broker
+en memoria solo se mide la separación de colas; con Redis también las
+prioridades dentro de cada cola.
+
+Uso:
+    python -m benchmarks.bench_colas
+    python -m benchmarks.bench_colas --broker redis://localhost:6379/15 --difusiones 40
+"""
+import argparse
+import statistics
+import threading
+import time
+
+from celery import Celery
+
+from app.tasks import (
+    COLA_DIFUSION, COLA_NOTIFICACIONES, WORKERS_POR_COLA, celery_app, prioridad_tarea
+)
+
+LATENCIAS = []
+
+
+def crear_app_benchmark(broker, separadas):
+    """Crear una app de Celery con las tareas simuladas y el enrutado a medir."""
+    bench = Celery('bench_colas', broker=broker, backend='cache+memory://')
+    opciones = dict(celery_app.conf.broker_transport_options)
+    if broker.startswith('memory://'):
+        # El transporte en memoria consulta la cola cada segundo por defecto
+        opciones['polling_interval'] = 0.005
+    bench.conf.update(
+        task_default_priority=celery_app.conf.task_default_priority,
+        broker_transport_options=opciones,
+        worker_prefetch_multiplier=1,
+        task_default_queue=COLA_NOTIFICACIONES if separadas else 'celery',
+    )
+    if separadas:
+        bench.conf.task_routes = {'bench.difusion': {'queue': COLA_DIFUSION}}
+
+    @bench.task(name='bench.difusion')
+    def difusion(destinatarios, ms):
+        for _ in range(destinatarios):
+            time.sleep(ms / 1000)
+
+    @bench.task(name='bench.transaccional')
+    def transaccional(encolado_en, ms):
+        LATENCIAS.append(time.time() - encolado_en)
+        time.sleep(ms / 1000)
+
+    return bench, difusion, transaccional
+
+
+def arrancar_worker(app, cola, concurrency, prefetch):
+    """Arrancar un worker de hilos en segundo plano que consume una cola."""
+    worker = app.WorkController(
+        concurrency=concurrency,
+        pool='threads',
+        queues=[cola],
+        prefetch_multiplier=prefetch,
+        loglevel='ERROR',
+        without_heartbeat=True,
+        without_mingle=True,
+        without_gossip=True,
+    )
+    hilo = threading.Thread(target=worker.start, daemon=True)
+    hilo.start()
+    return worker
+
+
+def ejecutar(args, separadas):
+    """Ejecutar el escenario y devolver las latencias de los urgentes en ms."""
+    LATENCIAS.clear()
+    app, difusion, transaccional = crear_app_benchmark(args.broker, separadas)
+
+    if separadas:
+        workers = [
+            arrancar_worker(app, cola, ajuste['concurrency'], ajuste['prefetch_multiplier'])
+            for cola, ajuste in WORKERS_POR_COLA.items() if cola in (COLA_NOTIFICACIONES, COLA_DIFUSION)
+        ]
+    else:
+        # Misma concurrencia total que los workers de colas separadas
+        total = sum(WORKERS_POR_COLA[c]['concurrency'] for c in (COLA_NOTIFICACIONES, COLA_DIFUSION))
+        workers = [arrancar_worker(app, 'celery', total, 1)]
+
+    time.sleep(1)
+
+    for _ in range(args.difusiones):
+        difusion.apply_async((args.destinatarios, args.ms_envio), priority=prioridad_tarea('media'))
+
+    for _ in range(args.urgentes):
+        transaccional.apply_async((time.time(), args.ms_envio), priority=prioridad_tarea('urgente'))
+        time.sleep(args.intervalo / 1000)
+
+    limite = time.time() + args.timeout
+    while len(LATENCIAS) < args.urgentes and time.time() < limite:
+        time.sleep(0.05)
+
+    for worker in workers:
+        worker.stop(in_sighandler=False)
+
+    return sorted(latencia * 1000 for latencia in LATENCIAS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Latencia de emails urgentes bajo difusión')
+    parser.add_argument('--broker', default='memory://')
+    parser.add_argument('--difusiones', type=int, default=20, help='Difusiones encoladas')
+    parser.add_argument('--destinatarios', type=int, default=100, help='Destinatarios por difusión')
+    parser.add_argument('--ms-envio', type=float, default=5.0, help='Duración simulada de un envío')
+    parser.add_argument('--urgentes', type=int, default=50, help='Emails urgentes encolados')
+    parser.add_argument('--intervalo', type=float, default=50.0, help='ms entre emails urgentes')
+    parser.add_argument('--timeout', type=float, default=120.0)
+    args = parser.parse_args()
+
+    print(f"{'escenario':<16} {'urgentes':>9} {'p50 (ms)':>10} {'p95 (ms)':>10} {'máx (ms)':>10}")
+    for separadas in (False, True):
+        latencias = ejecutar(args, separadas)
+        nombre = 'colas separadas' if separadas else 'una cola'
+        if not latencias:
+            print(f"{nombre:<16} {0:>9} {'-':>10} {'-':>10} {'-':>10}")
+            continue
+        p95 = latencias[max(0, int(len(latencias) * 0.95) - 1)]
+        print(f"{nombre:<16} {len(latencias):>9} {statistics.median(latencias):>10.1f} "
+              f"{p95:>10.1f} {latencias[-1]:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark del reparto de difusiones en bloques entre workers.
+
+Reproduce el reparto de enviar_email_solicitud para las difusiones: la lista
+de destinatarios se divide en bloques que procesan en paralelo los hilos del
+worker de la cola de difusión. Mide el tiempo total de una difusión (hasta
+que termina el último bloque; la agregación posterior es despreciable) según
+la concurrencia del worker. Los envíos se simulan con sleep (sin SMTP ni
+base de datos) y el worker corre en este proceso (pool de hilos).
+
+Uso:
+    python -m benchmarks.bench_difusion --destinatarios 500 --bloque 50
+    python -m benchmarks.bench_difusion --broker redis://localhost:6379/15
+"""
+import argparse
+import time
+
+from celery import Celery, group
+
+from benchmarks.bench_colas import arrancar_worker
+from app.tasks import COLA_DIFUSION, WORKERS_POR_COLA
+
+# (instante de fin, destinatarios) de cada bloque terminado
+TERMINADAS = []
+
+
+def crear_app_benchmark(broker):
+    """Crear una app de Celery con la tarea de bloque simulada."""
+    bench = Celery('bench_difusion', broker=broker, backend='cache+memory://')
+    opciones = {}
+    if broker.startswith('memory://'):
+        # El transporte en memoria consulta la cola cada segundo por defecto
+        opciones['polling_interval'] = 0.005
+    bench.conf.update(
+        broker_transport_options=opciones,
+        task_default_queue=COLA_DIFUSION,
+        worker_prefetch_multiplier=1,
+    )
+
+    @bench.task(name='bench.bloque')
+    def bloque(destinatarios, ms):
+        for _ in range(destinatarios):
+            time.sleep(ms / 1000)
+        TERMINADAS.append((time.perf_counter(), destinatarios))
+
+    return bench, bloque
+
+
+def medir(args, concurrency):
+    """Tiempo en segundos de una difusión completa con la concurrencia dada."""
+    TERMINADAS.clear()
+    app, bloque = crear_app_benchmark(args.broker)
+    worker = arrancar_worker(app, COLA_DIFUSION, concurrency, WORKERS_POR_COLA[COLA_DIFUSION]['prefetch_multiplier'])
+    time.sleep(1)
+
+    tamanos = [min(args.bloque, args.destinatarios - i) for i in range(0, args.destinatarios, args.bloque)]
+    inicio = time.perf_counter()
+    group(bloque.s(n, args.ms_envio) for n in tamanos).apply_async()
+
+    limite = inicio + args.timeout
+    while len(TERMINADAS) < len(tamanos) and time.perf_counter() < limite:
+        time.sleep(0.005)
+
+    worker.stop(in_sighandler=False)
+    if len(TERMINADAS) < len(tamanos):
+        return None, 0
+    return max(fin for fin, _ in TERMINADAS) - inicio, sum(n for _, n in TERMINADAS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tiempo de difusión según la concurrencia')
+    parser.add_argument('--broker', default='memory://')
+    parser.add_argument('--destinatarios', type=int, default=400)
+    parser.add_argument('--bloque', type=int, default=50, help='Destinatarios por bloque')
+    parser.add_argument('--ms-envio', type=float, default=5.0, help='Duración simulada de un envío')
+    parser.add_argument('--concurrencias', default='1,2,4,8')
+    parser.add_argument('--timeout', type=float, default=120.0)
+    args = parser.parse_args()
+
+    print(f"{'concurrencia':>12} {'enviadas':>9} {'tiempo (s)':>11} {'aceleración':>12}")
+    base = None
+    for concurrency in (int(c) for c in args.concurrencias.split(',')):
+        segundos, enviadas = medir(args, concurrency)
+        if segundos is None:
+            print(f"{concurrency:>12} {'-':>9} {'timeout':>11}")
+            continue
+        base = base or segundos
+        print(f"{concurrency:>12} {enviadas:>9} {segundos:>11.2f} {base / segundos:>11.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark del coste del límite de frecuencia de la API.
+
+Mide el coste de los hooks del límite de frecuencia por request (identificar
+al usuario desde el JWT, contar en la ventana deslizante y añadir las
+cabeceras), la latencia mediana de una request completa con y sin límite
+sobre la app de testing (SQLite en memoria) y el coste aislado de una
+operación de ventana en cada almacén. El objetivo es que el límite añada
+menos de 200 µs por request.
+
+Uso:
+    python -m benchmarks.bench_limitador --requests 5000
+    python -m benchmarks.bench_limitador --redis-url redis://localhost:6379/15
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks.bench_metricas import medir
+from app import create_app, db
+from app.models.usuario import Usuario
+
+OBJETIVO_US = 200.0
+
+
+def crear_app_benchmark(limite, backend, redis_url):
+    """Crear la app de testing con o sin límite y un usuario autenticado."""
+    from config import TestingConfig
+    TestingConfig.LIMITE_FRECUENCIA_HABILITADO = limite
+    # Límite alto: se mide el coste de contar, no el de rechazar
+    TestingConfig.LIMITE_FRECUENCIA_REGLAS = {'*': {'administrador': 10 ** 9}}
+    TestingConfig.LIMITADOR_BACKEND = backend
+    TestingConfig.LIMITADOR_REDIS_URL = redis_url
+    TestingConfig.LOG_ACCESO = False
+
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        usuario = Usuario(email='bench@solicitudes.com', nombre='Bench', rol='administrador')
+        usuario.set_password('bench123')
+        db.session.add(usuario)
+        db.session.commit()
+
+        from app.services.auth_service import crear_tokens
+        with app.test_request_context():
+            token = crear_tokens(usuario)['access_token']
+
+    return app, {'Authorization': f'Bearer {token}'}
+
+
+def medir_hooks(app, ruta, n, headers):
+    """Latencia en microsegundos de los hooks del límite para n requests."""
+    antes = next(f for f in app.before_request_funcs[None] if f.__name__ == '_limitar_frecuencia')
+    despues = next(f for f in app.after_request_funcs[None] if f.__name__ == '_cabeceras_limite_frecuencia')
+    respuesta = app.response_class()
+    latencias = []
+
+    with app.test_request_context(ruta, headers=headers):
+        for _ in range(n):
+            inicio = time.perf_counter()
+            antes()
+            despues(respuesta)
+            latencias.append((time.perf_counter() - inicio) * 1e6)
+
+    return latencias
+
+
+def medir_almacen(almacen, n):
+    """Latencia en microsegundos de n operaciones de ventana sobre claves distintas."""
+    latencias = []
+    for i in range(n):
+        inicio = time.perf_counter()
+        almacen.ventana(f'bench:{i % 1000}', 10 ** 9, 60)
+        latencias.append((time.perf_counter() - inicio) * 1e6)
+    return latencias
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Coste del límite de frecuencia')
+    parser.add_argument('--requests', type=int, default=3000)
+    parser.add_argument('--redis-url', default=None, help='Medir también con Redis')
+    args = parser.parse_args()
+
+    backends = ['memoria'] + (['redis'] if args.redis_url else [])
+
+    ruta = '/api/usuarios/perfil'
+
+    print(f"{'backend':<10} {'hooks p50 (µs)':>15} {'hooks p99 (µs)':>15} "
+          f"{'sin límite (µs)':>16} {'con límite (µs)':>16}")
+    for backend in backends:
+        medianas = {}
+        for limite in (False, True):
+            app, headers = crear_app_benchmark(limite, backend, args.redis_url)
+            with app.app_context():
+                medianas[limite] = statistics.median(medir(app, ruta, args.requests, headers))
+                if limite:
+                    hooks = sorted(medir_hooks(app, ruta, args.requests, headers))
+
+        p50 = statistics.median(hooks)
+        p99 = hooks[int(len(hooks) * 0.99) - 1]
+        estado = 'OK' if p50 < OBJETIVO_US else 'SUPERA EL OBJETIVO'
+        print(f"{backend:<10} {p50:>15.1f} {p99:>15.1f} "
+              f"{medianas[False]:>16.1f} {medianas[True]:>16.1f}  {estado}")
+
+    from app.utils.limitador import AlmacenMemoria, AlmacenRedis
+    almacenes = {'memoria': AlmacenMemoria()}
+    if args.redis_url:
+        almacenes['redis'] = AlmacenRedis(args.redis_url, prefijo='bench:limitador:')
+
+    print(f"\n{'almacén':<10} {'p50 (µs)':>10} {'p99 (µs)':>10}")
+    for nombre, almacen in almacenes.items():
+        latencias = sorted(medir_almacen(almacen, args.requests))
+        p99 = latencias[int(len(latencias) * 0.99) - 1]
+        print(f"{nombre:<10} {statistics.median(latencias):>10.1f} {p99:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
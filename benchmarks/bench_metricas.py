@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark del coste de la instrumentación de métricas.
+
+Mide la latencia media de una request con y sin métricas sobre la app de
+testing (SQLite en memoria) usando el cliente de pruebas de Flask.
+
+Uso:
+    python -m benchmarks.bench_metricas --requests 5000
+"""
+import argparse
+import statistics
+import time
+
+from app import create_app, db
+from app.models.usuario import Usuario
+
+
+def medir(app, ruta, n, headers=None):
+    """Ejecutar n requests GET y devolver las latencias en microsegundos."""
+    cliente = app.test_client()
+    latencias = []
+
+    # Calentamiento
+    for _ in range(min(200, n)):
+        cliente.get(ruta, headers=headers)
+
+    for _ in range(n):
+        inicio = time.perf_counter()
+        cliente.get(ruta, headers=headers)
+        latencias.append((time.perf_counter() - inicio) * 1e6)
+
+    return latencias
+
+
+def crear_app_benchmark(metricas):
+    """Crear la app de testing con o sin métricas y un usuario autenticado."""
+    from config import TestingConfig
+    TestingConfig.METRICAS_HABILITADAS = metricas
+    TestingConfig.LOG_ACCESO = False
+
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        usuario = Usuario(email='bench@solicitudes.com', nombre='Bench', rol='administrador')
+        usuario.set_password('bench123')
+        db.session.add(usuario)
+        db.session.commit()
+
+        from flask_jwt_extended import create_access_token
+        with app.test_request_context():
+            token = create_access_token(identity=str(usuario.id))
+
+    return app, {'Authorization': f'Bearer {token}'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Coste de la instrumentación de métricas')
+    parser.add_argument('--requests', type=int, default=3000)
+    args = parser.parse_args()
+
+    resultados = {}
+    for metricas in (False, True):
+        app, headers = crear_app_benchmark(metricas)
+        with app.app_context():
+            resultados[metricas] = {
+                'health': medir(app, '/health', args.requests),
+                'listar': medir(app, '/api/solicitudes', args.requests, headers),
+            }
+
+    print(f"{'ruta':<10} {'sin métricas (µs)':>18} {'con métricas (µs)':>18} {'overhead (µs)':>14}")
+    for ruta in ('health', 'listar'):
+        sin = statistics.median(resultados[False][ruta])
+        con = statistics.median(resultados[True][ruta])
+        print(f"{ruta:<10} {sin:>18.1f} {con:>18.1f} {con - sin:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
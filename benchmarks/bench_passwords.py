@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark del hashing de contraseñas.
+
+Mide verificaciones de login por segundo por núcleo para varios factores de
+coste bcrypt y el throughput con varios hilos concurrentes usando el pool del
+servicio de contraseñas (bcrypt libera el GIL mientras calcula el hash).
+
+Uso:
+    python -m benchmarks.bench_passwords --rondas 10 11 12 13 --hilos 4
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+PASSWORD = 'empleado123'
+
+
+def medir_secuencial(rondas, duracion):
+    """Verificaciones por segundo en un solo hilo."""
+    from app.services.password_service import _hashear, _verificar
+
+    password_hash = _hashear(PASSWORD, rondas)
+    n = 0
+    inicio = time.perf_counter()
+    while time.perf_counter() - inicio < duracion:
+        _verificar(PASSWORD, password_hash)
+        n += 1
+    return n / (time.perf_counter() - inicio)
+
+
+def medir_concurrente(app, rondas, hilos, pool, duracion):
+    """Verificaciones por segundo con `hilos` clientes concurrentes."""
+    from app.services import password_service
+
+    app.config.update(
+        PASSWORD_BCRYPT_ROUNDS=rondas,
+        PASSWORD_HASH_POOL=pool,
+        PASSWORD_HASH_WORKERS=hilos,
+        PASSWORD_HASH_CONCURRENCIA=hilos,
+        PASSWORD_HASH_ESPERA_MAX=60
+    )
+    # Recrear el pool con la nueva configuración
+    password_service._pid = None
+
+    with app.app_context():
+        password_hash = password_service.generar_hash(PASSWORD)
+
+    def _cliente(_):
+        n = 0
+        with app.app_context():
+            inicio = time.perf_counter()
+            while time.perf_counter() - inicio < duracion:
+                password_service.verificar_password(password_hash, PASSWORD)
+                n += 1
+        return n
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as ejecutor:
+        total = sum(ejecutor.map(_cliente, range(hilos)))
+    return total / (time.perf_counter() - inicio)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de hashing de contraseñas')
+    parser.add_argument('--rondas', type=int, nargs='+', default=[10, 11, 12, 13])
+    parser.add_argument('--hilos', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--pool', choices=['ninguno', 'hilos', 'procesos'], default='hilos')
+    parser.add_argument('--duracion', type=float, default=3.0, help='Segundos por medición')
+    args = parser.parse_args()
+
+    from app import create_app
+    app = create_app('testing')
+
+    print(f"Núcleos: {os.cpu_count()}  hilos: {args.hilos}  pool: {args.pool}\n")
+    print(f"{'rondas':>6} {'ms/login':>9} {'logins/s/núcleo':>16} {f'logins/s ({args.hilos} hilos)':>22}")
+
+    for rondas in args.rondas:
+        por_nucleo = medir_secuencial(rondas, args.duracion)
+        concurrente = medir_concurrente(app, rondas, args.hilos, args.pool, args.duracion)
+        print(f"{rondas:>6} {1000 / por_nucleo:>9.1f} {por_nucleo:>16.1f} {concurrente:>22.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,5 @@
 """Configuración de la aplicación Flask."""
+import json
 import os
 from datetime import timedelta
 from dotenv import load_dotenv
@@ -7,6 +8,28 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
+# Peticiones por LIMITE_FRECUENCIA_PERIODO según regla (endpoint, blueprint o '*') y rol
+LIMITE_FRECUENCIA_REGLAS_DEFECTO = {
+    '*': {'anonimo': 120, 'empleado': 300, 'jefe': 600, 'administrador': 1200},
+    'solicitudes.listar_solicitudes': {'empleado': 60, 'jefe': 120, 'administrador': 240},
+    'sistema': {'administrador': 30},
+}
+
+
+def _parsear_muestreo(valor):
+    """
+    Parsear tasas de muestreo por endpoint.
+
+    Formato: "solicitudes.listar_solicitudes=0.1,notificaciones.listar_notificaciones=0.25"
+    """
+    tasas = {}
+    for item in (valor or '').split(','):
+        endpoint, _, tasa = item.strip().partition('=')
+        if endpoint and tasa:
+            tasas[endpoint] = float(tasa)
+    return tasas
+
+
 class Config:
     """Configuración base."""
 
@@ -33,6 +56,37 @@ class Config:
     JWT_HEADER_NAME = 'Authorization'
     JWT_HEADER_TYPE = 'Bearer'
 
+    # Contraseñas (bcrypt)
+    PASSWORD_BCRYPT_ROUNDS = int(os.getenv('PASSWORD_BCRYPT_ROUNDS', 12))
+    BCRYPT_LOG_ROUNDS = PASSWORD_BCRYPT_ROUNDS
+    # ninguno | hilos | procesos: dónde se ejecuta bcrypt
+    PASSWORD_HASH_POOL = os.getenv('PASSWORD_HASH_POOL', 'ninguno')
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+    # Máximo de operaciones bcrypt simultáneas por proceso (por defecto = workers)
+    PASSWORD_HASH_CONCURRENCIA = int(os.getenv('PASSWORD_HASH_CONCURRENCIA', 0)) or None
+    # Segundos de espera por un hueco antes de responder 503
+    PASSWORD_HASH_ESPERA_MAX = float(os.getenv('PASSWORD_HASH_ESPERA_MAX', 2.0))
+
+    # Limitación de frecuencia (memoria | redis)
+    LIMITADOR_BACKEND = os.getenv('LIMITADOR_BACKEND', 'memoria')
+    LIMITADOR_REDIS_URL = os.getenv('LIMITADOR_REDIS_URL', os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+
+    # Límite de frecuencia de la API (LIMITE_FRECUENCIA_REGLAS admite JSON)
+    LIMITE_FRECUENCIA_HABILITADO = os.getenv('LIMITE_FRECUENCIA_HABILITADO', 'True').lower() == 'true'
+    LIMITE_FRECUENCIA_PERIODO = int(os.getenv('LIMITE_FRECUENCIA_PERIODO', 60))
+    LIMITE_FRECUENCIA_PREFIJO = '/api/'
+    LIMITE_FRECUENCIA_REGLAS = (
+        json.loads(os.getenv('LIMITE_FRECUENCIA_REGLAS'))
+        if os.getenv('LIMITE_FRECUENCIA_REGLAS') else LIMITE_FRECUENCIA_REGLAS_DEFECTO
+    )
+
+    # Throttling de login: ráfaga máxima y segundos para recuperarla
+    LOGIN_THROTTLING_HABILITADO = os.getenv('LOGIN_THROTTLING_HABILITADO', 'True').lower() == 'true'
+    LOGIN_IP_CAPACIDAD = int(os.getenv('LOGIN_IP_CAPACIDAD', 20))
+    LOGIN_IP_PERIODO = int(os.getenv('LOGIN_IP_PERIODO', 60))
+    LOGIN_EMAIL_CAPACIDAD = int(os.getenv('LOGIN_EMAIL_CAPACIDAD', 5))
+    LOGIN_EMAIL_PERIODO = int(os.getenv('LOGIN_EMAIL_PERIODO', 300))
+
     # Celery
     CELERY_BROKER_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
     CELERY_RESULT_BACKEND = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
@@ -53,17 +107,91 @@ class Config:
     ITEMS_PER_PAGE = 10
     MAX_ITEMS_PER_PAGE = 100
 
+    # Logging
+    LOG_FORMATO = os.getenv('LOG_FORMATO', 'json')  # json | texto
+    LOG_ACCESO = os.getenv('LOG_ACCESO', 'True').lower() == 'true'
+    # Fracción de requests cuyos logs INFO se registran, por endpoint
+    LOG_MUESTREO = _parsear_muestreo(os.getenv('LOG_MUESTREO', ''))
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+    # Con varios procesos (gunicorn) los logs van a stdout en lugar de a
+    # ficheros rotados por cada worker
+    LOG_MULTIPROCESO = os.getenv('LOG_MULTIPROCESO', 'False').lower() == 'true'
+
+    # Perfilado SQL por request
+    SQL_PERFIL_HABILITADO = os.getenv('SQL_PERFIL_HABILITADO', 'True').lower() == 'true'
+    SQL_PERFIL_CABECERAS = os.getenv('SQL_PERFIL_CABECERAS', 'False').lower() == 'true'
+    SQL_PERFIL_MAX_LENTAS = int(os.getenv('SQL_PERFIL_MAX_LENTAS', 5))
+    SQL_UMBRAL_LENTA_MS = float(os.getenv('SQL_UMBRAL_LENTA_MS', 200))
+    SQL_AVISO_CONSULTAS = int(os.getenv('SQL_AVISO_CONSULTAS', 30))
+
+    # Perfilador bajo demanda (directorio compartido entre workers)
+    PERFILADOR_HABILITADO = os.getenv('PERFILADOR_HABILITADO', 'True').lower() == 'true'
+    PERFILADOR_DIR = os.getenv('PERFILADOR_DIR')
+    PERFILADOR_REVISION_SEGUNDOS = float(os.getenv('PERFILADOR_REVISION_SEGUNDOS', 1.0))
+
+    # Métricas (endpoint /metrics)
+    METRICAS_HABILITADAS = os.getenv('METRICAS_HABILITADAS', 'True').lower() == 'true'
+
+    # Retención y archivo
+    NOTIFICACIONES_RETENCION_DIAS = int(os.getenv('NOTIFICACIONES_RETENCION_DIAS', 180))
+    NOTIFICACIONES_ARCHIVO_LOTE = int(os.getenv('NOTIFICACIONES_ARCHIVO_LOTE', 1000))
+    NOTIFICACIONES_ARCHIVO_DESTINO = os.getenv('NOTIFICACIONES_ARCHIVO_DESTINO', 'tabla')  # tabla | jsonl
+    NOTIFICACIONES_PARTICIONES_ADELANTE = int(os.getenv('NOTIFICACIONES_PARTICIONES_ADELANTE', 3))
+    # Eliminación de usuarios: por encima de este número de filas dependientes
+    # se hace en segundo plano (Celery) en lotes de USUARIOS_ELIMINACION_LOTE
+    USUARIOS_ELIMINACION_SINCRONA_MAX = int(os.getenv('USUARIOS_ELIMINACION_SINCRONA_MAX', 5000))
+    USUARIOS_ELIMINACION_LOTE = int(os.getenv('USUARIOS_ELIMINACION_LOTE', 1000))
+    SOLICITUDES_ARCHIVO_DIAS = int(os.getenv('SOLICITUDES_ARCHIVO_DIAS', 180))
+    SOLICITUDES_ARCHIVO_LOTE = int(os.getenv('SOLICITUDES_ARCHIVO_LOTE', 500))
+    # Difusiones a aprobadores: destinatarios por bloque (una tarea y una conexión SMTP)
+    DIFUSION_TAMANO_BLOQUE = int(os.getenv('DIFUSION_TAMANO_BLOQUE', 50))
+    # Enrutamiento de aprobadores: caché de reglas_aprobacion por proceso y
+    # destinatarios si ninguna regla cubre la solicitud
+    # (administradores, aprobadores = todos los jefes y administradores, ninguno)
+    ENRUTAMIENTO_CACHE_SEGUNDOS = int(os.getenv('ENRUTAMIENTO_CACHE_SEGUNDOS', 60))
+    ENRUTAMIENTO_RESPALDO = os.getenv('ENRUTAMIENTO_RESPALDO', 'administradores')
+    # Preferencias de notificación: caché por proceso (API y workers)
+    PREFERENCIAS_CACHE_SEGUNDOS = int(os.getenv('PREFERENCIAS_CACHE_SEGUNDOS', 60))
+    # Invalidación entre procesos (redis | memoria): versión por usuario en Redis
+    PREFERENCIAS_INVALIDACION = os.getenv('PREFERENCIAS_INVALIDACION', 'redis')
+    PREFERENCIAS_REDIS_URL = os.getenv('PREFERENCIAS_REDIS_URL', os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+    # Feed de cambios: días que se conservan las lápidas de solicitudes
+    # eliminadas (un cliente sin sincronizar más tiempo recibe 410)
+    CAMBIOS_LAPIDAS_DIAS = int(os.getenv('CAMBIOS_LAPIDAS_DIAS', 30))
+    # Reintentos de emails fallidos: espera BASE * 2^(intentos-1) segundos
+    # (máximo ESPERA_MAX) y descarte al llegar a NOTIFICACIONES_MAX_INTENTOS
+    NOTIFICACIONES_MAX_INTENTOS = int(os.getenv('NOTIFICACIONES_MAX_INTENTOS', 5))
+    NOTIFICACIONES_REINTENTO_ESPERA_BASE = int(os.getenv('NOTIFICACIONES_REINTENTO_ESPERA_BASE', 60))
+    NOTIFICACIONES_REINTENTO_ESPERA_MAX = int(os.getenv('NOTIFICACIONES_REINTENTO_ESPERA_MAX', 3600))
+    # Sin intentos registrados puede seguir en la cola de Celery
+    NOTIFICACIONES_REINTENTO_GRACIA = int(os.getenv('NOTIFICACIONES_REINTENTO_GRACIA', 600))
+    NOTIFICACIONES_REINTENTO_LOTE = int(os.getenv('NOTIFICACIONES_REINTENTO_LOTE', 50))
+    NOTIFICACIONES_REINTENTO_VENTANA_DIAS = int(os.getenv('NOTIFICACIONES_REINTENTO_VENTANA_DIAS', 7))
+    # Recordatorios de SLA de solicitudes pendientes
+    RECORDATORIOS_DIAS_ANTES = int(os.getenv('RECORDATORIOS_DIAS_ANTES', 1))
+    RECORDATORIOS_HORAS_ESTANCADA = int(os.getenv('RECORDATORIOS_HORAS_ESTANCADA', 48))
+    RECORDATORIOS_DEDUP_HORAS = int(os.getenv('RECORDATORIOS_DEDUP_HORAS', 24))
+    RECORDATORIOS_LOTE = int(os.getenv('RECORDATORIOS_LOTE', 200))
+    # Primera ejecución: solo pendientes que entraron en un criterio en estos días
+    RECORDATORIOS_VENTANA_INICIAL_DIAS = int(os.getenv('RECORDATORIOS_VENTANA_INICIAL_DIAS', 7))
+    ARCHIVO_DIR = os.getenv('ARCHIVO_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'archivo'))
+
 
 class DevelopmentConfig(Config):
     """Configuración de desarrollo."""
     DEBUG = True
-    SQLALCHEMY_ECHO = True
+    # El perfilado SQL sustituye al eco completo; SQLALCHEMY_ECHO=true lo reactiva
+    SQLALCHEMY_ECHO = os.getenv('SQLALCHEMY_ECHO', 'False').lower() == 'true'
+    SQL_PERFIL_CABECERAS = os.getenv('SQL_PERFIL_CABECERAS', 'True').lower() == 'true'
+    SQL_UMBRAL_LENTA_MS = float(os.getenv('SQL_UMBRAL_LENTA_MS', 50))
 
 
 class ProductionConfig(Config):
     """Configuración de producción."""
     DEBUG = False
     TESTING = False
+    # Con varios workers/réplicas los contadores deben ser compartidos
+    LIMITADOR_BACKEND = os.getenv('LIMITADOR_BACKEND', 'redis')
 
 
 class TestingConfig(Config):
@@ -71,6 +199,12 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=5)
+    PASSWORD_BCRYPT_ROUNDS = 4
+    BCRYPT_LOG_ROUNDS = 4
+    # Los benchmarks repiten requests con el mismo usuario
+    LIMITE_FRECUENCIA_HABILITADO = os.getenv('LIMITE_FRECUENCIA_HABILITADO', 'False').lower() == 'true'
+    # Sin Redis: la caché de preferencias solo se invalida en el proceso
+    PREFERENCIAS_INVALIDACION = 'memoria'
 
 
 # Diccionario de configuraciones
@@ -0,0 +1,31 @@
+"""Configuración de gunicorn (se carga automáticamente desde el directorio de trabajo)."""
+import os
+import shutil
+
+# Varios workers no pueden rotar los mismos ficheros de log: se escribe en
+# stdout y la retención la limita el driver de logs de docker-compose.yml
+raw_env = ['LOG_MULTIPROCESO=true']
+
+# Directorio compartido de métricas de Prometheus (modo multiproceso).
+# Debe definirse antes de que los workers importen prometheus_client. En
+# docker-compose.yml es /metricas/api, dentro del volumen que comparten con
+# los workers de Celery.
+PROMETHEUS_DIR = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/prometheus_multiproc')
+
+
+def on_starting(server):
+    """Limpiar las métricas de ejecuciones anteriores."""
+    shutil.rmtree(PROMETHEUS_DIR, ignore_errors=True)
+    os.makedirs(PROMETHEUS_DIR, exist_ok=True)
+
+
+def worker_exit(server, worker):
+    """Vaciar la cola de logs antes de que termine el worker."""
+    from app.utils.logger import detener_logging
+    detener_logging()
+
+
+def child_exit(server, worker):
+    """Descartar los gauges 'live' del worker que terminó."""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,10 +1,12 @@
 """Script de gestión para la aplicación."""
 import os
+import click
 from flask.cli import FlaskGroup
 from app import create_app, db
 from app.models.usuario import Usuario
 from app.models.solicitud import Solicitud
 from app.models.notificacion import Notificacion
+from app.models.marca_agua import MarcaAgua
 
 app = create_app(os.getenv('FLASK_ENV', 'development'))
 cli = FlaskGroup(app)
@@ -100,38 +102,364 @@ def migrate_notifications():
         print("La tabla puede ya tener las columnas necesarias.")
 
 
+# Índices de búsqueda definidos en los modelos (solo PostgreSQL)
+INDICES_BUSQUEDA = [
+    'idx_solicitud_busqueda',
+    'idx_usuario_email_prefijo',
+    'idx_usuario_email_trgm',
+    'idx_usuario_nombre_trgm',
+    'idx_usuario_apellido_trgm',
+    'idx_notificacion_email_prefijo',
+    'idx_notificacion_email_trgm',
+    'idx_notificacion_asunto_trgm',
+    'idx_notificacion_mensaje_trgm',
+]
+
+
+@cli.command("migrate-search")
+def migrate_search():
+    """Crear los índices de búsqueda (texto completo y trigram) en una base existente."""
+    from sqlalchemy import text
+    from sqlalchemy.schema import CreateIndex
+    from app.models.solicitud import SQLITE_FTS_DDL
+    print("Creando índices de búsqueda...")
+
+    dialecto = db.engine.dialect.name
+
+    try:
+        if dialecto == 'postgresql':
+            indices = {
+                indice.name: indice
+                for tabla in (Usuario.__table__, Solicitud.__table__, Notificacion.__table__)
+                for indice in tabla.indexes
+            }
+
+            # CONCURRENTLY no puede ejecutarse dentro de una transacción
+            with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                print("✓ Extensión pg_trgm disponible")
+
+                for nombre in INDICES_BUSQUEDA:
+                    ddl = str(CreateIndex(indices[nombre], if_not_exists=True).compile(dialect=db.engine.dialect))
+                    conn.execute(text(ddl.replace('CREATE INDEX', 'CREATE INDEX CONCURRENTLY', 1)))
+                    print(f"✓ Índice {nombre} creado")
+
+        elif dialecto == 'sqlite':
+            with db.engine.connect() as conn:
+                for sentencia in SQLITE_FTS_DDL:
+                    conn.execute(text(sentencia))
+                # Indexar las filas que ya existían
+                conn.execute(text("INSERT INTO solicitudes_fts(solicitudes_fts) VALUES ('rebuild')"))
+                conn.commit()
+            print("✓ Tabla FTS5 solicitudes_fts creada y reconstruida")
+
+        else:
+            print(f"⚠ Dialecto {dialecto} no soportado, la búsqueda usará ILIKE")
+
+    except Exception as e:
+        print(f"⚠ Error durante migración: {str(e)}")
+
+
+def _crear_indice_solicitudes(nombre):
+    """Crear un índice de solicitudes declarado en el modelo en una base existente."""
+    from sqlalchemy import text
+    from sqlalchemy.schema import CreateIndex
+
+    indice = next(i for i in Solicitud.__table__.indexes if i.name == nombre)
+    ddl = str(CreateIndex(indice, if_not_exists=True).compile(dialect=db.engine.dialect))
+
+    try:
+        if db.engine.dialect.name == 'postgresql':
+            # CONCURRENTLY no puede ejecutarse dentro de una transacción
+            with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                conn.execute(text(ddl.replace('CREATE INDEX', 'CREATE INDEX CONCURRENTLY', 1)))
+                conn.execute(text("ANALYZE solicitudes"))
+        else:
+            with db.engine.begin() as conn:
+                conn.execute(text(ddl))
+        print(f"✓ Índice {nombre} creado")
+    except Exception as e:
+        print(f"⚠ Error durante migración: {str(e)}")
+
+
+@cli.command("migrate-bandeja")
+def migrate_bandeja():
+    """Crear el índice parcial de la bandeja de aprobación en una base existente."""
+    print("Creando índice de la bandeja de aprobación...")
+    _crear_indice_solicitudes('idx_solicitud_bandeja')
+
+
+@cli.command("migrate-recordatorios")
+def migrate_recordatorios():
+    """Crear el índice (estado, fecha_requerida) y la tabla de marcas de agua en una base existente."""
+    print("Creando índice y tabla de los recordatorios...")
+    _crear_indice_solicitudes('idx_solicitud_estado_fecha_requerida')
+    MarcaAgua.__table__.create(db.engine, checkfirst=True)
+    print("✓ Tabla marcas_agua creada")
+
+
+@cli.command("migrate-reintentos")
+def migrate_reintentos():
+    """Añadir la columna descartada (reintentos de email) en una base existente."""
+    from sqlalchemy import text
+    print("Migrando notificaciones para los reintentos de email...")
+
+    if db.engine.dialect.name != 'postgresql':
+        print("⚠ Solo PostgreSQL; en SQLite recrea la base con init-db")
+        return
+
+    try:
+        with db.engine.begin() as conn:
+            for tabla in ('notificaciones', 'notificaciones_archivo'):
+                conn.execute(text(
+                    f"ALTER TABLE {tabla} ADD COLUMN IF NOT EXISTS descartada BOOLEAN DEFAULT FALSE NOT NULL"
+                ))
+                print(f"✓ Columna descartada en {tabla}")
+    except Exception as e:
+        print(f"⚠ Error durante migración: {str(e)}")
+
+
+@cli.command("migrate-cambios")
+def migrate_cambios():
+    """Añadir la secuencia de cambios de solicitudes (feed /cambios) en una base existente."""
+    from sqlalchemy import text
+    from app.models.cambio import SecuenciaCambios, SolicitudEliminada
+
+    if db.engine.dialect.name != 'postgresql':
+        print("⚠ Solo PostgreSQL; en SQLite recrea la base con init-db")
+        return
+
+    print("Migrando solicitudes para el feed de cambios...")
+
+    try:
+        with db.engine.begin() as conn:
+            for tabla in ('solicitudes', 'solicitudes_archivo'):
+                conn.execute(text(f"ALTER TABLE {tabla} ADD COLUMN IF NOT EXISTS version BIGINT"))
+                print(f"✓ Columna version en {tabla}")
+        SecuenciaCambios.__table__.create(db.engine, checkfirst=True)
+        SolicitudEliminada.__table__.create(db.engine, checkfirst=True)
+        print("✓ Tablas secuencias_cambios y solicitudes_eliminadas creadas")
+
+        # Numerar las existentes por antigüedad de su último cambio. El
+        # bloqueo de la secuencia detiene las escrituras concurrentes hasta el commit
+        with db.engine.begin() as conn:
+            base = conn.execute(text(
+                "SELECT valor FROM secuencias_cambios WHERE nombre = 'solicitudes' FOR UPDATE"
+            )).scalar()
+            numeradas = conn.execute(text("""
+                UPDATE solicitudes s SET version = :base + n.orden
+                FROM (
+                    SELECT id, row_number() OVER (ORDER BY coalesce(updated_at, created_at), id) AS orden
+                    FROM solicitudes WHERE version IS NULL
+                ) n
+                WHERE s.id = n.id
+            """), {'base': base}).rowcount
+            conn.execute(text("""
+                UPDATE secuencias_cambios
+                SET valor = greatest(valor, (SELECT coalesce(max(version), 0) FROM solicitudes))
+                WHERE nombre = 'solicitudes'
+            """))
+            print(f"✓ {numeradas} solicitudes numeradas")
+    except Exception as e:
+        print(f"⚠ Error durante migración: {str(e)}")
+        return
+
+    _crear_indice_solicitudes('idx_solicitud_version')
+
+
+# Claves foráneas con borrado en cascada: (tabla, columna, tabla referida, acción)
+CLAVES_CASCADA = [
+    ('solicitudes', 'usuario_id', 'usuarios', 'CASCADE'),
+    ('solicitudes', 'aprobador_id', 'usuarios', 'SET NULL'),
+    ('notificaciones', 'usuario_id', 'usuarios', 'CASCADE'),
+    ('notificaciones', 'solicitud_id', 'solicitudes', 'CASCADE'),
+]
+
+
+@cli.command("migrate-cascades")
+def migrate_cascades():
+    """Recrear las claves foráneas con ON DELETE CASCADE / SET NULL (PostgreSQL)."""
+    from sqlalchemy import inspect, text
+    from app.services.retencion_service import esta_particionada
+    print("Migrando claves foráneas a borrado en cascada...")
+
+    if db.engine.dialect.name != 'postgresql':
+        print("⚠ Solo PostgreSQL; en SQLite recrea la base con init-db")
+        return
+
+    try:
+        inspector = inspect(db.engine)
+
+        for tabla, columna, referida, accion in CLAVES_CASCADA:
+            claves = [
+                fk for fk in inspector.get_foreign_keys(tabla)
+                if fk['constrained_columns'] == [columna] and fk['referred_table'] == referida
+            ]
+            if claves and (claves[0].get('options') or {}).get('ondelete') == accion:
+                print(f"✓ {tabla}.{columna} ya tiene ON DELETE {accion}")
+                continue
+
+            nombre = f'{tabla}_{columna}_fkey'
+            with db.engine.begin() as conn:
+                for fk in claves:
+                    conn.execute(text(f'ALTER TABLE {tabla} DROP CONSTRAINT "{fk["name"]}"'))
+                # NOT VALID evita validar toda la tabla con el bloqueo tomado;
+                # las tablas particionadas no lo admiten
+                no_valida = '' if esta_particionada(conn, tabla) else ' NOT VALID'
+                conn.execute(text(
+                    f'ALTER TABLE {tabla} ADD CONSTRAINT "{nombre}" FOREIGN KEY ({columna}) '
+                    f'REFERENCES {referida}(id) ON DELETE {accion}{no_valida}'
+                ))
+
+            if no_valida:
+                with db.engine.begin() as conn:
+                    conn.execute(text(f'ALTER TABLE {tabla} VALIDATE CONSTRAINT "{nombre}"'))
+            print(f"✓ {tabla}.{columna} → ON DELETE {accion}")
+
+        # Índice para ON DELETE SET NULL sobre aprobador_id
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            conn.execute(text(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_solicitud_aprobador ON solicitudes (aprobador_id)"
+            ))
+        print("✓ Índice idx_solicitud_aprobador creado")
+
+    except Exception as e:
+        print(f"⚠ Error durante migración: {str(e)}")
+
+
+@cli.command("archive-notifications")
+@click.option('--dias', type=int, default=None, help='Antigüedad mínima en días')
+@click.option('--lote', type=int, default=None, help='Filas por lote')
+@click.option('--max-lotes', type=int, default=None, help='Máximo de lotes a procesar')
+@click.option('--destino', type=click.Choice(['tabla', 'jsonl']), default=None,
+              help='Tabla notificaciones_archivo o ficheros .jsonl.gz')
+def archive_notifications(dias, lote, max_lotes, destino):
+    """Archivar notificaciones antiguas enviadas o leídas."""
+    from app.services.retencion_service import archivar_notificaciones
+    print("Archivando notificaciones...")
+
+    resumen = archivar_notificaciones(
+        dias=dias,
+        tamano_lote=lote,
+        max_lotes=max_lotes,
+        destino=destino
+    )
+
+    print(f"✓ {resumen['archivadas']} notificaciones archivadas en {resumen['lotes']} lotes ({resumen['destino']})")
+    if resumen['fichero']:
+        print(f"  Fichero: {resumen['fichero']}")
+
+
+@cli.command("archive-solicitudes")
+@click.option('--dias', type=int, default=None, help='Días desde la última actualización')
+@click.option('--lote', type=int, default=None, help='Solicitudes por lote')
+@click.option('--max-lotes', type=int, default=None, help='Máximo de lotes a procesar')
+def archive_solicitudes(dias, lote, max_lotes):
+    """Archivar solicitudes completadas o rechazadas antiguas."""
+    from app.services.retencion_service import archivar_solicitudes
+    print("Archivando solicitudes...")
+
+    resumen = archivar_solicitudes(dias=dias, tamano_lote=lote, max_lotes=max_lotes)
+
+    print(f"✓ {resumen['archivadas']} solicitudes y {resumen['notificaciones']} notificaciones "
+          f"archivadas en {resumen['lotes']} lotes")
+
+
+@cli.command("partition-notifications")
+@click.option('--lote', type=int, default=10000, help='Filas copiadas por transacción')
+@click.option('--meses-adelante', type=int, default=3, help='Particiones futuras a crear')
+def partition_notifications(lote, meses_adelante):
+    """Convertir notificaciones en tabla particionada por mes (PostgreSQL)."""
+    from app.services.retencion_service import particionar_notificaciones
+    print("Particionando tabla de notificaciones...")
+
+    try:
+        particionar_notificaciones(tamano_lote=lote, meses_adelante=meses_adelante)
+    except Exception as e:
+        print(f"⚠ Error durante el particionado: {str(e)}")
+
+
+@cli.command("purge-refresh-tokens")
+@click.option('--lote', type=int, default=5000, help='Tokens eliminados por transacción')
+def purge_refresh_tokens(lote):
+    """Eliminar del almacén los refresh tokens caducados."""
+    from app.services.refresh_token_service import purgar_refresh_tokens
+    print("Purgando refresh tokens caducados...")
+
+    resumen = purgar_refresh_tokens(tamano_lote=lote)
+
+    print(f"✓ {resumen['eliminados']} refresh tokens eliminados en {resumen['lotes']} lotes")
+
+
+@cli.command("send-reminders")
+@click.option('--lote', type=int, default=None, help='Solicitudes por lote')
+def send_reminders(lote):
+    """Encolar los recordatorios de SLA pendientes (también lo hace Celery beat)."""
+    from app.services.recordatorio_service import generar_recordatorios
+    print("Generando recordatorios...")
+
+    resumen = generar_recordatorios(tamano_lote=lote)
+
+    for criterio, encolados in resumen['encolados'].items():
+        print(f"✓ {criterio}: {encolados} encolados, {resumen['omitidos'][criterio]} omitidos")
+
+
+@cli.command("replay-notifications")
+@click.option('--tipo', default=None, help='Solo notificaciones de este tipo')
+@click.option('--desde', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Solo las creadas a partir de esta fecha (YYYY-MM-DD)')
+@click.option('--lote', type=int, default=None, help='Notificaciones por lote (una conexión SMTP por lote)')
+def replay_notifications(tipo, desde, lote):
+    """Reenviar en lote las notificaciones descartadas tras agotar los reintentos."""
+    from app.services.reintento_service import reactivar_descartadas
+    print("Reenviando notificaciones descartadas...")
+
+    resumen = reactivar_descartadas(tipo=tipo, desde=desde, tamano_lote=lote)
+
+    print(f"✓ {resumen['reactivadas']} notificaciones reencoladas en {resumen['lotes']} lotes")
+
+
+@cli.command("seed-scale")
+@click.option('--usuarios', type=int, default=1000, help='Usuarios sintéticos')
+@click.option('--solicitudes', type=int, default=100000, help='Solicitudes a generar')
+@click.option('--notificaciones', type=int, default=100000, help='Notificaciones a generar')
+@click.option('--dias', type=int, default=730, help='Ventana temporal (días hacia atrás)')
+@click.option('--semilla', type=int, default=42, help='Semilla (datos reproducibles)')
+@click.option('--lote', type=int, default=50000, help='Filas por lote')
+@click.option('--metodo', type=click.Choice(['auto', 'copy', 'executemany']), default='auto',
+              help='Carga masiva (COPY solo en PostgreSQL)')
+def seed_scale(usuarios, solicitudes, notificaciones, dias, semilla, lote, metodo):
+    """Generar un volumen sintético de datos para pruebas de capacidad."""
+    from app.services.datos_prueba import generar_volumen
+    print("Generando datos sintéticos...")
+
+    try:
+        creados = generar_volumen(
+            usuarios=usuarios,
+            solicitudes=solicitudes,
+            notificaciones=notificaciones,
+            semilla=semilla,
+            tamano_lote=lote,
+            dias=dias,
+            metodo=metodo,
+            log=print
+        )
+        print(f"✓ Datos generados: {creados}")
+    except Exception as e:
+        db.session.rollback()
+        print(f"⚠ Error generando datos: {str(e)}")
+
+
 @cli.command("seed-db")
 def seed_db():
     """Poblar la base de datos con datos de prueba."""
     print("Poblando base de datos con datos de prueba...")
 
     # Crear usuarios de prueba
-    admin = Usuario(
-        email='admin@solicitudes.com',
-        nombre='Admin',
-        apellido='Sistema',
-        rol='administrador'
-    )
-    admin.set_password('admin123')
-
-    jefe = Usuario(
-        email='jefe@solicitudes.com',
-        nombre='Juan',
-        apellido='Pérez',
-        rol='jefe'
-    )
-    jefe.set_password('jefe123')
-
-    empleado = Usuario(
-        email='empleado@solicitudes.com',
-        nombre='María',
-        apellido='García',
-        rol='empleado'
-    )
-    empleado.set_password('empleado123')
-
-    db.session.add_all([admin, jefe, empleado])
-    db.session.commit()
+    from app.services.datos_prueba import crear_usuarios_base
+    usuarios = crear_usuarios_base()
+    jefe = usuarios['jefe']
+    empleado = usuarios['empleado']
 
     print(f"✓ Usuarios creados:")
     print(f"  - Admin: admin@solicitudes.com / admin123")
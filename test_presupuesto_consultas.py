@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Presupuesto de consultas SQL de GET /api/solicitudes.
+
+Siembra datos sintéticos en SQLite en memoria y verifica con
+presupuesto_consultas que el listado ejecuta un número fijo de consultas
+(usuario autenticado, conteo y página) sea cual sea el tamaño de página, la
+paginación o las relaciones expandidas. Una regresión N+1 (una consulta por
+solicitud) hace fallar la comprobación con las sentencias más lentas.
+
+Uso:
+    python test_presupuesto_consultas.py
+    pytest test_presupuesto_consultas.py
+"""
+from config import TestingConfig
+
+# Se comprueban las consultas, no los limitadores
+TestingConfig.LOGIN_THROTTLING_HABILITADO = False
+TestingConfig.LIMITE_FRECUENCIA_HABILITADO = False
+
+from datetime import datetime, timedelta
+from app import create_app, db
+from app.models import Solicitud, Usuario
+from app.utils.perfil_sql import PresupuestoConsultasExcedido, presupuesto_consultas
+
+
+# Usuario autenticado + conteo + página
+PRESUPUESTO_LISTADO = 3
+
+CREDENCIALES = {
+    'jefe': ('jefe@solicitudes.com', 'jefe123'),
+    'administrador': ('admin@solicitudes.com', 'admin123'),
+}
+
+CONSULTAS = [
+    '',
+    '?per_page=50',
+    '?per_page=50&page=3',
+    '?estado=pendiente&per_page=50',
+    '?expand=usuario,aprobador&per_page=50',
+    '?fields=id,titulo,estado&per_page=50',
+]
+
+ESTADOS = ['pendiente', 'aprobada', 'rechazada', 'en_proceso', 'completada']
+
+
+def sembrar(empleados=20, solicitudes=300):
+    """
+    Crear los usuarios de CREDENCIALES, empleados y solicitudes de prueba.
+
+    Args:
+        empleados: Empleados solicitantes
+        solicitudes: Solicitudes a repartir entre los empleados
+    """
+    usuarios = {}
+    for rol, (email, password) in CREDENCIALES.items():
+        usuario = Usuario(email=email, nombre=rol.title(), apellido='Prueba', rol=rol)
+        usuario.set_password(password)
+        usuarios[rol] = usuario
+
+    solicitantes = [
+        Usuario(email=f'empleado{i}@solicitudes.com', nombre=f'Empleado{i}', apellido='Prueba',
+                rol='empleado', password_hash='-')
+        for i in range(empleados)
+    ]
+    db.session.add_all(list(usuarios.values()) + solicitantes)
+    db.session.flush()
+
+    ahora = datetime.utcnow()
+    for i in range(solicitudes):
+        estado = ESTADOS[i % len(ESTADOS)]
+        db.session.add(Solicitud(
+            tipo='compra',
+            titulo=f'Solicitud {i}',
+            descripcion='Solicitud de prueba del presupuesto de consultas',
+            estado=estado,
+            usuario_id=solicitantes[i % empleados].id,
+            aprobador_id=None if estado == 'pendiente' else usuarios['jefe'].id,
+            created_at=ahora - timedelta(hours=i)
+        ))
+    db.session.commit()
+
+
+def crear_cliente():
+    """
+    Crear la app de pruebas con datos sembrados.
+
+    Returns:
+        tuple: Cliente de pruebas y tokens por rol
+    """
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        sembrar()
+
+    cliente = app.test_client()
+    tokens = {}
+    for rol, (email, password) in CREDENCIALES.items():
+        respuesta = cliente.post('/api/usuarios/login', json={'email': email, 'password': password})
+        assert respuesta.status_code == 200, respuesta.get_json()
+        tokens[rol] = respuesta.get_json()['data']['access_token']
+    return cliente, tokens
+
+
+def comprobar_listado(cliente, token, consulta):
+    """
+    Verificar el presupuesto de consultas de un listado.
+
+    Args:
+        cliente: Cliente de pruebas de Flask
+        token: JWT del usuario
+        consulta: Query string del listado
+
+    Returns:
+        int: Solicitudes devueltas
+
+    Raises:
+        PresupuestoConsultasExcedido: Si el listado supera el presupuesto
+    """
+    ruta = f'/api/solicitudes{consulta}'
+    with presupuesto_consultas(PRESUPUESTO_LISTADO, f'GET {ruta}'):
+        respuesta = cliente.get(ruta, headers={'Authorization': f'Bearer {token}'})
+    assert respuesta.status_code == 200, respuesta.get_json()
+    return len(respuesta.get_json()['solicitudes'])
+
+
+def test_presupuesto_listado_solicitudes():
+    cliente, tokens = crear_cliente()
+    for token in tokens.values():
+        for consulta in CONSULTAS:
+            comprobar_listado(cliente, token, consulta)
+
+
+def main():
+    cliente, tokens = crear_cliente()
+    fallos = 0
+    for rol, token in tokens.items():
+        for consulta in CONSULTAS:
+            try:
+                devueltas = comprobar_listado(cliente, token, consulta)
+                print(f"✅ {rol:<14} GET /api/solicitudes{consulta} ({devueltas} solicitudes)")
+            except PresupuestoConsultasExcedido as e:
+                fallos += 1
+                print(f"❌ {rol:<14} {e}")
+    return 1 if fallos else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())